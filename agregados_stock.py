@@ -0,0 +1,87 @@
+# agregados_stock.py
+# Totales de stock mantenidos de forma incremental: total global, por tipo de batería,
+# por prefijo de serie y conjunto de productos con stock bajo.
+# data_manager los actualiza en cada alta, edición o baja (O(1) por cambio), así la
+# interfaz puede mostrarlos sin recorrer el catálogo.
+
+import re
+
+_PATRON_PREFIJO_SERIE = re.compile(r"[A-Za-z]+")
+
+def stock_como_entero(datos_producto):
+    """Stock del producto como entero (0 si falta o no es un número)."""
+    try:
+        return int(datos_producto.get("stock", 0) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def prefijo_serie(serie):
+    """Letras iniciales de la serie en mayúsculas (p. ej. 'TR-2021-55' -> 'TR'); '' si no tiene."""
+    coincidencia = _PATRON_PREFIJO_SERIE.match(str(serie or "").strip())
+    return coincidencia.group(0).upper() if coincidencia else ""
+
+class AgregadosStock:
+    """Totales de stock del catálogo. No es thread-safe: data_manager lo usa bajo _lock_productos."""
+
+    def __init__(self, umbral_stock_bajo):
+        self.umbral_stock_bajo = umbral_stock_bajo
+        self.reiniciar({})
+
+    def reiniciar(self, productos):
+        """Recalcula todo desde cero (solo al cargar el catálogo)."""
+        self.total = 0
+        self.cantidad_productos = 0
+        self._por_bateria = {} # {bateria: [stock_total, cantidad_productos]}
+        self._por_prefijo_serie = {} # {prefijo: [stock_total, cantidad_productos]}
+        self._stock_bajo = set()
+        for nombre_producto, datos_producto in productos.items():
+            self.agregar_producto(nombre_producto, datos_producto)
+
+    @staticmethod
+    def _sumar_grupo(grupos, clave, stock, cantidad):
+        grupo = grupos.get(clave)
+        if grupo is None:
+            grupo = grupos[clave] = [0, 0]
+        grupo[0] += stock
+        grupo[1] += cantidad
+        if grupo[1] <= 0:
+            del grupos[clave]
+
+    def _aplicar(self, nombre_producto, datos_producto, signo):
+        stock = stock_como_entero(datos_producto)
+        self.total += signo * stock
+        self.cantidad_productos += signo
+        bateria = str(datos_producto.get("bateria", "") or "").strip()
+        self._sumar_grupo(self._por_bateria, bateria, signo * stock, signo)
+        self._sumar_grupo(self._por_prefijo_serie, prefijo_serie(datos_producto.get("serie", "")), signo * stock, signo)
+        if signo > 0 and stock <= self.umbral_stock_bajo:
+            self._stock_bajo.add(nombre_producto)
+        elif signo < 0:
+            self._stock_bajo.discard(nombre_producto)
+
+    def agregar_producto(self, nombre_producto, datos_producto):
+        self._aplicar(nombre_producto, datos_producto, 1)
+
+    def quitar_producto(self, nombre_producto, datos_producto):
+        self._aplicar(nombre_producto, datos_producto, -1)
+
+    def actualizar_producto(self, nombre_producto, datos_producto, datos_anteriores):
+        self.quitar_producto(nombre_producto, datos_anteriores)
+        self.agregar_producto(nombre_producto, datos_producto)
+
+    def resumen(self):
+        """
+        Retorna una foto de los totales: {'total', 'productos', 'stock_bajo' (cantidad),
+        'por_bateria' y 'por_prefijo_serie' ({clave: (stock_total, cantidad_productos)})}.
+        """
+        return {
+            "total": self.total,
+            "productos": self.cantidad_productos,
+            "stock_bajo": len(self._stock_bajo),
+            "por_bateria": {clave: tuple(grupo) for clave, grupo in self._por_bateria.items()},
+            "por_prefijo_serie": {clave: tuple(grupo) for clave, grupo in self._por_prefijo_serie.items()},
+        }
+
+    def productos_stock_bajo(self):
+        """Nombres de los productos con stock bajo, en orden alfabético."""
+        return sorted(self._stock_bajo)
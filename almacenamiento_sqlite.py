@@ -0,0 +1,165 @@
+# almacenamiento_sqlite.py
+# Backend de almacenamiento opcional sobre SQLite (modo WAL) para productos y usuarios.
+# data_manager lo usa cuando config.DATA_BACKEND == "sqlite": cada alta, edición o baja
+# escribe solo la fila afectada en lugar de reescribir todo el catálogo.
+#
+# Migración única desde los JSON existentes:
+#     python almacenamiento_sqlite.py
+
+import os
+import json
+import sqlite3
+import threading
+
+from config import SQLITE_DATA_FILE_FULL_PATH, PRODUCTS_DATA_FILE_FULL_PATH, USERS_DATA_FILE_FULL_PATH
+from agregados_stock import stock_como_entero
+
+_ESQUEMA_SQL = """
+CREATE TABLE IF NOT EXISTS productos (
+    nombre  TEXT PRIMARY KEY,
+    serie   TEXT NOT NULL DEFAULT '',
+    bateria TEXT NOT NULL DEFAULT '',
+    stock   INTEGER NOT NULL DEFAULT 0,
+    datos   TEXT NOT NULL -- Registro completo del producto en JSON
+);
+CREATE INDEX IF NOT EXISTS idx_productos_nombre_nocase ON productos(nombre COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_productos_serie ON productos(serie);
+CREATE INDEX IF NOT EXISTS idx_productos_bateria ON productos(bateria);
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    nombre          TEXT PRIMARY KEY,
+    rol             TEXT NOT NULL DEFAULT '',
+    contrasena_hash TEXT,
+    datos           TEXT NOT NULL -- Registro completo del usuario en JSON
+);
+CREATE INDEX IF NOT EXISTS idx_usuarios_rol ON usuarios(rol);
+"""
+
+def _fila_producto(nombre_producto, datos_producto):
+    # El stock se guarda como columna entera para poder indexarlo y sumarlo en SQL
+    return (nombre_producto, str(datos_producto.get("serie", "") or ""), str(datos_producto.get("bateria", "") or ""),
+            stock_como_entero(datos_producto), json.dumps(dict(datos_producto), ensure_ascii=False))
+
+def _fila_usuario(nombre_usuario, datos_usuario):
+    return (nombre_usuario, str(datos_usuario.get("rol", "") or ""), datos_usuario.get("contrasena_hash"),
+            json.dumps(dict(datos_usuario), ensure_ascii=False))
+
+class AlmacenSQLite:
+    """Acceso a la base SQLite. Una sola conexión compartida, protegida por un candado."""
+
+    def __init__(self, ruta_db=SQLITE_DATA_FILE_FULL_PATH):
+        self.ruta_db = ruta_db
+        self._lock = threading.Lock()
+        self._conexion = None
+
+    def _conectar(self):
+        if self._conexion is None:
+            os.makedirs(os.path.dirname(self.ruta_db), exist_ok=True)
+            conexion = sqlite3.connect(self.ruta_db, check_same_thread=False)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            conexion.executescript(_ESQUEMA_SQL)
+            self._conexion = conexion
+        return self._conexion
+
+    def cerrar(self):
+        with self._lock:
+            if self._conexion is not None:
+                self._conexion.close()
+                self._conexion = None
+
+    # --- Lectura ---
+    def cargar_productos(self):
+        """Retorna {nombre: datos} con todos los productos."""
+        with self._lock:
+            filas = self._conectar().execute("SELECT nombre, datos FROM productos").fetchall()
+        return {nombre: json.loads(datos) for nombre, datos in filas}
+
+    def cargar_usuarios(self):
+        """Retorna {nombre: datos} con todos los usuarios."""
+        with self._lock:
+            filas = self._conectar().execute("SELECT nombre, datos FROM usuarios").fetchall()
+        return {nombre: json.loads(datos) for nombre, datos in filas}
+
+    # --- Escritura fila a fila ---
+    def guardar_producto(self, nombre_producto, datos_producto):
+        """Inserta o reemplaza un producto."""
+        with self._lock:
+            conexion = self._conectar()
+            with conexion:
+                conexion.execute("INSERT OR REPLACE INTO productos (nombre, serie, bateria, stock, datos) VALUES (?, ?, ?, ?, ?)",
+                                 _fila_producto(nombre_producto, datos_producto))
+
+    def guardar_productos_lote(self, productos):
+        """Inserta o reemplaza varios productos en una sola transacción."""
+        with self._lock:
+            conexion = self._conectar()
+            with conexion:
+                conexion.executemany("INSERT OR REPLACE INTO productos (nombre, serie, bateria, stock, datos) VALUES (?, ?, ?, ?, ?)",
+                                     (_fila_producto(nombre, datos) for nombre, datos in productos.items()))
+
+    def eliminar_producto(self, nombre_producto):
+        with self._lock:
+            conexion = self._conectar()
+            with conexion:
+                conexion.execute("DELETE FROM productos WHERE nombre = ?", (nombre_producto,))
+
+    def guardar_usuario(self, nombre_usuario, datos_usuario):
+        """Inserta o reemplaza un usuario."""
+        with self._lock:
+            conexion = self._conectar()
+            with conexion:
+                conexion.execute("INSERT OR REPLACE INTO usuarios (nombre, rol, contrasena_hash, datos) VALUES (?, ?, ?, ?)",
+                                 _fila_usuario(nombre_usuario, datos_usuario))
+
+    def eliminar_usuario(self, nombre_usuario):
+        with self._lock:
+            conexion = self._conectar()
+            with conexion:
+                conexion.execute("DELETE FROM usuarios WHERE nombre = ?", (nombre_usuario,))
+
+    # --- Escritura completa (migración y guardados masivos) ---
+    def reemplazar_productos(self, productos):
+        """Reemplaza todos los productos en una sola transacción."""
+        with self._lock:
+            conexion = self._conectar()
+            with conexion:
+                conexion.execute("DELETE FROM productos")
+                conexion.executemany("INSERT INTO productos (nombre, serie, bateria, stock, datos) VALUES (?, ?, ?, ?, ?)",
+                                     (_fila_producto(nombre, datos) for nombre, datos in productos.items()))
+
+    def reemplazar_usuarios(self, usuarios):
+        """Reemplaza todos los usuarios en una sola transacción."""
+        with self._lock:
+            conexion = self._conectar()
+            with conexion:
+                conexion.execute("DELETE FROM usuarios")
+                conexion.executemany("INSERT INTO usuarios (nombre, rol, contrasena_hash, datos) VALUES (?, ?, ?, ?)",
+                                     (_fila_usuario(nombre, datos) for nombre, datos in usuarios.items()))
+
+def migrar_json_a_sqlite(ruta_productos_json=PRODUCTS_DATA_FILE_FULL_PATH, ruta_usuarios_json=USERS_DATA_FILE_FULL_PATH,
+                         ruta_db=SQLITE_DATA_FILE_FULL_PATH):
+    """
+    Copia products.json y users.json a la base SQLite (reemplazando su contenido).
+    Los JSON originales no se modifican. Retorna (cantidad_productos, cantidad_usuarios).
+    """
+    def _leer_json(ruta):
+        if not os.path.exists(ruta):
+            print(f"ADVERTENCIA (almacenamiento_sqlite): '{ruta}' no existe; se migra vacío.")
+            return {}
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    productos = _leer_json(ruta_productos_json)
+    usuarios = _leer_json(ruta_usuarios_json)
+    almacen = AlmacenSQLite(ruta_db)
+    try:
+        almacen.reemplazar_productos(productos)
+        almacen.reemplazar_usuarios(usuarios)
+    finally:
+        almacen.cerrar()
+    print(f"INFO (almacenamiento_sqlite): Migrados {len(productos)} productos y {len(usuarios)} usuarios a '{ruta_db}'.")
+    return len(productos), len(usuarios)
+
+if __name__ == "__main__":
+    migrar_json_a_sqlite()
@@ -0,0 +1,183 @@
+# analitica_registro.py
+# Estadísticas del registro de actividad sin abrir el Excel a mano: productos más consultados,
+# sesiones por usuario (a partir de "Duracion Sesion (min)") y acciones por día.
+#
+#     python cli.py analitica --top 20 --dias 30   (solo administradores)
+#
+# Los libros se recorren en modo read_only, fila por fila (los archivos de meses anteriores, los
+# .jsonl.gz comprimidos y el libro vigente). Los totales se guardan en logs/analitica_registro.json
+# junto con un cursor por libro, identificado por su primera fila (así sigue valiendo cuando la
+# rotación lo mueve a logs/archivo): la próxima ejecución solo procesa las filas nuevas, y los
+# archivos ya contados por completo ni siquiera se abren.
+# Las acciones del diario pendiente se suman en cada consulta pero no se acumulan, porque la
+# próxima compactación las pasa al Excel y ahí se cuentan una sola vez.
+
+import os
+import json
+
+import itertools
+
+from config import EXCEL_LOG_FILE_FULL_PATH, EXCEL_LOG_JOURNAL_FULL_PATH, ANALITICA_RESUMEN_FULL_PATH
+from persistencia_json import escribir_json_atomico, cargar_json_con_recuperacion
+from excel_logger import iterar_filas_archivo, listar_archivos_registro
+import instrumentacion
+
+VERSION_RESUMEN = 3 # 3: las consultas por la API ya no incluyen el cliente en el nombre del producto
+PREFIJO_CONSULTA = "Consulta Producto" # También "Consulta Producto (API)" y "(CLI)"
+PREFIJO_DETALLE_PRODUCTO = "Producto: "
+SUFIJO_DETALLE_CLIENTE = ". Cliente: " # La API agrega la dirección del cliente: "Producto: X. Cliente: 192.168.1.5"
+
+def _resumen_vacio():
+    return {"version": VERSION_RESUMEN, "libros": {},
+            "consultas_por_producto": {}, "sesiones_por_usuario": {}, "acciones_por_dia": {}}
+
+def _clave_libro(primera_fila):
+    """Identifica un libro por su primera fila: se conserva al archivarlo y cambia si se reemplaza."""
+    return "|".join(str(valor) if valor is not None else "" for valor in primera_fila[:4])
+
+class _LibroReemplazado(Exception):
+    """Un libro ya contado desapareció o tiene menos filas: el resumen se recalcula desde cero."""
+
+def _acumular(resumen, fila):
+    """Suma una fila del registro (valores de ENCABEZADOS_LOG) a los totales del resumen."""
+    fila = (list(fila) + [None] * 6)[:6]
+    fecha, usuario, _, accion, detalles, duracion = fila
+    accion = str(accion or "")
+    dia = str(fecha or "")[:10] # "AAAA-MM-DD HH:MM:SS"
+    if dia:
+        por_accion = resumen["acciones_por_dia"].setdefault(dia, {})
+        por_accion[accion] = por_accion.get(accion, 0) + 1
+    if accion.startswith(PREFIJO_CONSULTA):
+        detalles = str(detalles or "")
+        if detalles.startswith(PREFIJO_DETALLE_PRODUCTO):
+            producto = detalles[len(PREFIJO_DETALLE_PRODUCTO):]
+            if SUFIJO_DETALLE_CLIENTE in producto:
+                producto = producto.rpartition(SUFIJO_DETALLE_CLIENTE)[0]
+            producto = producto.strip()
+            consultas = resumen["consultas_por_producto"]
+            consultas[producto] = consultas.get(producto, 0) + 1
+    if duracion not in (None, ""):
+        try:
+            minutos = float(duracion)
+        except (TypeError, ValueError):
+            return
+        sesiones = resumen["sesiones_por_usuario"].setdefault(str(usuario or "N/A"), [0, 0.0])
+        sesiones[0] += 1
+        sesiones[1] = round(sesiones[1] + minutos, 2)
+
+def _cargar_resumen(ruta_resumen):
+    try:
+        resumen, _ = cargar_json_con_recuperacion(ruta_resumen)
+    except FileNotFoundError:
+        return _resumen_vacio()
+    except ValueError as e:
+        print(f"ADVERTENCIA (analitica_registro): Resumen ilegible, se recalcula desde cero: {e}")
+        return _resumen_vacio()
+    if resumen.get("version") != VERSION_RESUMEN:
+        return _resumen_vacio()
+    return resumen
+
+def _procesar_libro(resumen, ruta, archivo_indice=None):
+    """
+    Suma las filas del libro que su cursor todavía no contó y retorna (clave, filas_nuevas).
+    Un archivo del índice que ya se contó completo se saltea sin abrirlo.
+    """
+    if archivo_indice:
+        clave = _clave_libro(archivo_indice["primera"])
+        cursor = resumen["libros"].get(clave)
+        if cursor and cursor["filas"] == archivo_indice["filas"]:
+            cursor["archivo"] = archivo_indice["archivo"]
+            return clave, 0
+    filas = iterar_filas_archivo(ruta)
+    primera = next(filas, None)
+    if primera is None:
+        return None, 0
+    clave = _clave_libro(primera)
+    contadas = resumen["libros"].get(clave, {}).get("filas", 0)
+    total = 0
+    for total, fila in enumerate(itertools.chain([primera], filas), 1):
+        if total > contadas:
+            _acumular(resumen, fila)
+    if total < contadas:
+        raise _LibroReemplazado(os.path.basename(ruta))
+    resumen["libros"][clave] = {"archivo": os.path.basename(ruta), "filas": total}
+    return clave, total - contadas
+
+def _procesar_libros(resumen, ruta_libro):
+    """Recorre los archivos del índice y el libro vigente; retorna la cantidad de filas nuevas."""
+    fuentes = [(archivo["ruta"], archivo) for archivo in listar_archivos_registro()]
+    if os.path.exists(ruta_libro):
+        fuentes.append((ruta_libro, None))
+    nuevas, vistas = 0, set()
+    for ruta, archivo_indice in fuentes:
+        clave, nuevas_libro = _procesar_libro(resumen, ruta, archivo_indice)
+        vistas.add(clave)
+        nuevas += nuevas_libro
+    faltantes = set(resumen["libros"]) - vistas
+    if faltantes:
+        raise _LibroReemplazado(", ".join(resumen["libros"][clave]["archivo"] for clave in faltantes))
+    return nuevas
+
+def _leer_pendientes(ruta_diario):
+    """Acciones del diario pendiente de volcar al Excel (las líneas ilegibles se omiten)."""
+    pendientes = []
+    try:
+        with open(ruta_diario, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    pendientes.append(json.loads(linea))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return pendientes
+
+@instrumentacion.medido("analitica_registro.actualizar")
+def actualizar_resumen(ruta_libro=EXCEL_LOG_FILE_FULL_PATH, ruta_resumen=ANALITICA_RESUMEN_FULL_PATH):
+    """
+    Incorpora al resumen persistido las filas agregadas al registro desde la última ejecución.
+    Retorna (resumen, filas_nuevas).
+    """
+    resumen = _cargar_resumen(ruta_resumen)
+    cursores_previos = dict(resumen["libros"])
+    try:
+        nuevas = _procesar_libros(resumen, ruta_libro)
+    except _LibroReemplazado as e:
+        print(f"INFO (analitica_registro): Cambiaron libros ya contados ({e}); se recalcula el resumen.")
+        resumen = _resumen_vacio()
+        nuevas = _procesar_libros(resumen, ruta_libro)
+    if nuevas or resumen["libros"] != cursores_previos or not os.path.exists(ruta_resumen):
+        try:
+            escribir_json_atomico(ruta_resumen, resumen, ensure_ascii=False)
+        except OSError as e:
+            print(f"ADVERTENCIA (analitica_registro): No se pudo guardar el resumen '{ruta_resumen}': {e}")
+    return resumen, nuevas
+
+def obtener_estadisticas(top=10, dias=None, ruta_libro=EXCEL_LOG_FILE_FULL_PATH,
+                         ruta_diario=EXCEL_LOG_JOURNAL_FULL_PATH, ruta_resumen=ANALITICA_RESUMEN_FULL_PATH):
+    """
+    Actualiza el resumen y retorna las estadísticas (incluidas las acciones aún en el diario):
+    los 'top' productos más consultados, sesiones y minutos por usuario y, con 'dias', solo
+    los últimos N días con actividad en 'acciones_por_dia'.
+    """
+    resumen, nuevas = actualizar_resumen(ruta_libro, ruta_resumen)
+    pendientes = _leer_pendientes(ruta_diario)
+    for fila in pendientes:
+        _acumular(resumen, fila) # Solo en esta copia: no se guarda
+
+    consultas = sorted(resumen["consultas_por_producto"].items(), key=lambda item: (-item[1], item[0]))
+    sesiones = {}
+    for usuario, (cantidad, minutos) in sorted(resumen["sesiones_por_usuario"].items()):
+        sesiones[usuario] = {"sesiones": cantidad, "minutos_total": round(minutos, 2),
+                             "minutos_promedio": round(minutos / cantidad, 2) if cantidad else 0.0}
+    acciones_por_dia = dict(sorted(resumen["acciones_por_dia"].items()))
+    if dias:
+        acciones_por_dia = dict(list(acciones_por_dia.items())[-dias:])
+    return {
+        "filas_procesadas": sum(cursor["filas"] for cursor in resumen["libros"].values()),
+        "filas_nuevas": nuevas,
+        "acciones_pendientes": len(pendientes),
+        "productos_mas_consultados": [{"producto": producto, "consultas": cantidad} for producto, cantidad in consultas[:top]],
+        "sesiones_por_usuario": sesiones,
+        "acciones_por_dia": acciones_por_dia,
+    }
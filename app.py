@@ -1,17 +1,25 @@
 # main_app.py
 # Punto de entrada principal de la aplicación Balanzas Triunfo Enciclopedia.
+#
+# Arranque diferido: primero se muestra la ventana de login y recién después, en segundo plano,
+# se cargan los datos y se prepara el registro en Excel. openpyxl y PIL se importan al usarse.
+#     python app.py                   -> inicio normal
+#     python app.py --medir-arranque  -> muestra el login, informa los tiempos y termina
 
+import medicion_arranque # Primero: fija el instante de inicio del proceso
+import sys
+import json
 import tkinter as tk
-from config import COLOR_BACKGROUND, LOGO_ICON_FULL_PATH # Importar la nueva ruta del logo
-from excel_logger import inicializar_excel_log
+from config import COLOR_BACKGROUND, LOGO_ICON_FULL_PATH, ARRANQUE_PRESUPUESTO_LOGIN_MS # Importar la nueva ruta del logo
+import data_manager
+from excel_logger import iniciar_registro_excel
 from ui_components import crear_ventana_login_ui, inicializar_enciclopedia_ui
 import os # Necesario para verificar si el archivo de logo existe
 
 if __name__ == "__main__":
-    # 1. Inicializar el logger de Excel al arrancar la aplicación
-    inicializar_excel_log()
+    solo_medir_arranque = "--medir-arranque" in sys.argv[1:]
 
-    # 2. Crear la ventana principal (raíz) de la aplicación Tkinter
+    # 1. Crear la ventana principal (raíz) de la aplicación Tkinter
     root_app = tk.Tk()
     root_app.geometry("900x700") # Tamaño inicial, ajustado para más contenido
     root_app.configure(background=COLOR_BACKGROUND)
@@ -29,9 +37,21 @@ if __name__ == "__main__":
     else:
         print(f"ADVERTENCIA: Archivo de ícono '{LOGO_ICON_FULL_PATH}' no encontrado.")
 
-    # 3. Iniciar con la ventana de login.
-
+    # 2. Iniciar con la ventana de login.
     crear_ventana_login_ui(root_app, inicializar_enciclopedia_ui)
+    root_app.update() # Dibuja el login ahora, antes de cualquier trabajo pesado
+    medicion_arranque.marcar("ventana_login", presupuesto_ms=ARRANQUE_PRESUPUESTO_LOGIN_MS)
+    medicion_arranque.verificar_importaciones_diferidas("ventana_login")
+
+    if solo_medir_arranque:
+        print(json.dumps(medicion_arranque.obtener_marcas()))
+        root_app.destroy()
+        sys.exit(0)
+
+    # 3. Mientras el usuario escribe sus credenciales: cargar usuarios y catálogo, y arrancar
+    #    el registro de actividad (crea el Excel si falta) fuera del hilo de la interfaz.
+    data_manager.iniciar_carga_en_segundo_plano()
+    iniciar_registro_excel()
 
     # 4. Iniciar el bucle principal de Tkinter para que la aplicación corra y maneje eventos.
     root_app.mainloop()
@@ -1,31 +1,49 @@
 # auth_handler.py
-# Lógica para la autenticación y gestión de usuarios (simplificado: hashing directo sin salt).
+# Lógica para la autenticación y gestión de usuarios. Las contraseñas se guardan con una función
+# de derivación lenta y sal (ver hash_contrasenas.py); los hash SHA-256 sin sal de versiones
+# anteriores se siguen aceptando y se reemplazan por uno nuevo al iniciar sesión.
+# Verificar una contraseña tarda a propósito (CONTRASENA_KDF_TIEMPO_OBJETIVO_MS): la interfaz
+# llama a autenticar_usuario desde un hilo de trabajo.
 
-import hashlib
-# Ya no necesitamos 'secrets' ni 'string' si no usamos salt.
 # Importa las funciones de gestión de datos de usuarios
 from data_manager import get_usuarios_registrados_data, actualizar_usuario_data, registrar_usuario_data, eliminar_usuario_data
+import hash_contrasenas
+import instrumentacion
+
+_hash_ficticio = None # Para que un usuario inexistente tarde lo mismo que una contraseña incorrecta
 
 def _generar_hash_contrasena(contrasena_texto_plano):
-    """
-    Genera el hash SHA256 de una contraseña en texto plano.
-    Este método NO usa salting, lo cual es menos seguro.
-    Retorna solo el hash.
-    """
-    return hashlib.sha256(contrasena_texto_plano.encode()).hexdigest()
+    """Genera el hash de una contraseña (algoritmo configurado, sal aleatoria y costo calibrado)."""
+    return hash_contrasenas.generar_hash(contrasena_texto_plano)
 
 def _verificar_contrasena_hash(contrasena_guardada_hash, contrasena_ingresada):
     """
-    Verifica una contraseña ingresada contra un hash guardado.
-    Este método NO usa salting.
+    Verifica una contraseña ingresada contra un hash guardado (de cualquier algoritmo conocido).
     Retorna True si la contraseña es correcta, False en caso contrario.
     """
-    contrasena_ingresada_hash = _generar_hash_contrasena(contrasena_ingresada)
-    return contrasena_guardada_hash == contrasena_ingresada_hash
+    return hash_contrasenas.verificar_contrasena(contrasena_guardada_hash, contrasena_ingresada)
+
+def _verificar_sin_usuario(contrasena_ingresada):
+    """Hace el mismo trabajo que una verificación real, para no revelar por el tiempo qué usuarios existen."""
+    global _hash_ficticio
+    if _hash_ficticio is None:
+        _hash_ficticio = _generar_hash_contrasena("")
+    _verificar_contrasena_hash(_hash_ficticio, contrasena_ingresada)
+
+def _actualizar_hash_si_corresponde(nombre_usuario, contrasena_hash_guardada, contrasena_ingresada):
+    """Regenera el hash de un usuario recién autenticado si usa un algoritmo anterior o un costo menor."""
+    if not hash_contrasenas.requiere_actualizacion(contrasena_hash_guardada):
+        return
+    if actualizar_usuario_data(nombre_usuario, {"contrasena_hash": _generar_hash_contrasena(contrasena_ingresada), "salt": None}):
+        print(f"INFO: Hash de contraseña de '{nombre_usuario}' actualizado al algoritmo vigente.")
+    else:
+        print(f"ADVERTENCIA: No se pudo actualizar el hash de contraseña de '{nombre_usuario}'; se reintentará en el próximo inicio de sesión.")
 
+@instrumentacion.medido("auth.autenticar_usuario")
 def autenticar_usuario(nombre_usuario_ingresado, contrasena_ingresada):
     """
-    Autentica un usuario.
+    Autentica un usuario. Es lenta a propósito (función de derivación): desde la interfaz se
+    llama en un hilo de trabajo. Si el hash guardado es de un algoritmo anterior, se reemplaza.
     Retorna un diccionario con {'nombre': nombre, 'rol': rol} si la autenticación es exitosa,
     sino None.
     """
@@ -37,24 +55,25 @@ def autenticar_usuario(nombre_usuario_ingresado, contrasena_ingresada):
         # Verifica que el usuario tenga un hash guardado
         if contrasena_hash_guardada:
             if _verificar_contrasena_hash(contrasena_hash_guardada, contrasena_ingresada):
+                _actualizar_hash_si_corresponde(nombre_usuario_ingresado, contrasena_hash_guardada, contrasena_ingresada)
                 return {"nombre": nombre_usuario_ingresado, "rol": datos_usuario_guardados["rol"]}
             else:
                 # Opcional: print para depuración
                 print(f"DEBUG: Contraseña incorrecta para {nombre_usuario_ingresado}")
-        else:
-            print(f"ADVERTENCIA: Usuario '{nombre_usuario_ingresado}' no tiene hash de contraseña guardado.")
+            return None
+        print(f"ADVERTENCIA: Usuario '{nombre_usuario_ingresado}' no tiene hash de contraseña guardado.")
+    _verificar_sin_usuario(contrasena_ingresada)
     return None
 
-# --- Funciones de Administración de Usuarios (Ajustadas para no usar salt) ---
+# --- Funciones de Administración de Usuarios ---
 
 def cambiar_contrasena_usuario(nombre_usuario, nueva_contrasena):
     """
     Cambia la contraseña de un usuario.
-    Genera el hash de la nueva contraseña sin salt.
+    La sal va dentro del hash: el campo 'salt' de versiones anteriores queda en None.
     """
     hash_nuevo = _generar_hash_contrasena(nueva_contrasena)
-    # Actualiza los datos del usuario en el data_manager. Elimina el 'salt' si existía.
-    return actualizar_usuario_data(nombre_usuario, {"contrasena_hash": hash_nuevo, "salt": None}) # Poner salt a None
+    return actualizar_usuario_data(nombre_usuario, {"contrasena_hash": hash_nuevo, "salt": None})
 
 def cambiar_rol_usuario(nombre_usuario, nuevo_rol):
     """
@@ -76,7 +95,7 @@ def registrar_nuevo_usuario(nombre_usuario, contrasena, rol):
     datos_nuevo_usuario = {
         "contrasena_hash": hash_nuevo,
         "rol": rol,
-        "salt": None # Asegurarse de que no haya salt para nuevos usuarios
+        "salt": None # La sal va dentro de contrasena_hash
     }
     return registrar_usuario_data(nombre_usuario, datos_nuevo_usuario)
 
@@ -0,0 +1,255 @@
+# benchmark_rendimiento.py
+# Benchmarks sin interfaz gráfica de los caminos críticos de datos y búsqueda, sobre catálogos,
+# usuarios y registros de actividad sintéticos (ver datos_sinteticos.py). Se miden las funciones
+# reales de la aplicación; los archivos se generan en un directorio temporal, nunca en data/ ni logs/.
+#
+#     python benchmarks/benchmark_rendimiento.py
+#     python benchmarks/benchmark_rendimiento.py --tamanos 1000 10000 --salida antes.json
+#     python benchmarks/benchmark_rendimiento.py --tamanos 1000 10000 --comparar antes.json
+#
+# Casos medidos (cada uno con n muestras; se informan min, mediana, p95, media y max en ms):
+#   cargar_productos_frio / cargar_productos   data_manager._cargar_productos (sin / con índice de trigramas guardado)
+#   guardar_productos                          data_manager._guardar_productos
+#   sugerencias                                motor_busqueda.calcular_sugerencias (lo que calcula actualizar_sugerencias_ui)
+#   resumen_stock                              data_manager.get_resumen_stock (lo que muestra _calcular_y_actualizar_total_stock_ui)
+#   stock_total_recorrido                      la suma completa del catálogo que se hacía antes, como referencia
+#   actualizar_producto                        data_manager.actualizar_producto_data (memoria + índices)
+#   registrar_accion                           excel_logger.registrar_accion_excel con un Excel de N filas
+#   volcar_registro                            excel_logger.finalizar_registro_excel (volcado del diario al Excel de N filas)
+#   autenticar_ok / autenticar_error           auth_handler.autenticar_usuario con N usuarios
+# El resultado se guarda en JSON para comparar ejecuciones (--comparar marca las regresiones).
+
+import os
+import sys
+import json
+import time
+import atexit
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import datetime
+import contextlib
+import statistics
+import subprocess
+
+RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ_PROYECTO)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import data_manager
+import excel_logger
+import auth_handler
+import hash_contrasenas
+import motor_busqueda
+from persistencia_json import GuardadoDiferido
+from diario_cambios import DiarioCambios
+import datos_sinteticos
+
+TAMANOS_CATALOGO = [1000, 10000, 100000, 1000000]
+TAMANOS_USUARIOS = [10, 1000, 10000]
+TAMANOS_REGISTRO = [1000, 10000, 100000]
+UMBRAL_REGRESION = 1.20 # --comparar marca como regresión una mediana un 20% más lenta
+
+def _informar(mensaje):
+    print(mensaje, file=sys.stderr, flush=True)
+
+def _medir(funcion, *args):
+    inicio = time.perf_counter()
+    funcion(*args)
+    return (time.perf_counter() - inicio) * 1000
+
+def _resumir(caso, tamano, muestras_ms):
+    ordenadas = sorted(muestras_ms)
+    return {
+        "caso": caso,
+        "tamano": tamano,
+        "muestras": len(ordenadas),
+        "min_ms": round(ordenadas[0], 4),
+        "mediana_ms": round(statistics.median(ordenadas), 4),
+        "p95_ms": round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))], 4),
+        "media_ms": round(statistics.fmean(ordenadas), 4),
+        "max_ms": round(ordenadas[-1], 4),
+    }
+
+def _redirigir_rutas(directorio):
+    """Apunta data_manager y excel_logger a un directorio temporal (las rutas se copian de config al importar)."""
+    ruta_datos = os.path.join(directorio, "data")
+    ruta_logs = os.path.join(directorio, "logs")
+    os.makedirs(ruta_datos, exist_ok=True)
+    os.makedirs(ruta_logs, exist_ok=True)
+    data_manager.DATA_PATH = ruta_datos
+    data_manager.PRODUCTS_DATA_FILE_FULL_PATH = os.path.join(ruta_datos, "products.json")
+    data_manager.USERS_DATA_FILE_FULL_PATH = os.path.join(ruta_datos, "users.json")
+    data_manager.PRODUCTS_TRIGRAM_INDEX_FULL_PATH = os.path.join(ruta_datos, "products_trigramas.json")
+    data_manager._diario = DiarioCambios(os.path.join(ruta_datos, "cambios.jsonl"), os.path.join(ruta_datos, "cambios_snapshot.json"))
+    excel_logger.LOGS_PATH = ruta_logs
+    excel_logger.EXCEL_LOG_FILE_FULL_PATH = os.path.join(ruta_logs, "registro_actividad.xlsx")
+    excel_logger.EXCEL_LOG_JOURNAL_FULL_PATH = os.path.join(ruta_logs, "registro_actividad_pendiente.jsonl")
+    excel_logger.EXCEL_LOG_ARCHIVO_PATH = os.path.join(ruta_logs, "archivo")
+    excel_logger.EXCEL_LOG_INDICE_FULL_PATH = os.path.join(ruta_logs, "indice_registro.json")
+    hash_contrasenas.CONTRASENA_KDF_CALIBRACION_FULL_PATH = os.path.join(ruta_datos, "kdf_calibracion.json")
+    # Guardados diferidos que no se disparan durante la medición (se guardan explícitamente)
+    data_manager._guardado_productos = GuardadoDiferido(data_manager._guardar_productos, 3600, 3600, "productos")
+    data_manager._guardado_usuarios = GuardadoDiferido(data_manager._guardar_usuarios, 3600, 3600, "usuarios")
+    data_manager._asegurar_backend_inicializado()
+
+def _escribir_json(ruta, datos):
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+
+# --- Catálogo: carga, guardado, sugerencias, stock y edición ---
+def benchmark_catalogo(tamano, repeticiones, cantidad_consultas):
+    resultados = []
+    catalogo = datos_sinteticos.generar_catalogo(tamano)
+    _escribir_json(data_manager.PRODUCTS_DATA_FILE_FULL_PATH, catalogo)
+    nombres = list(catalogo)
+    del catalogo
+
+    muestras_frio, muestras_tibio = [], []
+    for _ in range(repeticiones):
+        if os.path.exists(data_manager.PRODUCTS_TRIGRAM_INDEX_FULL_PATH):
+            os.remove(data_manager.PRODUCTS_TRIGRAM_INDEX_FULL_PATH)
+        muestras_frio.append(_medir(data_manager._cargar_productos)) # Reconstruye el índice de trigramas
+        data_manager.guardar_indice_busqueda()
+        muestras_tibio.append(_medir(data_manager._cargar_productos)) # Lee el índice guardado
+    data_manager._productos_cargados.set()
+    resultados.append(_resumir("cargar_productos_frio", tamano, muestras_frio))
+    resultados.append(_resumir("cargar_productos", tamano, muestras_tibio))
+
+    resultados.append(_resumir("guardar_productos", tamano, [_medir(data_manager._guardar_productos) for _ in range(repeticiones)]))
+
+    consultas = datos_sinteticos.generar_consultas(nombres, cantidad_consultas)
+    resultados.append(_resumir("sugerencias", tamano, [_medir(motor_busqueda.calcular_sugerencias, texto) for texto in consultas]))
+
+    resultados.append(_resumir("resumen_stock", tamano, [_medir(data_manager.get_resumen_stock) for _ in range(max(repeticiones, 100))]))
+    recorrer_stock = lambda: sum(int(d.get("stock", 0)) for d in data_manager.get_productos_data().values())
+    resultados.append(_resumir("stock_total_recorrido", tamano, [_medir(recorrer_stock) for _ in range(repeticiones)]))
+
+    azar = random.Random(tamano)
+    muestras_edicion = [_medir(data_manager.actualizar_producto_data, azar.choice(nombres), {"stock": azar.randint(0, 50), "info": f"editado {i}"})
+                        for i in range(max(repeticiones, 100))]
+    resultados.append(_resumir("actualizar_producto", tamano, muestras_edicion))
+    data_manager._guardado_productos.flush()
+    return resultados
+
+# --- Registro de actividad ---
+def _crear_excel_registro(cantidad_filas):
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Registro de Actividad")
+    sheet.append(excel_logger.ENCABEZADOS_LOG)
+    for fila in datos_sinteticos.generar_filas_registro(cantidad_filas):
+        sheet.append(fila)
+    workbook.save(excel_logger.EXCEL_LOG_FILE_FULL_PATH)
+
+def benchmark_registro(cantidad_filas, repeticiones, acciones_por_muestra=100):
+    _crear_excel_registro(cantidad_filas)
+    muestras_registro, muestras_volcado = [], []
+    for _ in range(repeticiones):
+        for i in range(acciones_por_muestra):
+            muestras_registro.append(_medir(excel_logger.registrar_accion_excel, "Consulta Producto", f"Producto: benchmark {i}"))
+        muestras_volcado.append(_medir(excel_logger.finalizar_registro_excel))
+    return [_resumir("registrar_accion", cantidad_filas, muestras_registro),
+            _resumir("volcar_registro", cantidad_filas, muestras_volcado)]
+
+# --- Autenticación ---
+def benchmark_autenticacion(cantidad_usuarios, intentos):
+    # Con la función de derivación (~CONTRASENA_KDF_TIEMPO_OBJETIVO_MS por hash) generar miles de
+    # usuarios tardaría minutos: el resto se genera con el SHA-256 anterior y solo los usuarios
+    # que se van a autenticar reciben el hash vigente (así no se mide además la actualización)
+    usuarios, credenciales = datos_sinteticos.generar_usuarios(cantidad_usuarios, hash_contrasenas.HasherSHA256Legado().generar)
+    azar = random.Random(cantidad_usuarios)
+    elegidos = [azar.choice(credenciales) for _ in range(intentos)]
+    for nombre, contrasena in set(elegidos):
+        usuarios[nombre]["contrasena_hash"] = auth_handler._generar_hash_contrasena(contrasena)
+    _escribir_json(data_manager.USERS_DATA_FILE_FULL_PATH, usuarios)
+    data_manager._cargar_usuarios()
+    data_manager._usuarios_cargados.set()
+    muestras_ok, muestras_error = [], []
+    for nombre, contrasena in elegidos:
+        muestras_ok.append(_medir(auth_handler.autenticar_usuario, nombre, contrasena))
+        muestras_error.append(_medir(auth_handler.autenticar_usuario, nombre, contrasena + "x"))
+    return [_resumir("autenticar_ok", cantidad_usuarios, muestras_ok),
+            _resumir("autenticar_error", cantidad_usuarios, muestras_error)]
+
+# --- Resultados ---
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ_PROYECTO, capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def comparar_resultados(actuales, anteriores):
+    """Imprime la relación de medianas (actual / anterior) por caso y tamaño. Retorna la cantidad de regresiones."""
+    indice_anterior = {(r["caso"], r["tamano"]): r for r in anteriores["resultados"]}
+    regresiones = 0
+    for resultado in actuales["resultados"]:
+        anterior = indice_anterior.get((resultado["caso"], resultado["tamano"]))
+        if anterior is None or anterior["mediana_ms"] <= 0:
+            continue
+        relacion = resultado["mediana_ms"] / anterior["mediana_ms"]
+        marca = "  <-- REGRESIÓN" if relacion > UMBRAL_REGRESION else ""
+        regresiones += bool(marca)
+        print(f"{resultado['caso']:<24} {resultado['tamano']:>9}  {anterior['mediana_ms']:>11.3f} -> {resultado['mediana_ms']:>11.3f} ms  x{relacion:.2f}{marca}")
+    return regresiones
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de los caminos críticos con datos sintéticos.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS_CATALOGO, help="Tamaños de catálogo (productos).")
+    parser.add_argument("--usuarios", type=int, nargs="+", default=TAMANOS_USUARIOS, help="Cantidades de usuarios.")
+    parser.add_argument("--filas-registro", type=int, nargs="+", default=TAMANOS_REGISTRO, help="Filas previas del Excel de actividad.")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Muestras de las operaciones costosas (cargar, guardar, volcar).")
+    parser.add_argument("--consultas", type=int, default=200, help="Búsquedas medidas por tamaño de catálogo.")
+    parser.add_argument("--salida", default="resultados_benchmark.json", help="Archivo JSON de resultados.")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior para comparar (sale con código 1 si hay regresiones).")
+    args = parser.parse_args(argv)
+
+    directorio_temporal = tempfile.mkdtemp(prefix="benchmark_balanzas_")
+    resultados = []
+    try:
+        _redirigir_rutas(directorio_temporal)
+        # Las funciones medidas informan por consola en cada operación; esa salida se descarta
+        with open(os.devnull, "w", encoding="utf-8") as salida_nula, contextlib.redirect_stdout(salida_nula):
+            for tamano in args.tamanos:
+                _informar(f"Catálogo de {tamano} productos...")
+                resultados += benchmark_catalogo(tamano, args.repeticiones, args.consultas)
+            for cantidad_usuarios in args.usuarios:
+                _informar(f"Autenticación con {cantidad_usuarios} usuarios...")
+                resultados += benchmark_autenticacion(cantidad_usuarios, max(args.consultas, 100))
+            for cantidad_filas in args.filas_registro:
+                _informar(f"Registro de actividad con {cantidad_filas} filas...")
+                resultados += benchmark_registro(cantidad_filas, args.repeticiones)
+    finally:
+        # Se guarda lo pendiente ahora y se evita que el guardado de atexit recree el directorio temporal
+        with open(os.devnull, "w", encoding="utf-8") as salida_nula, contextlib.redirect_stdout(salida_nula):
+            data_manager.flush()
+            excel_logger.finalizar_registro_excel()
+        atexit.unregister(data_manager.flush)
+        shutil.rmtree(directorio_temporal, ignore_errors=True)
+
+    informe = {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "backend": data_manager.DATA_BACKEND,
+        "resultados": resultados,
+    }
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    for resultado in resultados:
+        print(f"{resultado['caso']:<24} {resultado['tamano']:>9}  mediana {resultado['mediana_ms']:>11.3f} ms  p95 {resultado['p95_ms']:>11.3f} ms")
+    print(f"Resultados guardados en '{args.salida}'.")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            anteriores = json.load(f)
+        print(f"\nComparación con '{args.comparar}' (commit {anteriores.get('commit')}):")
+        if comparar_resultados(informe, anteriores):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# datos_sinteticos.py
+# Generadores deterministas (misma semilla -> mismos datos) de catálogos, usuarios y registros
+# de actividad sintéticos para los benchmarks. Imitan la forma de los datos reales: nombres con
+# acentos, series con prefijo de letras, tipos de batería repetidos y stock entre 0 y 50.
+
+import random
+import datetime
+
+_MARCAS = ["Triunfo", "Kretz", "Systel", "Moretti", "Cuora", "Digi", "Dibal", "Balanzas Güemes", "Año Nuevo", "Precisión"]
+_TIPOS = ["Comercial", "Colgante", "Plataforma", "Pesa Bebé", "Joyería", "Industrial", "Contadora", "Etiquetadora"]
+_PREFIJOS_SERIE = ["TR", "KZ", "SY", "MO", "CU", "DG", "DB", "GU"]
+_BATERIAS = ["", "AA", "AAA", "Litio 3.7V", "Plomo 6V 4Ah", "Plomo 6V 10Ah", "9V", "CR2032"]
+_PALABRAS_INFO = ["acero", "inoxidable", "display", "doble", "carga", "máxima", "kg", "gramos", "tara",
+                  "calibración", "certificada", "INTI", "impresora", "ticket", "batería", "recargable"]
+_ACCIONES = ["Inicio Sesion", "Consulta Producto", "Abrir Enlace Manual", "Edicion Producto", "Registro Producto", "Cierre Sesion"]
+
+def generar_catalogo(cantidad, semilla=1):
+    """Retorna {nombre: datos_producto} con 'cantidad' productos."""
+    azar = random.Random(semilla)
+    productos = {}
+    for i in range(cantidad):
+        marca = azar.choice(_MARCAS)
+        nombre = f"{marca} {azar.choice(_TIPOS)} {azar.randint(1, 999)}-{i:07d}"
+        productos[nombre] = {
+            "serie": f"{azar.choice(_PREFIJOS_SERIE)}-{azar.randint(2010, 2025)}-{i:07d}",
+            "manual": f"https://manuales.example.com/{i}.pdf" if azar.random() < 0.7 else "",
+            "calibracion": "",
+            "bateria": azar.choice(_BATERIAS),
+            "info": " ".join(azar.choice(_PALABRAS_INFO) for _ in range(azar.randint(0, 8))),
+            "imagen": "",
+            "stock": azar.randint(0, 50),
+        }
+    return productos
+
+def generar_usuarios(cantidad, funcion_hash, semilla=1):
+    """
+    Retorna ({nombre: datos_usuario}, [(nombre, contraseña)]) con 'cantidad' usuarios.
+    funcion_hash es la que usa auth_handler para guardar contraseñas.
+    """
+    azar = random.Random(semilla)
+    usuarios, credenciales = {}, []
+    for i in range(cantidad):
+        nombre, contrasena = f"usuario{i:05d}", f"clave-{azar.randint(0, 10**9)}"
+        usuarios[nombre] = {"contrasena_hash": funcion_hash(contrasena), "rol": "administrador" if i % 10 == 0 else "usuario", "salt": None}
+        credenciales.append((nombre, contrasena))
+    return usuarios, credenciales
+
+def generar_filas_registro(cantidad, semilla=1):
+    """Genera 'cantidad' filas del registro de actividad (mismo formato que excel_logger)."""
+    azar = random.Random(semilla)
+    instante = datetime.datetime(2024, 1, 1, 8, 0, 0)
+    for i in range(cantidad):
+        instante += datetime.timedelta(seconds=azar.randint(1, 600))
+        accion = azar.choice(_ACCIONES)
+        yield [instante.strftime("%Y-%m-%d %H:%M:%S"), f"usuario{azar.randint(0, 50):05d}", "usuario", accion,
+               f"Producto: Triunfo Comercial {azar.randint(1, 999)}", f"{azar.uniform(1, 240):.2f}" if accion == "Cierre Sesion" else ""]
+
+def generar_consultas(nombres, cantidad, semilla=1):
+    """
+    Retorna textos de búsqueda como los que teclea un usuario: prefijos de nombres existentes,
+    nombres con un error de tipeo y palabras sueltas.
+    """
+    azar = random.Random(semilla)
+    consultas = []
+    for _ in range(cantidad):
+        nombre = azar.choice(nombres)
+        tipo = azar.random()
+        if tipo < 0.5:
+            consultas.append(nombre[:azar.randint(1, min(12, len(nombre)))])
+        elif tipo < 0.8:
+            posicion = azar.randrange(len(nombre))
+            consultas.append(nombre[:posicion] + nombre[posicion + 1:])
+        else:
+            consultas.append(azar.choice(_PALABRAS_INFO + _TIPOS))
+    return consultas
@@ -0,0 +1,142 @@
+# cache_imagenes.py
+# Caché de dos niveles para las imágenes de productos:
+#   1) En memoria: PhotoImage listos para mostrar, con tamaño acotado (LRU).
+#   2) En disco: miniaturas ya reducidas, con clave ruta + mtime + tamaño del archivo original.
+# La verificación del archivo (stat), la decodificación y el reescalado se hacen en un hilo de
+# trabajo: en una carpeta de red hasta un stat puede demorar. El PhotoImage se crea en el hilo
+# de Tk cuando la interfaz recoge el resultado con after().
+
+import os
+import queue
+import hashlib
+import threading
+from collections import OrderedDict
+# PIL se importa al decodificar la primera imagen (no al arrancar la aplicación)
+
+from config import MINIATURAS_CACHE_PATH, TAMANO_MINIATURA_PRODUCTO, CACHE_IMAGENES_MAX_EN_MEMORIA
+
+_INTERVALO_SONDEO_MS = 20
+
+def _clave_imagen(ruta_imagen, tamano):
+    """Clave de caché: cambia si el archivo original se modifica o se reemplaza."""
+    info = os.stat(ruta_imagen)
+    contenido = f"{os.path.abspath(ruta_imagen)}|{info.st_mtime_ns}|{info.st_size}|{tamano[0]}x{tamano[1]}"
+    return hashlib.sha1(contenido.encode("utf-8")).hexdigest()
+
+def _cargar_miniatura_pil(ruta_imagen, clave, tamano):
+    """
+    Retorna la miniatura como imagen PIL. Se lee del caché en disco si existe; si no, se decodifica
+    el original (con decodificación reducida en JPEG) y se guarda la miniatura en disco.
+    """
+    from PIL import Image
+    ruta_miniatura = os.path.join(MINIATURAS_CACHE_PATH, f"{clave}.png")
+    if os.path.exists(ruta_miniatura):
+        try:
+            with Image.open(ruta_miniatura) as miniatura:
+                miniatura.load()
+                return miniatura.copy()
+        except Exception as e:
+            print(f"ADVERTENCIA (cache_imagenes): Miniatura en caché ilegible '{ruta_miniatura}': {e}. Se regenera.")
+
+    with Image.open(ruta_imagen) as original:
+        # En JPEG, draft() decodifica directamente a una escala reducida (1/2, 1/4, 1/8)
+        original.draft("RGB", tamano)
+        original.thumbnail(tamano)
+        miniatura = original.copy()
+
+    try:
+        os.makedirs(MINIATURAS_CACHE_PATH, exist_ok=True)
+        ruta_temporal = f"{ruta_miniatura}.{threading.get_ident()}.tmp"
+        miniatura.save(ruta_temporal, format="PNG")
+        os.replace(ruta_temporal, ruta_miniatura)
+    except Exception as e:
+        print(f"ADVERTENCIA (cache_imagenes): No se pudo guardar la miniatura de '{ruta_imagen}' en caché: {e}")
+    return miniatura
+
+class CacheImagenesProductos:
+    """Entrega PhotoImage de miniaturas de productos sin decodificar en el hilo de la interfaz."""
+
+    def __init__(self, tamano=TAMANO_MINIATURA_PRODUCTO, max_en_memoria=CACHE_IMAGENES_MAX_EN_MEMORIA):
+        self.tamano = tamano
+        self.max_en_memoria = max_en_memoria
+        self._en_memoria = OrderedDict() # {ruta: (clave, PhotoImage)}, el más reciente al final
+        self._pedidos = queue.Queue() # (ruta, clave_en_memoria | None, callback) para el hilo de trabajo
+        self._terminados = queue.Queue() # (ruta, clave, imagen_pil | None, error | None, callback)
+        self._hilo = None
+        self._pendientes = 0 # Pedidos cuyo resultado todavía no se entregó
+        self._widget_sondeo = None
+        self._id_sondeo = None
+
+    def solicitar(self, ruta_imagen, widget_tk, al_cargar):
+        """
+        Pide la miniatura de ruta_imagen. al_cargar(photo_image, error) se llama en el hilo de Tk:
+        de inmediato si está en memoria, o cuando termine la decodificación. Lo que está en memoria
+        se revalida en el hilo de trabajo; si el archivo cambió o ya no existe, al_cargar se vuelve
+        a llamar con la imagen nueva o con el error (FileNotFoundError si no existe).
+        """
+        entrada = self._en_memoria.get(ruta_imagen)
+        if entrada is not None:
+            self._en_memoria.move_to_end(ruta_imagen)
+            al_cargar(entrada[1], None)
+
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._bucle_decodificacion, name="DecodificadorImagenes", daemon=True)
+            self._hilo.start()
+        self._pendientes += 1
+        self._pedidos.put((ruta_imagen, entrada[0] if entrada is not None else None, al_cargar))
+        self._widget_sondeo = widget_tk
+        if self._id_sondeo is None:
+            self._id_sondeo = widget_tk.after(_INTERVALO_SONDEO_MS, self._recoger_terminados)
+
+    def _bucle_decodificacion(self):
+        while True:
+            ruta_imagen, clave_en_memoria, al_cargar = self._pedidos.get()
+            clave = None
+            try:
+                clave = _clave_imagen(ruta_imagen, self.tamano)
+                if clave == clave_en_memoria:
+                    self._terminados.put((ruta_imagen, clave, None, None, al_cargar)) # Sin cambios: ya se mostró
+                else:
+                    self._terminados.put((ruta_imagen, clave, _cargar_miniatura_pil(ruta_imagen, clave, self.tamano), None, al_cargar))
+            except Exception as e:
+                self._terminados.put((ruta_imagen, clave, None, e, al_cargar))
+
+    def _recoger_terminados(self):
+        """Convierte en PhotoImage (hilo de Tk) las miniaturas decodificadas y avisa a quien las pidió."""
+        self._id_sondeo = None
+        while True:
+            try:
+                ruta_imagen, clave, imagen_pil, error, al_cargar = self._terminados.get_nowait()
+            except queue.Empty:
+                break
+            self._pendientes -= 1
+            if error is None and imagen_pil is None:
+                # Revalidación sin cambios: la imagen en memoria ya se entregó al pedirla (aunque
+                # después haya salido del caché)
+                continue
+            imagen_tk = None
+            entrada = self._en_memoria.get(ruta_imagen)
+            try:
+                if error is not None:
+                    self._en_memoria.pop(ruta_imagen, None) # El archivo desapareció o ya no se puede leer
+                elif entrada is not None and entrada[0] == clave:
+                    imagen_tk = entrada[1] # Otro pedido del mismo archivo ya la convirtió
+                else:
+                    from PIL import ImageTk
+                    imagen_tk = ImageTk.PhotoImage(imagen_pil)
+                    self._guardar_en_memoria(ruta_imagen, clave, imagen_tk)
+            except Exception as e:
+                imagen_tk, error = None, e
+            try:
+                al_cargar(imagen_tk, error)
+            except Exception as e:
+                print(f"ERROR (cache_imagenes): Falló la entrega de una imagen: {e}")
+
+        if self._pendientes > 0 and self._widget_sondeo is not None and self._widget_sondeo.winfo_exists():
+            self._id_sondeo = self._widget_sondeo.after(_INTERVALO_SONDEO_MS, self._recoger_terminados)
+
+    def _guardar_en_memoria(self, ruta_imagen, clave, imagen_tk):
+        self._en_memoria[ruta_imagen] = (clave, imagen_tk)
+        self._en_memoria.move_to_end(ruta_imagen)
+        while len(self._en_memoria) > self.max_en_memoria:
+            self._en_memoria.popitem(last=False)
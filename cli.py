@@ -0,0 +1,182 @@
+# cli.py
+# Línea de comandos para tareas programadas y scripts (cron, planillas, etiquetas) sin abrir la
+# aplicación: no importa tkinter ni PIL y arranca en una fracción de segundo. Reutiliza
+# data_manager y auth_handler; solo carga lo que el comando necesita (los usuarios para
+# autenticar, el catálogo recién si se consulta) y responde siempre en JSON por la salida estándar.
+#
+#     python cli.py producto "Balanza X200"
+#     python cli.py buscar bal --limite 10           (por prefijo; --aproximada: tolerante a errores)
+#     python cli.py stock --bajo                     (solo administradores)
+#     python cli.py exportar catalogo.csv            (solo administradores; .csv o .xlsx)
+#     python cli.py registro --desde 2024-05-01 --usuario ana --limite 50   (solo administradores)
+#     python cli.py analitica --top 20 --dias 30     (solo administradores)
+#
+# Las credenciales se toman de --usuario (o BALANZAS_USUARIO) y de la variable de entorno
+# BALANZAS_CONTRASENA; si falta la contraseña y hay una terminal, se pide sin mostrarla.
+# Códigos de salida: 0 correcto, 1 sin resultado o error, 2 uso incorrecto, 3 acceso denegado.
+
+import os
+import sys
+import json
+import getpass
+import argparse
+import datetime
+import contextlib
+import collections
+
+from config import BUSQUEDA_DIFUSA_LIMITE
+import data_manager
+import auth_handler
+from excel_logger import registrar_accion_en_diario, iterar_registro_actividad, ENCABEZADOS_LOG
+
+SALIDA_OK, SALIDA_SIN_RESULTADO, SALIDA_USO, SALIDA_ACCESO_DENEGADO = 0, 1, 2, 3
+
+# Claves de cada acción del registro en la salida JSON (mismo orden que ENCABEZADOS_LOG)
+CLAVES_REGISTRO = ["fecha", "usuario", "rol", "accion", "detalles", "duracion_min"]
+
+class ErrorComando(Exception):
+    """Error que se informa como {'error': ...} con el código de salida indicado."""
+
+    def __init__(self, mensaje, codigo_salida=SALIDA_SIN_RESULTADO):
+        super().__init__(mensaje)
+        self.codigo_salida = codigo_salida
+
+# --- Sesión ---
+def _iniciar_sesion(usuario, requiere_administrador):
+    """Autentica al usuario y lo deja como usuario_actual (para el registro de actividad)."""
+    usuario = usuario or os.environ.get("BALANZAS_USUARIO")
+    if not usuario:
+        raise ErrorComando("Indique el usuario con --usuario o la variable BALANZAS_USUARIO.", SALIDA_USO)
+    contrasena = os.environ.get("BALANZAS_CONTRASENA")
+    if contrasena is None:
+        if not sys.stdin.isatty():
+            raise ErrorComando("Falta la contraseña: defina BALANZAS_CONTRASENA.", SALIDA_USO)
+        contrasena = getpass.getpass(f"Contraseña de {usuario}: ", stream=sys.stderr)
+    datos_usuario = auth_handler.autenticar_usuario(usuario, contrasena)
+    if datos_usuario is None:
+        raise ErrorComando("Usuario o contraseña incorrectos.", SALIDA_ACCESO_DENEGADO)
+    if requiere_administrador and datos_usuario["rol"] != "administrador":
+        raise ErrorComando("Este comando es solo para administradores.", SALIDA_ACCESO_DENEGADO)
+    data_manager.usuario_actual = datos_usuario
+    data_manager.hora_inicio_sesion_actual = datetime.datetime.now()
+
+# --- Comandos ---
+def comando_producto(argumentos):
+    datos_producto = data_manager.get_producto_data(argumentos.nombre)
+    registrar_accion_en_diario("Consulta Producto (CLI)", f"Producto: {argumentos.nombre}")
+    if datos_producto is None:
+        raise ErrorComando(f"Producto '{argumentos.nombre}' no encontrado.")
+    return {"nombre": argumentos.nombre, "datos": dict(datos_producto)}
+
+def comando_buscar(argumentos):
+    if argumentos.aproximada:
+        similares = data_manager.buscar_productos_similares(argumentos.texto, limite=argumentos.limite or BUSQUEDA_DIFUSA_LIMITE)
+        return {"resultados": [{"nombre": nombre, "puntaje": round(puntaje, 4)} for nombre, puntaje in similares]}
+    return {"resultados": data_manager.buscar_productos_por_prefijo(argumentos.texto, limite=argumentos.limite)}
+
+def comando_stock(argumentos):
+    resumen = data_manager.get_resumen_stock()
+    for clave in ("por_bateria", "por_prefijo_serie"):
+        resumen[clave] = {str(grupo): {"stock": stock, "productos": cantidad} for grupo, (stock, cantidad) in resumen[clave].items()}
+    if argumentos.bajo:
+        resumen["productos_stock_bajo"] = data_manager.get_productos_stock_bajo()
+    return resumen
+
+def comando_exportar(argumentos):
+    import importacion_catalogo # Solo este comando lo necesita
+    try:
+        cantidad = importacion_catalogo.exportar_catalogo(argumentos.archivo)
+    except ValueError as e:
+        raise ErrorComando(str(e), SALIDA_USO)
+    registrar_accion_en_diario("Exportacion Catalogo (CLI)", f"Archivo: {os.path.basename(argumentos.archivo)}, Productos: {cantidad}")
+    return {"archivo": os.path.abspath(argumentos.archivo), "productos": cantidad}
+
+def _fecha(texto):
+    try:
+        return datetime.datetime.strptime(texto, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha inválida '{texto}' (use AAAA-MM-DD)")
+
+def comando_registro(argumentos):
+    """Acciones del registro que cumplen los filtros; con --limite, solo las últimas N."""
+    desde = argumentos.desde.isoformat() if argumentos.desde else None
+    hasta = argumentos.hasta.isoformat() if argumentos.hasta else None
+    accion_buscada = argumentos.accion.lower() if argumentos.accion else None
+    coincidencias = collections.deque(maxlen=argumentos.limite)
+    # Con --desde/--hasta solo se abren los archivos de los períodos que se superponen
+    for fila in iterar_registro_actividad(desde, hasta):
+        fila = (list(fila) + [None] * len(ENCABEZADOS_LOG))[:len(ENCABEZADOS_LOG)]
+        if argumentos.usuario_registro and fila[1] != argumentos.usuario_registro:
+            continue
+        if accion_buscada and accion_buscada not in str(fila[3] or "").lower():
+            continue
+        coincidencias.append(dict(zip(CLAVES_REGISTRO, fila)))
+    return {"acciones": list(coincidencias)}
+
+def comando_analitica(argumentos):
+    import analitica_registro # Solo este comando lo necesita
+    return analitica_registro.obtener_estadisticas(top=argumentos.top, dias=argumentos.dias)
+
+# {comando: (función, requiere_administrador)}
+COMANDOS = {
+    "producto": (comando_producto, False),
+    "buscar": (comando_buscar, False),
+    "stock": (comando_stock, True),
+    "exportar": (comando_exportar, True),
+    "registro": (comando_registro, True),
+    "analitica": (comando_analitica, True),
+}
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Consultas al catálogo y al registro de actividad sin abrir la aplicación (salida JSON).")
+    parser.add_argument("--usuario", help="Usuario con el que se autentica (o BALANZAS_USUARIO)")
+    parser.add_argument("--indentar", action="store_true", help="JSON indentado, para leerlo a simple vista")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    sub = subcomandos.add_parser("producto", help="Datos de un producto")
+    sub.add_argument("nombre")
+
+    sub = subcomandos.add_parser("buscar", help="Nombres de productos por prefijo (o aproximados)")
+    sub.add_argument("texto")
+    sub.add_argument("--limite", type=int, default=None, help="Máximo de resultados")
+    sub.add_argument("--aproximada", action="store_true", help="Búsqueda tolerante a errores (nombre, serie, batería, info)")
+
+    sub = subcomandos.add_parser("stock", help="Totales de stock (solo administradores)")
+    sub.add_argument("--bajo", action="store_true", help="Incluir la lista de productos con stock bajo")
+
+    sub = subcomandos.add_parser("exportar", help="Exporta el catálogo a .csv o .xlsx (solo administradores)")
+    sub.add_argument("archivo")
+
+    sub = subcomandos.add_parser("registro", help="Consulta el registro de actividad (solo administradores)")
+    sub.add_argument("--desde", type=_fecha, help="Primer día incluido (AAAA-MM-DD)")
+    sub.add_argument("--hasta", type=_fecha, help="Último día incluido (AAAA-MM-DD)")
+    sub.add_argument("--usuario", dest="usuario_registro", help="Solo las acciones de este usuario")
+    sub.add_argument("--accion", help="Solo las acciones que contienen este texto (p. ej. 'Producto')")
+    sub.add_argument("--limite", type=int, default=None, help="Solo las últimas N acciones")
+
+    sub = subcomandos.add_parser("analitica", help="Estadísticas del registro de actividad (solo administradores)")
+    sub.add_argument("--top", type=int, default=10, help="Cantidad de productos más consultados (por defecto 10)")
+    sub.add_argument("--dias", type=int, default=None, help="Solo los últimos N días en las acciones por día")
+    return parser
+
+def main(argv=None):
+    argumentos = crear_parser().parse_args(argv)
+    funcion, requiere_administrador = COMANDOS[argumentos.comando]
+    # Los módulos informan por consola con print(): se desvían a stderr para que la salida
+    # estándar tenga solo el JSON
+    salida_json = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            _iniciar_sesion(argumentos.usuario, requiere_administrador)
+            resultado, codigo_salida = funcion(argumentos), SALIDA_OK
+        except ErrorComando as e:
+            resultado, codigo_salida = {"error": str(e)}, e.codigo_salida
+        except OSError as e:
+            resultado, codigo_salida = {"error": str(e)}, SALIDA_SIN_RESULTADO
+        data_manager.flush() # Lo que quede pendiente (p. ej. un users.json restaurado desde un respaldo)
+    json.dump(resultado, salida_json, ensure_ascii=False, indent=2 if argumentos.indentar else None, default=str)
+    salida_json.write("\n")
+    return codigo_salida
+
+if __name__ == "__main__":
+    sys.exit(main())
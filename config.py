@@ -26,9 +26,16 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 IMAGENES_PRODUCTOS_DIR_NAME = "imagenes_productos"
 IMAGENES_PRODUCTOS_PATH = os.path.join(BASE_DIR, IMAGENES_PRODUCTOS_DIR_NAME)
 
+# Caché de miniaturas de imágenes de productos (en disco y en memoria)
+CACHE_DIR_NAME = "cache"
+MINIATURAS_CACHE_PATH = os.path.join(BASE_DIR, CACHE_DIR_NAME, "miniaturas")
+TAMANO_MINIATURA_PRODUCTO = (200, 250) # Ancho x alto máximo con que se muestra la imagen del producto
+CACHE_IMAGENES_MAX_EN_MEMORIA = 64 # Cantidad de imágenes listas para mostrar que se conservan en memoria
+
 # Directorio para los manuales de los productos (PDFs locales)
 MANUALES_PRODUCTOS_DIR_NAME = "manuales_productos"
 MANUALES_PRODUCTOS_PATH = os.path.join(BASE_DIR, MANUALES_PRODUCTOS_DIR_NAME)
+RECURSOS_INTERVALO_VERIFICACION_SEG = 2.0 # Cada cuánto se verifica si la carpeta de manuales cambió (la lista de archivos se guarda en memoria)
 
 # Archivo de log de Excel
 EXCEL_LOG_FILENAME = "registro_actividad_balanzas.xlsx"
@@ -36,6 +43,24 @@ LOGS_DIR_NAME = "logs"
 LOGS_PATH = os.path.join(BASE_DIR, LOGS_DIR_NAME)
 EXCEL_LOG_FILE_FULL_PATH = os.path.join(LOGS_PATH, EXCEL_LOG_FILENAME)
 
+# Diario (JSONL) donde el hilo escritor acumula las acciones antes de volcarlas al Excel
+EXCEL_LOG_JOURNAL_FILENAME = "registro_actividad_pendiente.jsonl"
+EXCEL_LOG_JOURNAL_FULL_PATH = os.path.join(LOGS_PATH, EXCEL_LOG_JOURNAL_FILENAME)
+EXCEL_LOG_LOTE_MAXIMO = 200 # Entradas máximas que el hilo escritor agrupa en una sola escritura
+EXCEL_LOG_INTERVALO_COMPACTACION_SEG = 300 # Cada cuántos segundos se vuelca el diario al Excel
+
+# Rotación del registro: el libro vigente se archiva al cambiar de mes o al llegar a un máximo de filas
+EXCEL_LOG_ARCHIVO_DIR_NAME = "archivo"
+EXCEL_LOG_ARCHIVO_PATH = os.path.join(LOGS_PATH, EXCEL_LOG_ARCHIVO_DIR_NAME)
+EXCEL_LOG_INDICE_FILENAME = "indice_registro.json" # Rango de fechas de cada archivo, para leer solo los que interesan
+EXCEL_LOG_INDICE_FULL_PATH = os.path.join(LOGS_PATH, EXCEL_LOG_INDICE_FILENAME)
+EXCEL_LOG_ROTACION_MAX_FILAS = 50000 # Filas máximas del libro vigente antes de archivarlo aunque no cambie el mes
+EXCEL_LOG_MESES_SIN_COMPRIMIR = 2 # Los archivos de meses anteriores a estos se comprimen (.jsonl.gz)
+
+# Totales del registro de actividad ya calculados (analitica_registro.py), con el cursor de filas contadas por libro
+ANALITICA_RESUMEN_FILENAME = "analitica_registro.json"
+ANALITICA_RESUMEN_FULL_PATH = os.path.join(LOGS_PATH, ANALITICA_RESUMEN_FILENAME)
+
 DATA_FOLDER_NAME = "data"
 DATA_PATH = os.path.join(BASE_DIR, DATA_FOLDER_NAME)
 
@@ -44,6 +69,84 @@ PRODUCTS_DATA_FILENAME = "products.json"
 USERS_DATA_FILE_FULL_PATH = os.path.join(DATA_PATH, USERS_DATA_FILENAME)
 PRODUCTS_DATA_FILE_FULL_PATH = os.path.join(DATA_PATH, PRODUCTS_DATA_FILENAME)
 
+# Hash de contraseñas (ver hash_contrasenas.py): "pbkdf2_sha256" o "scrypt". El costo se calibra
+# una vez en este equipo para que verificar una contraseña tarde alrededor del tiempo objetivo;
+# los hash SHA-256 sin sal de versiones anteriores se reemplazan al iniciar sesión.
+CONTRASENA_KDF_ALGORITMO = "pbkdf2_sha256"
+CONTRASENA_KDF_TIEMPO_OBJETIVO_MS = 250
+CONTRASENA_KDF_CALIBRACION_FILENAME = "kdf_calibracion.json"
+CONTRASENA_KDF_CALIBRACION_FULL_PATH = os.path.join(DATA_PATH, CONTRASENA_KDF_CALIBRACION_FILENAME)
+
+# Backend de almacenamiento de productos y usuarios: "json" (users.json / products.json)
+# o "sqlite" (base en modo WAL; la primera vez se migra automáticamente desde los JSON).
+DATA_BACKEND = "json"
+SQLITE_DATA_FILENAME = "balanzas.db"
+SQLITE_DATA_FILE_FULL_PATH = os.path.join(DATA_PATH, SQLITE_DATA_FILENAME)
+
+# Guardado de los JSON de datos: los cambios se agrupan y se escriben tras una pausa sin
+# modificaciones (nunca más tarde que la espera máxima), conservando generaciones de respaldo.
+JSON_GUARDADO_ESPERA_SEG = 1.0
+JSON_GUARDADO_ESPERA_MAXIMA_SEG = 10.0
+JSON_GENERACIONES_RESPALDO = 3 # products.json.1 ... products.json.3
+
+# Diario de cambios compartido entre estaciones que usan la misma carpeta 'data' (ver diario_cambios.py)
+CAMBIOS_DIARIO_FILENAME = "cambios.jsonl"
+CAMBIOS_DIARIO_FULL_PATH = os.path.join(DATA_PATH, CAMBIOS_DIARIO_FILENAME)
+CAMBIOS_SNAPSHOT_FILENAME = "cambios_snapshot.json" # Hasta qué cambio incluye cada snapshot (products.json / users.json)
+CAMBIOS_SNAPSHOT_FULL_PATH = os.path.join(DATA_PATH, CAMBIOS_SNAPSHOT_FILENAME)
+CAMBIOS_SONDEO_MS = 2000 # Cada cuánto la interfaz busca cambios hechos por otras estaciones
+CAMBIOS_BLOQUEO_ESPERA_MAXIMA_SEG = 10.0 # Espera máxima por el bloqueo del diario antes de fallar
+CAMBIOS_BLOQUEO_RENOVACION_SEG = 5.0 # Cada cuánto la estación que tiene el bloqueo lo renueva
+CAMBIOS_BLOQUEO_VENCIDO_SEG = 30.0 # Un bloqueo que no se renovó en este tiempo (reloj local) se considera abandonado
+CAMBIOS_DIARIO_MAX_BYTES = 1_000_000 # Al superarlo, el diario se compacta al guardar los datos
+
+# Índice de trigramas para la búsqueda tolerante a errores (se guarda junto a products.json)
+PRODUCTS_TRIGRAM_INDEX_FILENAME = "products_trigramas.json"
+PRODUCTS_TRIGRAM_INDEX_FULL_PATH = os.path.join(DATA_PATH, PRODUCTS_TRIGRAM_INDEX_FILENAME)
+BUSQUEDA_DIFUSA_LIMITE = 20 # Máximo de sugerencias aproximadas que se agregan a la lista
+BUSQUEDA_DIFUSA_UMBRAL = 0.35 # Puntaje mínimo (0 a 1) para considerar una coincidencia aproximada
+BUSQUEDA_DIFUSA_MIN_CARACTERES = 3 # Largo mínimo del texto para activar la búsqueda aproximada
+BUSQUEDA_ESPERA_TECLEO_MS = 150 # Pausa de tecleo (anti-rebote) antes de recalcular las sugerencias
+BUSQUEDA_SONDEO_RESULTADOS_MS = 16 # Frecuencia con la que la interfaz recoge los resultados del hilo de búsqueda
+
+# Tareas en segundo plano de la interfaz (ver tareas_segundo_plano.py)
+TAREAS_HILOS = 4 # Hilos de trabajo para guardados, importaciones, verificación de contraseñas, etc.
+TAREAS_SONDEO_MS = 30 # Frecuencia con la que la interfaz recoge los resultados mientras hay tareas en curso
+TAREAS_ESPERA_CIERRE_SEG = 15 # Al cerrar, espera máxima para que terminen las tareas en curso (p. ej. un guardado)
+
+# Búsqueda de texto dentro de los manuales PDF (requiere el paquete opcional pypdf)
+MANUALES_INDICE_FILENAME = "manuales_indice.json"
+MANUALES_INDICE_FULL_PATH = os.path.join(DATA_PATH, MANUALES_INDICE_FILENAME)
+MANUALES_INDICE_PROCESOS = None # Procesos para extraer texto (None: uno por núcleo)
+MANUALES_INDICE_MIN_ARCHIVOS_POOL = 8 # Con menos manuales por indexar no vale la pena arrancar el pool
+MANUALES_BUSQUEDA_LIMITE = 20 # Páginas máximas que se muestran por búsqueda
+
+# Resumen de stock (se mantiene al día con cada alta, edición o baja, sin recorrer el catálogo)
+STOCK_BAJO_UMBRAL = 2 # Un producto con stock menor o igual a este valor se considera con stock bajo
+
+# Servidor HTTP/JSON de solo lectura (servidor_http.py) para otras herramientas del taller
+# (impresoras de etiquetas, kiosco web). Solo atiende direcciones locales o de la red privada.
+SERVIDOR_HTTP_HOST = "127.0.0.1" # "0.0.0.0" para atender también a la red local
+SERVIDOR_HTTP_PUERTO = 8765
+SERVIDOR_HTTP_HILOS = 8 # Hilos del pool que atienden las solicitudes
+SERVIDOR_HTTP_KEEPALIVE_SEG = 5 # Una conexión persistente inactiva se cierra pasado este tiempo
+SERVIDOR_HTTP_CACHE_MAX_ENTRADAS = 1024 # Respuestas JSON guardadas en memoria (se descartan al cambiar el catálogo)
+SERVIDOR_HTTP_GZIP_MIN_BYTES = 1024 # Respuestas más chicas se envían sin comprimir
+SERVIDOR_HTTP_BUSQUEDA_LIMITE = 50 # Resultados por búsqueda si la solicitud no indica 'limite'
+
+# Arranque: presupuestos de tiempo. Si se superan (o si openpyxl/PIL ya están cargados al mostrar
+# el login) se avisa por consola, así una importación anticipada nueva se nota de inmediato.
+ARRANQUE_PRESUPUESTO_LOGIN_MS = 800 # Desde que arranca el proceso hasta que la ventana de login es visible
+ARRANQUE_PRESUPUESTO_PRIMERA_BUSQUEDA_MS = 1500 # Desde el login exitoso hasta las primeras sugerencias en pantalla
+
+# Instrumentación opcional: tiempos por operación (cantidad, p50/p95/p99, máximo) exportados
+# periódicamente a logs/. Desactivada no tiene costo apreciable.
+INSTRUMENTACION_ACTIVA = False
+INSTRUMENTACION_FORMATO = "json" # "json" o "prometheus" (formato de texto de Prometheus)
+INSTRUMENTACION_ARCHIVO_FULL_PATH = os.path.join(LOGS_PATH, "metricas_rendimiento.prom" if INSTRUMENTACION_FORMATO == "prometheus" else "metricas_rendimiento.json")
+INSTRUMENTACION_INTERVALO_EXPORTACION_SEG = 60
+INSTRUMENTACION_MUESTRAS_POR_OPERACION = 2048 # Últimas duraciones conservadas para calcular los cuantiles
+
 # NUEVO: Directorio y ruta para el ícono de la aplicación
 LOGO_APP_DIR_NAME = "logo_app_jr" # Nombre de la nueva carpeta propuesta
 LOGO_APP_PATH = os.path.join(BASE_DIR, LOGO_APP_DIR_NAME)
@@ -1,17 +1,119 @@
 # data_manager.py
 
 import hashlib
-import json
 import os
-from config import USERS_DATA_FILE_FULL_PATH, PRODUCTS_DATA_FILE_FULL_PATH, DATA_PATH
+import bisect
+import atexit
+import threading
+import functools
+from types import MappingProxyType
+from config import (USERS_DATA_FILE_FULL_PATH, PRODUCTS_DATA_FILE_FULL_PATH, DATA_PATH,
+                    PRODUCTS_TRIGRAM_INDEX_FULL_PATH, BUSQUEDA_DIFUSA_LIMITE, BUSQUEDA_DIFUSA_UMBRAL,
+                    DATA_BACKEND, SQLITE_DATA_FILE_FULL_PATH,
+                    JSON_GUARDADO_ESPERA_SEG, JSON_GUARDADO_ESPERA_MAXIMA_SEG, JSON_GENERACIONES_RESPALDO,
+                    STOCK_BAJO_UMBRAL)
+import instrumentacion
+from agregados_stock import AgregadosStock
+from indice_trigramas import IndiceTrigramas, normalizar_texto_busqueda
+from persistencia_json import escribir_json_atomico, cargar_json_con_recuperacion, GuardadoDiferido
+from diario_cambios import DiarioCambios, DiarioReiniciado, ConflictoDeVersion
 
 # --- Estado del Usuario Actual (global a este módulo) ---
 usuario_actual = {"nombre": None, "rol": None}
 hora_inicio_sesion_actual = None
 
 # --- Variables en memoria para almacenar los datos cargados ---
+# Cada registro se guarda congelado (MappingProxyType): una modificación reemplaza el registro
+# completo en lugar de alterarlo, así las vistas y registros entregados nunca cambian por debajo.
+# Los diccionarios se vacían y rellenan al recargar (no se reasignan) para que las vistas sigan vivas.
 _usuarios_data = {}
 _productos_data = {}
+_vista_usuarios = MappingProxyType(_usuarios_data)
+_vista_productos = MappingProxyType(_productos_data)
+
+# Generaciones: aumentan con cada carga o modificación. Quien calcula algo a partir de los datos
+# puede guardar la generación usada y omitir el recálculo mientras no cambie.
+_generacion_usuarios = 0
+_generacion_productos = 0
+
+# --- Índice ordenado de nombres de productos para la búsqueda por prefijo ---
+# Lista ordenada de tuplas (nombre_normalizado, nombre_original). Se mantiene de forma
+# incremental en las funciones de registro/eliminación, así cada búsqueda es O(log n + k).
+_indice_nombres_productos = []
+
+# Índice de trigramas (nombre, serie, batería, info) para la búsqueda tolerante a errores
+_indice_trigramas = IndiceTrigramas()
+
+# Totales de stock (global, por batería, por prefijo de serie, stock bajo), al día con cada cambio
+_agregados_stock = AgregadosStock(STOCK_BAJO_UMBRAL)
+
+# Las búsquedas se calculan en un hilo de trabajo (motor_busqueda), así que los cambios
+# al catálogo y a sus índices, y las lecturas de los índices, se hacen bajo este candado.
+_lock_productos = threading.RLock()
+# Los usuarios también se guardan desde el hilo de guardado diferido, por eso tienen su propio candado.
+_lock_usuarios = threading.RLock()
+
+# Almacén SQLite (solo si config.DATA_BACKEND == "sqlite"; con None se usan los archivos JSON)
+_almacen_sqlite = None
+
+# --- Diario de cambios compartido con otras estaciones (ver diario_cambios.py) ---
+# Cada modificación se agrega primero al diario y después se aplica en memoria. Las versiones
+# son la secuencia del último cambio del diario que tocó cada registro (0 si no figura en él).
+_diario = DiarioCambios()
+_versiones = {"producto": {}, "usuario": {}} # {entidad: {nombre: secuencia}}
+# Hasta qué secuencia del diario está aplicada cada entidad (None: todavía no se cargó)
+_secuencia_aplicada = {"producto": None, "usuario": None}
+
+# Guardados diferidos del backend JSON: varias modificaciones seguidas producen una sola escritura.
+# Se crean más abajo, una vez definidas las funciones de guardado.
+_guardado_productos = None
+_guardado_usuarios = None
+
+# --- Carga diferida ---
+# Importar este módulo no lee los archivos de datos. La carga ocurre la primera vez que se
+# necesitan los datos, o antes en segundo plano con iniciar_carga_en_segundo_plano() (la app
+# la lanza mientras se muestra el login). Los usuarios y los productos se cargan por separado
+# para que el login no espere al catálogo.
+_lock_backend = threading.Lock()
+_backend_inicializado = False
+_lock_carga_usuarios = threading.Lock()
+_lock_carga_productos = threading.Lock()
+_usuarios_cargados = threading.Event()
+_productos_cargados = threading.Event()
+
+def _asegurar_usuarios_cargados():
+    """Carga los usuarios si todavía no se cargaron (si hay una carga en curso, la espera)."""
+    with _lock_carga_usuarios:
+        if not _usuarios_cargados.is_set():
+            _asegurar_backend_inicializado()
+            _cargar_usuarios()
+            _usuarios_cargados.set()
+
+def _asegurar_productos_cargados():
+    """Carga el catálogo si todavía no se cargó (si hay una carga en curso, la espera)."""
+    with _lock_carga_productos:
+        if not _productos_cargados.is_set():
+            _asegurar_backend_inicializado()
+            _cargar_productos()
+            _productos_cargados.set()
+
+def _requiere_usuarios(funcion):
+    """Decorador: asegura que los usuarios estén cargados antes de ejecutar la función."""
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        if not _usuarios_cargados.is_set():
+            _asegurar_usuarios_cargados()
+        return funcion(*args, **kwargs)
+    return envoltura
+
+def _requiere_productos(funcion):
+    """Decorador: asegura que el catálogo esté cargado antes de ejecutar la función."""
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        if not _productos_cargados.is_set():
+            _asegurar_productos_cargados()
+        return funcion(*args, **kwargs)
+    return envoltura
 
 def _asegurar_directorio_datos():
     """Asegura que el directorio 'data' exista. Lo crea si no existe."""
@@ -22,141 +124,675 @@ def _asegurar_directorio_datos():
         except OSError as e:
             print(f"ADVERTENCIA (data_manager): No se pudo crear el directorio de datos '{DATA_PATH}': {e}")
 
-def _cargar_usuarios():
-    """Carga los datos de usuarios desde users.json."""
-    global _usuarios_data
+def _congelar_registro(datos):
+    """Retorna una vista de solo lectura sobre una copia del registro."""
+    return MappingProxyType(dict(datos))
+
+def _reemplazar_usuarios_en_memoria(usuarios):
+    """Reemplaza el contenido de _usuarios_data (congelando cada registro) y avanza la generación."""
+    global _generacion_usuarios
+    with _lock_usuarios:
+        _usuarios_data.clear()
+        _usuarios_data.update((nombre, _congelar_registro(datos)) for nombre, datos in usuarios.items())
+        _generacion_usuarios += 1
+
+def _reemplazar_productos_en_memoria(productos):
+    """Reemplaza el contenido de _productos_data (congelando cada registro) y avanza la generación."""
+    global _generacion_productos
+    with _lock_productos:
+        _productos_data.clear()
+        _productos_data.update((nombre, _congelar_registro(datos)) for nombre, datos in productos.items())
+        _agregados_stock.reiniciar(_productos_data)
+        _generacion_productos += 1
+
+def _asegurar_backend_inicializado():
+    global _backend_inicializado
+    with _lock_backend:
+        if not _backend_inicializado:
+            _inicializar_backend_almacenamiento()
+            _backend_inicializado = True
+
+def _inicializar_backend_almacenamiento():
+    """Prepara el backend SQLite si está configurado, migrando una única vez desde los JSON."""
+    global _almacen_sqlite
+    if DATA_BACKEND != "sqlite":
+        return
+    from almacenamiento_sqlite import AlmacenSQLite, migrar_json_a_sqlite
+    _asegurar_directorio_datos()
+    if not os.path.exists(SQLITE_DATA_FILE_FULL_PATH):
+        print(f"INFO (data_manager): Base SQLite '{SQLITE_DATA_FILE_FULL_PATH}' no encontrada. Migrando desde los archivos JSON.")
+        try:
+            migrar_json_a_sqlite()
+        except Exception as e:
+            print(f"ERROR (data_manager): Falló la migración a SQLite: {e}. Se inicia con la base vacía.")
+    _almacen_sqlite = AlmacenSQLite()
+
+@instrumentacion.medido("data_manager.cargar_usuarios")
+def _cargar_usuarios(reintento=False):
+    """Carga los datos de usuarios desde users.json (o desde la base SQLite) y les aplica el diario de cambios."""
     _asegurar_directorio_datos() # Asegurar que el directorio exista antes de operar
+    _secuencia_aplicada["usuario"] = None
+    # La secuencia se lee antes que los datos: si otra estación los reemplaza entre medio, se
+    # aplican de nuevo algunos cambios que ya incluyen, lo que no altera el resultado.
+    # La base SQLite siempre tiene al menos lo que se descartó del diario al compactarlo ('maxima').
+    secuencias_snapshot = _diario.leer_secuencias_snapshot()
 
-    if not os.path.exists(USERS_DATA_FILE_FULL_PATH):
-        print(f"ADVERTENCIA: Archivo de usuarios '{USERS_DATA_FILE_FULL_PATH}' no encontrado. Inicializando con datos vacíos.")
-        _usuarios_data = {}
-        _guardar_usuarios() # Crea el archivo con estructura básica si no existe
+    if _almacen_sqlite is not None:
+        try:
+            _reemplazar_usuarios_en_memoria(_almacen_sqlite.cargar_usuarios())
+        except Exception as e:
+            print(f"ERROR: No se pudieron cargar los usuarios desde '{SQLITE_DATA_FILE_FULL_PATH}': {e}. Inicializando datos vacíos.")
+            _reemplazar_usuarios_en_memoria({})
+        if not _reproducir_diario("usuario", secuencias_snapshot.get("maxima", 0)) and not reintento:
+            _cargar_usuarios(reintento=True)
         return
 
+    secuencia_snapshot = secuencias_snapshot.get("usuario", 0)
     try:
-        with open(USERS_DATA_FILE_FULL_PATH, 'r', encoding='utf-8') as f:
-            _usuarios_data = json.load(f)
-    except json.JSONDecodeError as e:
-        print(f"ERROR: Error al decodificar JSON de usuarios desde '{USERS_DATA_FILE_FULL_PATH}': {e}. Inicializando datos vacíos.")
-        _usuarios_data = {}
+        # Si users.json quedó dañado (p. ej. un corte de luz), se recupera la última generación válida
+        datos_leidos, ruta_leida = cargar_json_con_recuperacion(USERS_DATA_FILE_FULL_PATH, JSON_GENERACIONES_RESPALDO)
+        _reemplazar_usuarios_en_memoria(datos_leidos)
+        if ruta_leida != USERS_DATA_FILE_FULL_PATH:
+            secuencia_snapshot = 0 # Un respaldo es anterior al snapshot registrado: se aplica todo el diario
+            _guardado_usuarios.marcar_modificado() # Restaura users.json a partir del respaldo recuperado
+    except FileNotFoundError:
+        print(f"ADVERTENCIA: Archivo de usuarios '{USERS_DATA_FILE_FULL_PATH}' no encontrado. Inicializando con datos vacíos.")
+        _reemplazar_usuarios_en_memoria({})
+        _guardar_usuarios() # Crea el archivo con estructura básica si no existe
+    except ValueError as e:
+        print(f"ERROR: Error al decodificar JSON de usuarios desde '{USERS_DATA_FILE_FULL_PATH}' y sus respaldos: {e}. Inicializando datos vacíos.")
+        _reemplazar_usuarios_en_memoria({})
     except Exception as e:
         print(f"ERROR: No se pudieron cargar los datos de usuarios desde '{USERS_DATA_FILE_FULL_PATH}': {e}. Inicializando datos vacíos.")
-        _usuarios_data = {}
+        _reemplazar_usuarios_en_memoria({})
+    if not _reproducir_diario("usuario", secuencia_snapshot) and not reintento:
+        _cargar_usuarios(reintento=True)
 
+@instrumentacion.medido("data_manager.guardar_usuarios")
 def _guardar_usuarios():
-    """Guarda los datos de usuarios en users.json."""
+    """
+    Guarda todos los datos de usuarios en users.json (o en la base SQLite).
+    En JSON la escritura es atómica y conserva generaciones anteriores. Retorna True si se guardó.
+    """
     _asegurar_directorio_datos() # Asegurar que el directorio exista antes de operar
+    if _almacen_sqlite is not None:
+        with _lock_usuarios:
+            usuarios_a_guardar = {nombre: dict(datos) for nombre, datos in _usuarios_data.items()}
+        try:
+            _almacen_sqlite.reemplazar_usuarios(usuarios_a_guardar)
+            return True
+        except Exception as e:
+            print(f"ERROR: No se pudieron guardar los datos de usuarios en '{SQLITE_DATA_FILE_FULL_PATH}': {e}")
+            return False
     try:
-        with open(USERS_DATA_FILE_FULL_PATH, 'w', encoding='utf-8') as f:
-            json.dump(_usuarios_data, f, indent=2, ensure_ascii=False)
+        # Bajo el bloqueo del diario: el snapshot incluye los cambios de las demás estaciones y
+        # queda registrado hasta qué secuencia llega, sin que otra lo reemplace entre medio
+        with _diario.bloquear():
+            _sincronizar_diario()
+            with _lock_usuarios:
+                # Copia de cada registro: la serialización ocurre fuera del candado
+                usuarios_a_guardar = {nombre: dict(datos) for nombre, datos in _usuarios_data.items()}
+                secuencia = _secuencia_aplicada["usuario"] or 0
+            escribir_json_atomico(USERS_DATA_FILE_FULL_PATH, usuarios_a_guardar, JSON_GENERACIONES_RESPALDO, indent=2, ensure_ascii=False)
+            _diario.registrar_snapshot("usuario", secuencia)
+            _diario.compactar_si_corresponde()
         print(f"INFO (data_manager): Datos de usuarios guardados exitosamente en '{USERS_DATA_FILE_FULL_PATH}'.")
+        return True
     except Exception as e:
         print(f"ERROR: No se pudieron guardar los datos de usuarios en '{USERS_DATA_FILE_FULL_PATH}': {e}")
+        return False
 
-def _cargar_productos():
-    """Carga los datos de productos desde products.json."""
-    global _productos_data
+def _persistir_usuario(nombre_usuario):
+    """
+    Lleva a disco el cambio de un usuario: en SQLite se escribe solo su fila; en JSON se
+    programa un guardado diferido que agrupa los cambios cercanos en una sola escritura.
+    """
+    if _almacen_sqlite is None:
+        _guardado_usuarios.marcar_modificado()
+        return
+    try:
+        if nombre_usuario in _usuarios_data:
+            _almacen_sqlite.guardar_usuario(nombre_usuario, _usuarios_data[nombre_usuario])
+        else:
+            _almacen_sqlite.eliminar_usuario(nombre_usuario)
+        _diario.compactar_si_corresponde(incluido_hasta=_diario.ultima_secuencia) # La base ya tiene todo lo del diario
+    except Exception as e:
+        print(f"ERROR: No se pudo guardar el usuario '{nombre_usuario}' en '{SQLITE_DATA_FILE_FULL_PATH}': {e}")
+
+@instrumentacion.medido("data_manager.cargar_productos")
+def _cargar_productos(reintento=False):
+    """Carga los datos de productos desde products.json (o desde la base SQLite) y les aplica el diario de cambios."""
     _asegurar_directorio_datos() # Asegurar que el directorio exista antes de operar
+    _secuencia_aplicada["producto"] = None
+    secuencias_snapshot = _diario.leer_secuencias_snapshot() # Antes que los datos (ver _cargar_usuarios)
 
-    if not os.path.exists(PRODUCTS_DATA_FILE_FULL_PATH):
-        print(f"ADVERTENCIA: Archivo de productos '{PRODUCTS_DATA_FILE_FULL_PATH}' no encontrado. Inicializando con datos vacíos.")
-        _productos_data = {}
-        _guardar_productos() # Crea el archivo con estructura básica si no existe
+    if _almacen_sqlite is not None:
+        try:
+            _reemplazar_productos_en_memoria(_almacen_sqlite.cargar_productos())
+        except Exception as e:
+            print(f"ERROR: No se pudieron cargar los productos desde '{SQLITE_DATA_FILE_FULL_PATH}': {e}. Inicializando datos vacíos.")
+            _reemplazar_productos_en_memoria({})
+        _reconstruir_indices_busqueda()
+        if not _reproducir_diario("producto", secuencias_snapshot.get("maxima", 0)) and not reintento:
+            _cargar_productos(reintento=True)
         return
 
+    secuencia_snapshot = secuencias_snapshot.get("producto", 0)
     try:
-        with open(PRODUCTS_DATA_FILE_FULL_PATH, 'r', encoding='utf-8') as f:
-            _productos_data = json.load(f)
-    except json.JSONDecodeError as e:
-        print(f"ERROR: Error al decodificar JSON de productos desde '{PRODUCTS_DATA_FILE_FULL_PATH}': {e}. Inicializando datos vacíos.")
-        _productos_data = {}
+        # Si products.json quedó dañado (p. ej. un corte de luz), se recupera la última generación válida
+        datos_leidos, ruta_leida = cargar_json_con_recuperacion(PRODUCTS_DATA_FILE_FULL_PATH, JSON_GENERACIONES_RESPALDO)
+        _reemplazar_productos_en_memoria(datos_leidos)
+        if ruta_leida != PRODUCTS_DATA_FILE_FULL_PATH:
+            secuencia_snapshot = 0
+            _guardado_productos.marcar_modificado() # Restaura products.json a partir del respaldo recuperado
+    except FileNotFoundError:
+        print(f"ADVERTENCIA: Archivo de productos '{PRODUCTS_DATA_FILE_FULL_PATH}' no encontrado. Inicializando con datos vacíos.")
+        _reemplazar_productos_en_memoria({})
+        _guardar_productos() # Crea el archivo con estructura básica si no existe
+    except ValueError as e:
+        print(f"ERROR: Error al decodificar JSON de productos desde '{PRODUCTS_DATA_FILE_FULL_PATH}' y sus respaldos: {e}. Inicializando datos vacíos.")
+        _reemplazar_productos_en_memoria({})
     except Exception as e:
         print(f"ERROR: No se pudieron cargar los datos de productos desde '{PRODUCTS_DATA_FILE_FULL_PATH}': {e}. Inicializando datos vacíos.")
-        _productos_data = {}
+        _reemplazar_productos_en_memoria({})
+    _reconstruir_indices_busqueda()
+    if not _reproducir_diario("producto", secuencia_snapshot) and not reintento:
+        _cargar_productos(reintento=True)
 
+@instrumentacion.medido("data_manager.guardar_productos")
 def _guardar_productos():
-    """Guarda los datos de productos en products.json."""
+    """
+    Guarda todos los datos de productos en products.json (o en la base SQLite).
+    En JSON la escritura es atómica y conserva generaciones anteriores. Retorna True si se guardó.
+    """
     _asegurar_directorio_datos() # Asegurar que el directorio exista antes de operar
+    if _almacen_sqlite is not None:
+        with _lock_productos:
+            productos_a_guardar = {nombre: dict(datos) for nombre, datos in _productos_data.items()}
+        try:
+            _almacen_sqlite.reemplazar_productos(productos_a_guardar)
+            return True
+        except Exception as e:
+            print(f"ERROR: No se pudieron guardar los datos de productos en '{SQLITE_DATA_FILE_FULL_PATH}': {e}")
+            return False
     try:
-        with open(PRODUCTS_DATA_FILE_FULL_PATH, 'w', encoding='utf-8') as f:
-            json.dump(_productos_data, f, indent=2, ensure_ascii=False)
+        with _diario.bloquear(): # Ver _guardar_usuarios
+            _sincronizar_diario()
+            with _lock_productos:
+                # Copia de cada registro: la serialización ocurre fuera del candado
+                productos_a_guardar = {nombre: dict(datos) for nombre, datos in _productos_data.items()}
+                secuencia = _secuencia_aplicada["producto"] or 0
+            escribir_json_atomico(PRODUCTS_DATA_FILE_FULL_PATH, productos_a_guardar, JSON_GENERACIONES_RESPALDO, indent=2, ensure_ascii=False)
+            _diario.registrar_snapshot("producto", secuencia)
+            _diario.compactar_si_corresponde()
         print(f"INFO (data_manager): Datos de productos guardados exitosamente en '{PRODUCTS_DATA_FILE_FULL_PATH}'.")
+        return True
     except Exception as e:
         print(f"ERROR: No se pudieron guardar los datos de productos en '{PRODUCTS_DATA_FILE_FULL_PATH}': {e}")
+        return False
+
+def _persistir_producto(nombre_producto):
+    """
+    Lleva a disco el cambio de un producto: en SQLite se escribe solo su fila; en JSON se
+    programa un guardado diferido que agrupa los cambios cercanos en una sola escritura.
+    """
+    if _almacen_sqlite is None:
+        _guardado_productos.marcar_modificado()
+        return
+    try:
+        if nombre_producto in _productos_data:
+            _almacen_sqlite.guardar_producto(nombre_producto, _productos_data[nombre_producto])
+        else:
+            _almacen_sqlite.eliminar_producto(nombre_producto)
+        _diario.compactar_si_corresponde(incluido_hasta=_diario.ultima_secuencia) # La base ya tiene todo lo del diario
+    except Exception as e:
+        print(f"ERROR: No se pudo guardar el producto '{nombre_producto}' en '{SQLITE_DATA_FILE_FULL_PATH}': {e}")
+
+# --- Diario de cambios ---
+def _poner_producto_en_memoria(nombre_producto, datos_producto):
+    """Da de alta o reemplaza un producto en memoria y en sus índices (con _lock_productos tomado)."""
+    datos_anteriores = _productos_data.get(nombre_producto)
+    _productos_data[nombre_producto] = registro = _congelar_registro(datos_producto)
+    if datos_anteriores is None:
+        _indexar_nombre_producto(nombre_producto)
+        _indice_trigramas.actualizar_producto(nombre_producto, registro)
+        _agregados_stock.agregar_producto(nombre_producto, registro)
+    else:
+        # El nombre (clave) no cambia al actualizar, por lo que el índice de nombres sigue vigente.
+        _indice_trigramas.actualizar_producto(nombre_producto, registro, datos_anteriores)
+        _agregados_stock.actualizar_producto(nombre_producto, registro, datos_anteriores)
+
+def _quitar_producto_de_memoria(nombre_producto):
+    """Quita un producto de memoria y de sus índices, si existe (con _lock_productos tomado)."""
+    datos_eliminados = _productos_data.pop(nombre_producto, None)
+    if datos_eliminados is not None:
+        _desindexar_nombre_producto(nombre_producto)
+        _indice_trigramas.eliminar_producto(nombre_producto, datos_eliminados)
+        _agregados_stock.quitar_producto(nombre_producto, datos_eliminados)
+
+def _aplicar_cambios_diario(cambios):
+    """
+    Aplica en memoria los cambios del diario que todavía no estén aplicados y anota las versiones.
+    Los de una entidad que no se cargó se saltean (su carga reproduce el diario completo).
+    Debe llamarse con _diario.lock tomado. Retorna la cantidad de cambios aplicados.
+    """
+    global _generacion_productos, _generacion_usuarios
+    aplicados = {"producto": 0, "usuario": 0}
+    with _lock_productos, _lock_usuarios:
+        for cambio in cambios:
+            entidad, nombre, datos = cambio["entidad"], cambio["nombre"], cambio["datos"]
+            if _secuencia_aplicada.get(entidad) is None:
+                continue
+            _versiones[entidad][nombre] = cambio["seq"]
+            if cambio["seq"] <= _secuencia_aplicada[entidad]:
+                continue # Ya incluido en los datos cargados
+            if entidad == "producto":
+                if datos is None:
+                    _quitar_producto_de_memoria(nombre)
+                else:
+                    _poner_producto_en_memoria(nombre, datos)
+            elif datos is None:
+                _usuarios_data.pop(nombre, None)
+            else:
+                _usuarios_data[nombre] = _congelar_registro(datos)
+            aplicados[entidad] += 1
+        if aplicados["producto"]:
+            _generacion_productos += 1
+        if aplicados["usuario"]:
+            _generacion_usuarios += 1
+        for entidad, secuencia in _secuencia_aplicada.items():
+            if secuencia is not None:
+                _secuencia_aplicada[entidad] = max(secuencia, _diario.ultima_secuencia)
+    return aplicados["producto"] + aplicados["usuario"]
 
-_cargar_usuarios()
-_cargar_productos()
+def _reproducir_diario(entidad, secuencia_snapshot):
+    """
+    Al terminar de cargar una entidad, aplica los cambios del diario posteriores a sus datos.
+    Retorna False si el diario ya no llega hasta esos datos (se compactó entre ambas lecturas)
+    y conviene volver a leerlos; los cambios disponibles se aplican igual.
+    """
+    with _diario.lock:
+        _versiones[entidad].clear()
+        _secuencia_aplicada[entidad] = secuencia_snapshot
+        _diario.reiniciar_lectura() # La otra entidad, si está cargada, saltea lo que ya tiene
+        try:
+            cambios = _diario.leer_nuevos()
+        except DiarioReiniciado:
+            return False # Reemplazado durante la lectura
+        except OSError as e:
+            print(f"ADVERTENCIA (data_manager): No se pudo leer el diario de cambios '{_diario.ruta_diario}': {e}")
+            return True
+        _aplicar_cambios_diario(cambios)
+        return not cambios or cambios[0]["seq"] <= secuencia_snapshot + 1
+
+def _sincronizar_diario():
+    """
+    Aplica los cambios nuevos del diario (de otras estaciones). Si el diario se compactó o se
+    reemplazó, recarga las entidades cargadas. Retorna True si cambió algún dato en memoria.
+    """
+    with _diario.lock:
+        try:
+            return _aplicar_cambios_diario(_diario.leer_nuevos()) > 0
+        except DiarioReiniciado:
+            print("INFO (data_manager): El diario de cambios fue compactado o reemplazado. Recargando los datos.")
+            recargar = [entidad for entidad, secuencia in _secuencia_aplicada.items() if secuencia is not None]
+            if "usuario" in recargar:
+                _cargar_usuarios()
+            if "producto" in recargar:
+                _cargar_productos()
+            return bool(recargar)
+
+def _registrar_cambios(entidad, cambios):
+    """
+    Agrega los cambios [(nombre, datos_o_None)] al diario y después los aplica en memoria.
+    Debe llamarse con _diario.bloquear() tomado y el diario sincronizado.
+    """
+    secuencias = _diario.agregar([(entidad, nombre, datos) for nombre, datos in cambios])
+    _aplicar_cambios_diario([{"seq": secuencia, "entidad": entidad, "nombre": nombre, "datos": datos}
+                             for secuencia, (nombre, datos) in zip(secuencias, cambios)])
+
+def _verificar_version(entidad, nombre, existe, version_esperada):
+    """Lanza ConflictoDeVersion si el registro cambió (o se eliminó) después de 'version_esperada'."""
+    if version_esperada is None:
+        return
+    if not existe:
+        raise ConflictoDeVersion(f"'{nombre}' fue eliminado en otra estación.")
+    if _versiones[entidad].get(nombre, 0) > version_esperada:
+        raise ConflictoDeVersion(f"'{nombre}' fue modificado en otra estación después de abrirlo. Vuelva a abrirlo para ver los cambios.")
+
+def sincronizar_cambios():
+    """
+    Aplica los cambios que otras estaciones agregaron al diario. La interfaz la llama
+    periódicamente: sin novedades cuesta un stat del archivo, y si otro hilo está usando el
+    diario no espera (se verá en el próximo sondeo). Retorna True si cambió algún dato en memoria.
+    """
+    if not _diario.hay_novedades():
+        return False
+    if not _diario.lock.acquire(blocking=False):
+        return False
+    try:
+        return _sincronizar_diario()
+    except OSError as e:
+        print(f"ADVERTENCIA (data_manager): No se pudo leer el diario de cambios '{_diario.ruta_diario}': {e}")
+        return False
+    finally:
+        _diario.lock.release()
+
+# --- Funciones de los Índices de Búsqueda ---
+def _reconstruir_indices_busqueda():
+    """
+    Prepara los índices de búsqueda al cargar el catálogo. El índice de nombres se arma completo;
+    el de trigramas se lee de disco y solo se recalculan los productos que cambiaron.
+    """
+    global _indice_nombres_productos
+    with _lock_productos:
+        _indice_nombres_productos = sorted((normalizar_texto_busqueda(nombre), nombre) for nombre in _productos_data)
+
+        _indice_trigramas.cargar(PRODUCTS_TRIGRAM_INDEX_FULL_PATH)
+        reindexados = _indice_trigramas.sincronizar(_productos_data)
+    if reindexados:
+        print(f"INFO (data_manager): Índice de trigramas actualizado para {reindexados} producto(s).")
+
+def guardar_indice_busqueda():
+    """Guarda el índice de trigramas en disco si tuvo cambios (se llama al cerrar la aplicación)."""
+    _asegurar_directorio_datos()
+    with _lock_productos:
+        _indice_trigramas.guardar(PRODUCTS_TRIGRAM_INDEX_FULL_PATH)
+
+def _indexar_nombre_producto(nombre_producto):
+    """Inserta un nombre en el índice manteniendo el orden."""
+    bisect.insort(_indice_nombres_productos, (normalizar_texto_busqueda(nombre_producto), nombre_producto))
+
+def _desindexar_nombre_producto(nombre_producto):
+    """Quita un nombre del índice."""
+    entrada = (normalizar_texto_busqueda(nombre_producto), nombre_producto)
+    posicion = bisect.bisect_left(_indice_nombres_productos, entrada)
+    if posicion < len(_indice_nombres_productos) and _indice_nombres_productos[posicion] == entrada:
+        del _indice_nombres_productos[posicion]
+
+@_requiere_productos
+def buscar_productos_por_prefijo(prefijo, limite=None):
+    """
+    Retorna, en orden alfabético, los nombres de productos que comienzan con el prefijo dado
+    (sin distinguir mayúsculas ni acentos). Con un prefijo vacío retorna todos los productos.
+    """
+    clave = normalizar_texto_busqueda(prefijo.strip())
+    with _lock_productos:
+        if not clave:
+            return [nombre for _, nombre in _indice_nombres_productos[:limite]]
+
+        resultados = []
+        for posicion in range(bisect.bisect_left(_indice_nombres_productos, (clave,)), len(_indice_nombres_productos)):
+            nombre_normalizado, nombre = _indice_nombres_productos[posicion]
+            if not nombre_normalizado.startswith(clave):
+                break
+            resultados.append(nombre)
+            if limite is not None and len(resultados) >= limite:
+                break
+        return resultados
+
+@_requiere_productos
+def buscar_productos_similares(texto_busqueda, limite=BUSQUEDA_DIFUSA_LIMITE):
+    """
+    Búsqueda tolerante a errores sobre nombre, serie, batería e info adicional.
+    Retorna una lista de (nombre_producto, puntaje) ordenada por relevancia.
+    """
+    with _lock_productos:
+        return _indice_trigramas.buscar(texto_busqueda, limite=limite, umbral=BUSQUEDA_DIFUSA_UMBRAL)
+
+def flush():
+    """
+    Escribe de inmediato todos los cambios pendientes (productos, usuarios e índice de búsqueda).
+    Se llama al cerrar la aplicación y además queda registrada con atexit como garantía.
+    """
+    _guardado_productos.flush()
+    _guardado_usuarios.flush()
+    guardar_indice_busqueda()
+
+_guardado_productos = GuardadoDiferido(_guardar_productos, JSON_GUARDADO_ESPERA_SEG, JSON_GUARDADO_ESPERA_MAXIMA_SEG, "productos")
+_guardado_usuarios = GuardadoDiferido(_guardar_usuarios, JSON_GUARDADO_ESPERA_SEG, JSON_GUARDADO_ESPERA_MAXIMA_SEG, "usuarios")
+atexit.register(flush)
+
+def cargar_datos():
+    """Carga usuarios y productos de inmediato (no hace nada si ya estaban cargados)."""
+    _asegurar_usuarios_cargados()
+    _asegurar_productos_cargados()
+
+def iniciar_carga_en_segundo_plano():
+    """Comienza a cargar usuarios y luego el catálogo en un hilo, sin bloquear la interfaz."""
+    def _cargar():
+        try:
+            cargar_datos()
+        except Exception as e:
+            print(f"ERROR (data_manager): Falló la carga de datos en segundo plano: {e}")
+    threading.Thread(target=_cargar, name="CargaDatos", daemon=True).start()
+
+def productos_cargados():
+    """Indica si el catálogo ya está en memoria (para no bloquear la interfaz esperándolo)."""
+    return _productos_cargados.is_set()
 
+@_requiere_productos
 def get_productos_data():
-    """Retorna una copia del diccionario de productos en memoria."""
-    return _productos_data.copy()
+    """
+    Retorna una vista de solo lectura (sin copiar) del diccionario de productos en memoria.
+    La vista refleja los cambios posteriores; use dict(...) si necesita una foto fija.
+    """
+    return _vista_productos
 
+@_requiere_productos
+def copiar_productos_data():
+    """
+    Retorna una copia (foto fija) del diccionario de productos, tomada bajo el candado.
+    Es la que deben recorrer los hilos de trabajo: la vista cambia mientras otros hilos guardan.
+    """
+    with _lock_productos:
+        return dict(_productos_data)
+
+@_requiere_productos
 def get_producto_data(nombre_producto):
-    """Retorna los datos de un producto específico (como una copia), o None."""
-    producto = _productos_data.get(nombre_producto)
-    return producto.copy() if producto else None
+    """Retorna los datos de un producto específico (registro de solo lectura), o None."""
+    return _productos_data.get(nombre_producto)
 
+@_requiere_usuarios
 def get_usuarios_registrados_data():
-    """Retorna una copia del diccionario de usuarios en memoria."""
-    return _usuarios_data.copy()
-
-def actualizar_producto_data(nombre_producto, datos_actualizados):
-    """Actualiza un producto existente en el diccionario en memoria y lo guarda en disco."""
-    if nombre_producto in _productos_data:
-        _productos_data[nombre_producto].update(datos_actualizados)
-        _guardar_productos() # Guardar cambios en disco
-        print(f"INFO (data_manager): Producto '{nombre_producto}' actualizado en memoria y disco.")
-        return True
-    print(f"ERROR (data_manager): Intento de actualizar producto no existente '{nombre_producto}'.")
-    return False
+    """Retorna una vista de solo lectura (sin copiar) del diccionario de usuarios en memoria."""
+    return _vista_usuarios
 
-def eliminar_producto_data(nombre_producto):
-    """Elimina un producto del diccionario en memoria y lo guarda en disco."""
-    if nombre_producto in _productos_data:
-        del _productos_data[nombre_producto]
-        _guardar_productos() # Guardar cambios en disco
-        print(f"INFO (data_manager): Producto '{nombre_producto}' eliminado de memoria y disco.")
-        return True
-    print(f"ERROR (data_manager): Intento de eliminar producto no existente '{nombre_producto}'.")
-    return False
+def get_generacion_productos():
+    """
+    Retorna la generación actual del catálogo: cambia con cada alta, edición, baja o recarga.
+    No espera la carga: antes de que el catálogo esté en memoria retorna 0.
+    """
+    return _generacion_productos
+
+def get_generacion_usuarios():
+    """Retorna la generación actual de los usuarios: cambia con cada alta, edición, baja o recarga."""
+    return _generacion_usuarios
+
+@_requiere_productos
+def get_total_stock():
+    """Retorna el stock total del catálogo (mantenido al día, sin recorrer los productos)."""
+    return _agregados_stock.total
+
+@_requiere_productos
+def get_resumen_stock():
+    """
+    Retorna los totales de stock: {'total', 'productos', 'stock_bajo' (cantidad de productos),
+    'por_bateria' y 'por_prefijo_serie' ({clave: (stock_total, cantidad_productos)})}.
+    """
+    with _lock_productos:
+        return _agregados_stock.resumen()
+
+@_requiere_productos
+def get_productos_stock_bajo():
+    """Retorna, en orden alfabético, los productos con stock menor o igual a config.STOCK_BAJO_UMBRAL."""
+    with _lock_productos:
+        return _agregados_stock.productos_stock_bajo()
+
+@_requiere_productos
+def get_version_producto(nombre_producto):
+    """
+    Retorna la versión del producto (secuencia de su último cambio en el diario, 0 si no figura).
+    Se guarda al abrir la edición y se pasa como version_esperada al guardar o eliminar.
+    """
+    return _versiones["producto"].get(nombre_producto, 0)
+
+@_requiere_productos
+def actualizar_producto_data(nombre_producto, datos_actualizados, version_esperada=None):
+    """
+    Actualiza un producto existente en memoria y lo guarda en disco. Con version_esperada,
+    lanza ConflictoDeVersion si otra estación lo modificó o eliminó desde entonces.
+    """
+    try:
+        with _diario.bloquear():
+            _sincronizar_diario()
+            existe = nombre_producto in _productos_data
+            _verificar_version("producto", nombre_producto, existe, version_esperada)
+            if not existe:
+                print(f"ERROR (data_manager): Intento de actualizar producto no existente '{nombre_producto}'.")
+                return False
+            _registrar_cambios("producto", [(nombre_producto, {**_productos_data[nombre_producto], **datos_actualizados})])
+            _persistir_producto(nombre_producto) # Guardar cambios en disco
+    except OSError as e:
+        print(f"ERROR (data_manager): No se pudo registrar el cambio del producto '{nombre_producto}' en el diario: {e}")
+        return False
+    print(f"INFO (data_manager): Producto '{nombre_producto}' actualizado en memoria y disco.")
+    return True
+
+@_requiere_productos
+def eliminar_producto_data(nombre_producto, version_esperada=None):
+    """
+    Elimina un producto de memoria y lo guarda en disco. Con version_esperada, lanza
+    ConflictoDeVersion si otra estación lo modificó o eliminó desde entonces.
+    """
+    try:
+        with _diario.bloquear():
+            _sincronizar_diario()
+            existe = nombre_producto in _productos_data
+            _verificar_version("producto", nombre_producto, existe, version_esperada)
+            if not existe:
+                print(f"ERROR (data_manager): Intento de eliminar producto no existente '{nombre_producto}'.")
+                return False
+            _registrar_cambios("producto", [(nombre_producto, None)])
+            _persistir_producto(nombre_producto) # Guardar cambios en disco
+    except OSError as e:
+        print(f"ERROR (data_manager): No se pudo registrar la baja del producto '{nombre_producto}' en el diario: {e}")
+        return False
+    print(f"INFO (data_manager): Producto '{nombre_producto}' eliminado de memoria y disco.")
+    return True
 
+@_requiere_productos
 def registrar_producto_data(nombre_producto, datos_producto):
-    """Registra un nuevo producto en el diccionario en memoria y lo guarda en disco."""
-    if nombre_producto not in _productos_data:
-        _productos_data[nombre_producto] = datos_producto
-        _guardar_productos() # Guardar cambios en disco
-        print(f"INFO (data_manager): Producto '{nombre_producto}' registrado en memoria y disco.")
-        return True
-    print(f"ERROR (data_manager): Intento de registrar producto ya existente '{nombre_producto}'.")
-    return False
+    """Registra un nuevo producto en memoria y lo guarda en disco."""
+    try:
+        with _diario.bloquear():
+            _sincronizar_diario() # Otra estación pudo haberlo registrado recién
+            if nombre_producto in _productos_data:
+                print(f"ERROR (data_manager): Intento de registrar producto ya existente '{nombre_producto}'.")
+                return False
+            _registrar_cambios("producto", [(nombre_producto, dict(datos_producto))])
+            _persistir_producto(nombre_producto) # Guardar cambios en disco
+    except OSError as e:
+        print(f"ERROR (data_manager): No se pudo registrar el alta del producto '{nombre_producto}' en el diario: {e}")
+        return False
+    print(f"INFO (data_manager): Producto '{nombre_producto}' registrado en memoria y disco.")
+    return True
+
+@_requiere_productos
+def registrar_productos_lote(productos_nuevos, actualizar_existentes=False):
+    """
+    Registra muchos productos de una vez (importación masiva) con una sola escritura a disco.
+    Los productos que ya existen se omiten, o se actualizan si actualizar_existentes es True
+    (solo con los campos presentes en datos_producto; los demás se conservan).
+    Retorna (cantidad_registrados, cantidad_actualizados).
+    """
+    registrados, actualizados, cambios = [], [], []
+    try:
+        with _diario.bloquear():
+            _sincronizar_diario()
+            for nombre_producto, datos_producto in productos_nuevos.items():
+                datos_anteriores = _productos_data.get(nombre_producto)
+                if datos_anteriores is None:
+                    registrados.append(nombre_producto)
+                    cambios.append((nombre_producto, dict(datos_producto)))
+                elif actualizar_existentes:
+                    actualizados.append(nombre_producto)
+                    cambios.append((nombre_producto, {**datos_anteriores, **datos_producto}))
+            if cambios:
+                _registrar_cambios("producto", cambios) # Todo el lote en un único agregado al diario
+                if _almacen_sqlite is not None:
+                    try:
+                        _almacen_sqlite.guardar_productos_lote(dict(cambios))
+                        _diario.compactar_si_corresponde(incluido_hasta=_diario.ultima_secuencia)
+                    except Exception as e:
+                        print(f"ERROR: No se pudo guardar el lote de {len(cambios)} productos en '{SQLITE_DATA_FILE_FULL_PATH}': {e}")
+    except OSError as e:
+        print(f"ERROR (data_manager): No se pudo registrar el lote de productos en el diario: {e}")
+        return 0, 0
+
+    if cambios:
+        if _almacen_sqlite is None:
+            # Fuera del bloqueo del diario: el guardado lo vuelve a tomar, y puede haber otro en curso
+            _guardado_productos.marcar_modificado()
+            _guardado_productos.flush() # Todo el lote en una única escritura, sin esperar
+        print(f"INFO (data_manager): Lote de productos guardado: {len(registrados)} registrados, {len(actualizados)} actualizados.")
+    return len(registrados), len(actualizados)
+
+# Funciones de Gestión de Usuarios (pasan por el diario de cambios y guardan a través de
+# _persistir_usuario(): users.json o SQLite)
+def _modificar_usuario(nombre_usuario, calcular_datos, descripcion):
+    """
+    Aplica a un usuario el cambio que retorna calcular_datos(datos_actuales_o_None): un dict,
+    None para eliminarlo, o False si no corresponde (p. ej. el usuario ya existe). Retorna True si se aplicó.
+    """
+    try:
+        with _diario.bloquear():
+            _sincronizar_diario()
+            datos_nuevos = calcular_datos(_usuarios_data.get(nombre_usuario))
+            if datos_nuevos is False:
+                return False
+            _registrar_cambios("usuario", [(nombre_usuario, datos_nuevos)])
+            _persistir_usuario(nombre_usuario)
+    except OSError as e:
+        print(f"ERROR (data_manager): No se pudo registrar {descripcion} del usuario '{nombre_usuario}' en el diario: {e}")
+        return False
+    return True
 
-# Funciones de Gestión de Usuarios (ahora guardan en users.json a través de _guardar_usuarios())
+@_requiere_usuarios
 def actualizar_usuario_data(nombre_usuario, datos_actualizados):
     """Actualiza un usuario existente y guarda en disco."""
-    if nombre_usuario in _usuarios_data:
-        _usuarios_data[nombre_usuario].update(datos_actualizados)
-        _guardar_usuarios()
+    def _calcular(datos_actuales):
+        if datos_actuales is None:
+            print(f"ERROR (data_manager): Intento de actualizar usuario no existente '{nombre_usuario}'.")
+            return False
+        return {**datos_actuales, **datos_actualizados}
+    if _modificar_usuario(nombre_usuario, _calcular, "el cambio"):
         print(f"INFO (data_manager): Usuario '{nombre_usuario}' actualizado.")
         return True
-    print(f"ERROR (data_manager): Intento de actualizar usuario no existente '{nombre_usuario}'.")
     return False
 
+@_requiere_usuarios
 def registrar_usuario_data(nombre_usuario, datos_usuario):
     """Registra un nuevo usuario y guarda en disco."""
-    if nombre_usuario not in _usuarios_data:
-        _usuarios_data[nombre_usuario] = datos_usuario
-        _guardar_usuarios()
+    def _calcular(datos_actuales):
+        if datos_actuales is not None:
+            print(f"ERROR (data_manager): Intento de registrar usuario ya existente '{nombre_usuario}'.")
+            return False
+        return dict(datos_usuario)
+    if _modificar_usuario(nombre_usuario, _calcular, "el alta"):
         print(f"INFO (data_manager): Usuario '{nombre_usuario}' registrado.")
         return True
-    print(f"ERROR (data_manager): Intento de registrar usuario ya existente '{nombre_usuario}'.")
     return False
 
+@_requiere_usuarios
 def eliminar_usuario_data(nombre_usuario):
     """Elimina un usuario y guarda en disco."""
-    if nombre_usuario in _usuarios_data:
-        del _usuarios_data[nombre_usuario]
-        _guardar_usuarios()
+    def _calcular(datos_actuales):
+        if datos_actuales is None:
+            print(f"ERROR (data_manager): Intento de eliminar usuario no existente '{nombre_usuario}'.")
+            return False
+        return None
+    if _modificar_usuario(nombre_usuario, _calcular, "la baja"):
         print(f"INFO (data_manager): Usuario '{nombre_usuario}' eliminado.")
         return True
-    print(f"ERROR (data_manager): Intento de eliminar usuario no existente '{nombre_usuario}'.")
     return False
@@ -0,0 +1,323 @@
+# diario_cambios.py
+# Diario secuenciado de cambios (data/cambios.jsonl) para varias estaciones que comparten la
+# carpeta 'data' en la red. Cada alta, edición o baja agrega una línea con un número de
+# secuencia global; las instancias en ejecución leen solo lo agregado desde su última lectura
+# (comparando tamaño y fecha del archivo, y siguiendo desde el último desplazamiento leído)
+# y aplican esos cambios a sus datos en memoria sin volver a leer products.json completo.
+#
+#   {"seq": 42, "entidad": "producto", "nombre": "...", "datos": {...} | null, "estacion": "...", "fecha": "..."}
+#
+# 'datos' null indica una baja. Las escrituras se serializan entre procesos con un archivo de
+# bloqueo (cambios.jsonl.lock) que contiene "estacion|token|latido"; mientras se tiene, el latido
+# se renueva cada CAMBIOS_BLOQUEO_RENOVACION_SEG. Las demás estaciones lo dan por abandonado solo si
+# su contenido no cambió durante CAMBIOS_BLOQUEO_VENCIDO_SEG medidos con su propio reloj (no se
+# compara la fecha del archivo, que viene del reloj del servidor de la carpeta). El número de secuencia del último cambio que tocó un registro es
+# su versión: una estación que modifica un registro que otra cambió desde que lo leyó recibe
+# ConflictoDeVersion en lugar de pisar el cambio ajeno.
+#
+# Junto al diario, cambios_snapshot.json guarda hasta qué secuencia incluye cada snapshot
+# (products.json / users.json). Al cargar se lee el snapshot y se aplican solo los cambios
+# posteriores. Cuando el diario crece, se compacta descartando lo que ya está en los snapshots.
+
+import os
+import json
+import time
+import secrets
+import socket
+import datetime
+import threading
+import contextlib
+
+from config import (CAMBIOS_DIARIO_FULL_PATH, CAMBIOS_SNAPSHOT_FULL_PATH, CAMBIOS_BLOQUEO_ESPERA_MAXIMA_SEG,
+                    CAMBIOS_BLOQUEO_RENOVACION_SEG, CAMBIOS_BLOQUEO_VENCIDO_SEG, CAMBIOS_DIARIO_MAX_BYTES)
+from persistencia_json import escribir_json_atomico
+
+class ConflictoDeVersion(RuntimeError):
+    """Otro proceso modificó el registro desde que se leyó (control de concurrencia optimista)."""
+
+class DiarioReiniciado(Exception):
+    """El diario fue compactado o reemplazado: hay que volver a cargar los snapshots."""
+
+def identificador_estacion():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _leer_bloqueo(ruta_bloqueo):
+    """Contenido del archivo de bloqueo ("estacion|token|latido"), o None si no existe."""
+    try:
+        with open(ruta_bloqueo, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _token_bloqueo(contenido):
+    partes = (contenido or "").split("|")
+    return partes[1] if len(partes) >= 3 else None
+
+class DiarioCambios:
+    """Lectura incremental y escritura secuenciada del diario de cambios."""
+
+    def __init__(self, ruta_diario=CAMBIOS_DIARIO_FULL_PATH, ruta_snapshot=CAMBIOS_SNAPSHOT_FULL_PATH):
+        self.ruta_diario = ruta_diario
+        self.ruta_snapshot = ruta_snapshot
+        self.estacion = identificador_estacion()
+        self.ultima_secuencia = 0 # Último cambio leído del diario
+        self._desplazamiento = 0 # Bytes del diario ya leídos (siempre al final de una línea completa)
+        self._firma = None # (tamaño, mtime_ns) del diario en la última lectura
+        self._lock = threading.RLock() # Protege el estado de lectura dentro del proceso
+        self._profundidad_bloqueo = 0 # bloquear() es reentrante dentro del hilo que lo tiene
+        self._bloqueo_observado = None # (contenido, time.monotonic() desde que no cambia) del bloqueo ajeno
+
+    @property
+    def lock(self):
+        return self._lock
+
+    # --- Bloqueo entre procesos ---
+    @contextlib.contextmanager
+    def bloquear(self):
+        """
+        Bloqueo exclusivo del diario entre procesos (y entre hilos de este proceso). Mientras se
+        tiene, un hilo renueva su latido; un bloqueo ajeno cuyo contenido no cambia durante
+        CAMBIOS_BLOQUEO_VENCIDO_SEG (una estación que se cerró de golpe) se descarta.
+        """
+        ruta_bloqueo = f"{self.ruta_diario}.lock"
+        with self._lock:
+            if self._profundidad_bloqueo:
+                self._profundidad_bloqueo += 1
+                try:
+                    yield
+                finally:
+                    self._profundidad_bloqueo -= 1
+                return
+            os.makedirs(os.path.dirname(self.ruta_diario), exist_ok=True)
+            limite = time.monotonic() + CAMBIOS_BLOQUEO_ESPERA_MAXIMA_SEG
+            while True:
+                try:
+                    descriptor = os.open(ruta_bloqueo, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                    break
+                except FileExistsError:
+                    if self._bloqueo_vencido(ruta_bloqueo):
+                        continue
+                    if time.monotonic() > limite:
+                        raise TimeoutError(f"El diario de cambios está bloqueado por otra estación ('{ruta_bloqueo}').")
+                    time.sleep(0.05)
+            self._bloqueo_observado = None
+            token = secrets.token_hex(8)
+            detener_renovacion = threading.Event()
+            hilo_renovacion = None
+            try:
+                os.write(descriptor, f"{self.estacion}|{token}|0".encode("utf-8"))
+                os.close(descriptor)
+                hilo_renovacion = threading.Thread(target=self._renovar_bloqueo, args=(ruta_bloqueo, token, detener_renovacion),
+                                                   name="RenovacionBloqueoDiario", daemon=True)
+                hilo_renovacion.start()
+                self._profundidad_bloqueo = 1
+                yield
+            finally:
+                self._profundidad_bloqueo = 0
+                detener_renovacion.set()
+                if hilo_renovacion is not None:
+                    hilo_renovacion.join()
+                if _token_bloqueo(_leer_bloqueo(ruta_bloqueo)) == token: # No se borra un bloqueo ajeno
+                    try:
+                        os.remove(ruta_bloqueo)
+                    except OSError:
+                        pass
+
+    def _bloqueo_vencido(self, ruta_bloqueo):
+        """
+        Observa el bloqueo ajeno y lo descarta si su contenido (el latido) no cambió durante
+        CAMBIOS_BLOQUEO_VENCIDO_SEG. Retorna True si ya no está (liberado o descartado).
+        """
+        contenido = _leer_bloqueo(ruta_bloqueo)
+        if contenido is None:
+            return True # Otro proceso lo liberó entre medio
+        ahora = time.monotonic()
+        if self._bloqueo_observado is None or self._bloqueo_observado[0] != contenido:
+            self._bloqueo_observado = (contenido, ahora)
+            return False
+        if ahora - self._bloqueo_observado[1] <= CAMBIOS_BLOQUEO_VENCIDO_SEG:
+            return False
+        if _leer_bloqueo(ruta_bloqueo) != contenido: # Se renovó justo ahora
+            return False
+        print(f"ADVERTENCIA (diario_cambios): Se descarta el bloqueo abandonado de '{contenido.split('|')[0]}' en '{ruta_bloqueo}'.")
+        self._bloqueo_observado = None
+        try:
+            os.remove(ruta_bloqueo)
+        except OSError:
+            pass
+        return True
+
+    def _renovar_bloqueo(self, ruta_bloqueo, token, detener):
+        """Hilo que renueva el latido del bloqueo propio mientras se tiene (un guardado largo no lo pierde)."""
+        latido = 0
+        while not detener.wait(CAMBIOS_BLOQUEO_RENOVACION_SEG):
+            if _token_bloqueo(_leer_bloqueo(ruta_bloqueo)) != token:
+                print(f"ERROR (diario_cambios): Otra estación descartó el bloqueo '{ruta_bloqueo}' mientras se usaba.")
+                return
+            latido += 1
+            try:
+                descriptor = os.open(ruta_bloqueo, os.O_WRONLY | os.O_TRUNC) # Sin O_CREAT: no lo recrea si ya no está
+                try:
+                    os.write(descriptor, f"{self.estacion}|{token}|{latido}".encode("utf-8"))
+                finally:
+                    os.close(descriptor)
+            except OSError as e:
+                print(f"ADVERTENCIA (diario_cambios): No se pudo renovar el bloqueo '{ruta_bloqueo}': {e}")
+
+    # --- Lectura incremental ---
+    def hay_novedades(self):
+        """Comprobación barata (un stat): indica si el diario cambió desde la última lectura."""
+        try:
+            info = os.stat(self.ruta_diario)
+        except FileNotFoundError:
+            return self._desplazamiento > 0 # El diario desapareció: también es un reinicio
+        return (info.st_size, info.st_mtime_ns) != self._firma
+
+    def leer_nuevos(self):
+        """
+        Retorna la lista de cambios agregados desde la última lectura (posiblemente vacía).
+        Lanza DiarioReiniciado si el diario fue compactado o reemplazado; en ese caso el
+        lector queda al comienzo y hay que recargar los snapshots antes de volver a leer.
+        """
+        with self._lock:
+            try:
+                with open(self.ruta_diario, 'rb') as f:
+                    info = os.fstat(f.fileno())
+                    if info.st_size < self._desplazamiento:
+                        self._reiniciar_lectura()
+                        raise DiarioReiniciado()
+                    f.seek(self._desplazamiento)
+                    contenido = f.read()
+            except FileNotFoundError:
+                if self._desplazamiento > 0:
+                    self._reiniciar_lectura()
+                    raise DiarioReiniciado()
+                return []
+
+            cambios = []
+            fin = contenido.rfind(b"\n") + 1 # Una línea sin salto final todavía se está escribiendo
+            for linea in contenido[:fin].splitlines():
+                if not linea.strip():
+                    continue
+                try:
+                    cambio = json.loads(linea)
+                except ValueError:
+                    # Resto de una escritura interrumpida (p. ej. un corte de luz): nunca se confirmó,
+                    # y el cambio siguiente reutilizó su secuencia
+                    print(f"ADVERTENCIA (diario_cambios): Se ignora una línea incompleta en '{self.ruta_diario}'.")
+                    continue
+                # Las secuencias son consecutivas: cualquier salto indica que el archivo cambió por debajo
+                if self.ultima_secuencia and cambio.get("seq") != self.ultima_secuencia + 1:
+                    self._reiniciar_lectura()
+                    raise DiarioReiniciado()
+                self.ultima_secuencia = cambio["seq"]
+                cambios.append(cambio)
+            self._desplazamiento += fin
+            self._firma = (info.st_size, info.st_mtime_ns) if fin == len(contenido) else None
+            return cambios
+
+    def reiniciar_lectura(self):
+        """Vuelve a leer el diario desde el comienzo en la próxima llamada a leer_nuevos()."""
+        with self._lock:
+            self._reiniciar_lectura()
+
+    def _reiniciar_lectura(self):
+        self.ultima_secuencia = 0
+        self._desplazamiento = 0
+        self._firma = None
+
+    # --- Escritura ---
+    def agregar(self, cambios):
+        """
+        Agrega al diario una lista de (entidad, nombre, datos_o_None) y retorna sus secuencias.
+        Debe llamarse con bloquear() tomado y después de leer_nuevos(), para que la secuencia
+        siga a la última existente.
+        """
+        with self._lock:
+            secuencia_base = max(self.ultima_secuencia, self.leer_secuencias_snapshot().get("maxima", 0))
+            fecha = datetime.datetime.now().isoformat(timespec="seconds")
+            lineas, secuencias = [], []
+            for numero, (entidad, nombre, datos) in enumerate(cambios, 1):
+                secuencias.append(secuencia_base + numero)
+                lineas.append(json.dumps({"seq": secuencia_base + numero, "entidad": entidad, "nombre": nombre,
+                                          "datos": None if datos is None else dict(datos),
+                                          "estacion": self.estacion, "fecha": fecha}, ensure_ascii=False))
+            contenido = ("\n".join(lineas) + "\n").encode("utf-8")
+            with open(self.ruta_diario, 'ab') as f:
+                if f.tell() > self._desplazamiento:
+                    contenido = b"\n" + contenido # Cierra la línea que dejó una escritura interrumpida
+                f.write(contenido)
+                f.flush()
+                os.fsync(f.fileno())
+                info = os.fstat(f.fileno())
+            self.ultima_secuencia = secuencias[-1]
+            self._desplazamiento = info.st_size
+            self._firma = (info.st_size, info.st_mtime_ns)
+            return secuencias
+
+    # --- Snapshots ---
+    def leer_secuencias_snapshot(self):
+        """Retorna {'producto': seq, 'usuario': seq, 'maxima': seq} (las que falten valen 0)."""
+        try:
+            with open(self.ruta_snapshot, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def registrar_snapshot(self, entidad, secuencia):
+        """Anota que el snapshot de la entidad incluye los cambios hasta 'secuencia' (con bloquear() tomado)."""
+        secuencias = self.leer_secuencias_snapshot()
+        secuencias[entidad] = secuencia
+        secuencias["maxima"] = max(secuencias.get("maxima", 0), secuencia, self.ultima_secuencia)
+        escribir_json_atomico(self.ruta_snapshot, secuencias, indent=2)
+
+    def compactar_si_corresponde(self, incluido_hasta=None):
+        """
+        Si el diario supera CAMBIOS_DIARIO_MAX_BYTES lo reescribe sin los cambios que ya están
+        en los snapshots (con bloquear() tomado y el diario leído hasta el final). Por defecto se
+        descarta el tramo inicial en el que cada cambio es anterior al snapshot de su entidad;
+        con 'incluido_hasta' (SQLite, donde la base siempre está al día) se descarta hasta esa secuencia.
+        Los demás procesos lo detectan como DiarioReiniciado y recargan.
+        """
+        with self._lock:
+            try:
+                if os.path.getsize(self.ruta_diario) <= CAMBIOS_DIARIO_MAX_BYTES:
+                    return False
+                lineas = []
+                with open(self.ruta_diario, 'rb') as f:
+                    for linea in f:
+                        try:
+                            lineas.append((json.loads(linea), linea))
+                        except ValueError:
+                            pass # Líneas vacías o incompletas: se descartan al reescribir
+            except FileNotFoundError:
+                return False
+            except OSError as e:
+                print(f"ADVERTENCIA (diario_cambios): No se pudo compactar el diario '{self.ruta_diario}': {e}")
+                return False
+
+            secuencias = self.leer_secuencias_snapshot()
+            if incluido_hasta is None:
+                incluido_hasta = self.ultima_secuencia
+                for cambio, _ in lineas:
+                    if cambio["seq"] > secuencias.get(cambio["entidad"], 0):
+                        incluido_hasta = cambio["seq"] - 1 # Primer cambio que falta en algún snapshot
+                        break
+            conservadas = [linea for cambio, linea in lineas if cambio["seq"] > incluido_hasta]
+            if len(conservadas) == len(lineas):
+                return False
+
+            ruta_temporal = f"{self.ruta_diario}.tmp"
+            with open(ruta_temporal, 'wb') as f:
+                f.writelines(conservadas)
+                f.flush()
+                os.fsync(f.fileno())
+            secuencias["maxima"] = max(secuencias.get("maxima", 0), self.ultima_secuencia)
+            escribir_json_atomico(self.ruta_snapshot, secuencias, indent=2) # La numeración sigue aunque el diario quede vacío
+            os.replace(ruta_temporal, self.ruta_diario)
+            print(f"INFO (diario_cambios): Diario compactado: se descartaron {len(lineas) - len(conservadas)} cambios ya incluidos en los datos.")
+            # Este proceso ya tiene todos los cambios: solo se reposiciona al final del diario nuevo
+            self._reiniciar_lectura()
+            self.ultima_secuencia = incluido_hasta
+            self.leer_nuevos()
+            return True
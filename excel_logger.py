@@ -1,69 +1,449 @@
 # excel_logger.py
+# Registro de actividad. Las acciones se encolan en memoria y un hilo en segundo plano
+# las escribe por lotes en un diario JSONL; el diario se vuelca al Excel periódicamente
+# y al cerrar la aplicación, de modo que la interfaz nunca espera a openpyxl.
+#
+# El libro vigente no crece indefinidamente: al volcar una acción de un mes nuevo (o al llegar a
+# EXCEL_LOG_ROTACION_MAX_FILAS) se guarda como logs/archivo/<libro>_AAAA-MM.xlsx y se empieza
+# uno nuevo. Los archivos de meses viejos se comprimen a .jsonl.gz (una fila JSON por línea).
+# logs/indice_registro.json guarda el rango de fechas de cada archivo, así una consulta por
+# fechas abre solo los archivos que se superponen con el período pedido.
 
 import os
+import gzip
+import json
+import time
+import queue
+import atexit
 import datetime
-import openpyxl
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, Alignment
+import threading
+# openpyxl se importa dentro de las funciones que lo usan (y solo en el hilo escritor o al
+# cerrar): cargarlo al importar este módulo retrasaba la aparición de la ventana de login.
 
 # Importa desde config y data_manager
-from config import EXCEL_LOG_FILE_FULL_PATH, LOGS_PATH
+from config import (EXCEL_LOG_FILE_FULL_PATH, LOGS_PATH, EXCEL_LOG_JOURNAL_FULL_PATH,
+                    EXCEL_LOG_LOTE_MAXIMO, EXCEL_LOG_INTERVALO_COMPACTACION_SEG,
+                    EXCEL_LOG_ARCHIVO_PATH, EXCEL_LOG_INDICE_FULL_PATH, EXCEL_LOG_ROTACION_MAX_FILAS,
+                    EXCEL_LOG_MESES_SIN_COMPRIMIR)
 import data_manager
+import instrumentacion
+from persistencia_json import escribir_json_atomico
 
-def inicializar_excel_log():
-    """Crea el archivo Excel y la carpeta de logs si no existen."""
+ENCABEZADOS_LOG = ["Timestamp", "Usuario", "Rol", "Accion", "Detalles Adicionales", "Duracion Sesion (min)"]
+
+# --- Estado del escritor en segundo plano ---
+_cola_registros = queue.Queue()
+_hilo_escritor = None
+_lock_hilo_escritor = threading.Lock()
+_lock_diario = threading.Lock() # Protege el diario JSONL entre escrituras y compactaciones
+_FIN_ESCRITOR = object() # Centinela que detiene el hilo escritor
+
+def _asegurar_directorio_logs():
+    """Asegura que el directorio de logs exista."""
     if not os.path.exists(LOGS_PATH):
         try:
             os.makedirs(LOGS_PATH, exist_ok=True)
         except OSError as e:
             print(f"ADVERTENCIA: No se pudo crear el directorio de logs '{LOGS_PATH}': {e}")
 
+def _crear_libro_log():
+    """Crea un libro de Excel nuevo con la hoja y los encabezados del registro."""
+    import openpyxl
+    from openpyxl.utils import get_column_letter
+    from openpyxl.styles import Font, Alignment
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Registro de Actividad"
+    sheet.append(ENCABEZADOS_LOG)
+    for col_num, header_title in enumerate(ENCABEZADOS_LOG, 1):
+        cell = sheet.cell(row=1, column=col_num)
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal="center")
+        column_letter = get_column_letter(col_num)
+        if header_title == "Timestamp": sheet.column_dimensions[column_letter].width = 20
+        elif header_title == "Detalles Adicionales": sheet.column_dimensions[column_letter].width = 45
+        elif header_title == "Duracion Sesion (min)": sheet.column_dimensions[column_letter].width = 22
+        else: sheet.column_dimensions[column_letter].width = 25
+    return workbook, sheet
+
+def inicializar_excel_log():
+    """Crea el archivo Excel y la carpeta de logs si no existen."""
+    _asegurar_directorio_logs()
+
     if not os.path.exists(EXCEL_LOG_FILE_FULL_PATH):
         try:
-            workbook = openpyxl.Workbook()
-            sheet = workbook.active
-            sheet.title = "Registro de Actividad"
-            headers = ["Timestamp", "Usuario", "Rol", "Accion", "Detalles Adicionales", "Duracion Sesion (min)"]
-            sheet.append(headers)
-            for col_num, header_title in enumerate(headers, 1):
-                cell = sheet.cell(row=1, column=col_num)
-                cell.font = Font(bold=True)
-                cell.alignment = Alignment(horizontal="center")
-                column_letter = get_column_letter(col_num)
-                if header_title == "Timestamp": sheet.column_dimensions[column_letter].width = 20
-                elif header_title == "Detalles Adicionales": sheet.column_dimensions[column_letter].width = 45
-                elif header_title == "Duracion Sesion (min)": sheet.column_dimensions[column_letter].width = 22
-                else: sheet.column_dimensions[column_letter].width = 25
+            workbook, _ = _crear_libro_log()
             workbook.save(EXCEL_LOG_FILE_FULL_PATH)
         except Exception as e:
             print(f"ADVERTENCIA: No se pudo inicializar el archivo de log Excel '{EXCEL_LOG_FILE_FULL_PATH}': {e}")
 
+def _armar_entrada(accion, detalles, duracion_min):
+    """Arma la fila del registro con el usuario vigente en este momento."""
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    nombre_usuario_log = data_manager.usuario_actual.get("nombre", "N/A")
+    rol_usuario_log = data_manager.usuario_actual.get("rol", "N/A")
+    return [timestamp, nombre_usuario_log, rol_usuario_log, accion, detalles,
+            f"{duracion_min:.2f}" if duracion_min is not None else ""]
+
 def registrar_accion_excel(accion, detalles="", duracion_min=None):
-    """Registra una acción en el archivo Excel."""
-    if not os.path.exists(LOGS_PATH):
-        inicializar_excel_log()
+    """
+    Registra una acción en el log de actividad.
+    La entrada se arma aquí (con el usuario vigente en este momento) y se encola;
+    la escritura a disco la realiza el hilo escritor en segundo plano.
+    """
+    log_entry = _armar_entrada(accion, detalles, duracion_min)
+    _asegurar_hilo_escritor()
+    _cola_registros.put(log_entry)
 
-    try:
-        # Cargar o crear el libro de trabajo
-        if os.path.exists(EXCEL_LOG_FILE_FULL_PATH):
-            workbook = openpyxl.load_workbook(EXCEL_LOG_FILE_FULL_PATH)
-            sheet = workbook.active
-        else:
-            print(f"ADVERTENCIA: Archivo de log '{EXCEL_LOG_FILE_FULL_PATH}' no encontrado. Creando uno nuevo para esta sesión.")
-            workbook = openpyxl.Workbook()
-            sheet = workbook.active
-            sheet.title = "Registro de Actividad"
-            headers = ["Timestamp", "Usuario", "Rol", "Accion", "Detalles Adicionales", "Duracion Sesion (min)"]
-            sheet.append(headers)
-    
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        nombre_usuario_log = data_manager.usuario_actual.get("nombre", "N/A")
-        rol_usuario_log = data_manager.usuario_actual.get("rol", "N/A")
-        
-        log_entry = [timestamp, nombre_usuario_log, rol_usuario_log, accion, detalles,
-                    f"{duracion_min:.2f}" if duracion_min is not None else ""]
-        sheet.append(log_entry)
-        workbook.save(EXCEL_LOG_FILE_FULL_PATH)
+def registrar_accion_en_diario(accion, detalles="", duracion_min=None):
+    """
+    Variante sincrónica para procesos cortos (cli.py): escribe la acción directamente en el
+    diario JSONL, sin hilo escritor ni openpyxl. El volcado al Excel lo hace la aplicación
+    en su próxima compactación.
+    """
+    _escribir_lote_diario([_armar_entrada(accion, detalles, duracion_min)])
 
+# --- Diario JSONL y compactación al Excel ---
+@instrumentacion.medido("excel_logger.escribir_lote_diario")
+def _escribir_lote_diario(lote):
+    """Agrega un lote de entradas al diario JSONL con una sola apertura y un solo fsync."""
+    _asegurar_directorio_logs()
+    try:
+        with _lock_diario:
+            with open(EXCEL_LOG_JOURNAL_FULL_PATH, 'a', encoding='utf-8') as f:
+                for log_entry in lote:
+                    f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
     except Exception as e:
-        print(f"ERROR al registrar acción en Excel: {e}. Acción: '{accion}', Detalles: '{detalles}'")
+        print(f"ERROR al escribir {len(lote)} acciones en el diario '{EXCEL_LOG_JOURNAL_FULL_PATH}': {e}. Acciones: {lote}")
+
+def _leer_diario():
+    """Lee las entradas del diario. Ignora líneas corruptas (p. ej. una escritura cortada por un apagón)."""
+    entradas = []
+    with open(EXCEL_LOG_JOURNAL_FULL_PATH, 'r', encoding='utf-8') as f:
+        for num_linea, linea in enumerate(f, 1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                entradas.append(json.loads(linea))
+            except json.JSONDecodeError:
+                print(f"ADVERTENCIA: Línea {num_linea} del diario de actividad ilegible, se omite: {linea[:80]}")
+    return entradas
+
+def _en_rango(fila, desde, hasta):
+    """Indica si la acción cae entre los días 'desde' y 'hasta' (AAAA-MM-DD, incluidos; None = sin límite)."""
+    dia = str(fila[0] or "")[:10] # "AAAA-MM-DD HH:MM:SS": el orden de texto es el cronológico
+    return (not desde or dia >= desde) and (not hasta or dia <= hasta)
+
+def iterar_filas_archivo(ruta):
+    """Filas de un libro del registro (.xlsx, en modo read_only) o de un archivo comprimido (.jsonl.gz), sin encabezados ni filas vacías."""
+    if ruta.endswith(".xlsx") and not os.path.exists(ruta):
+        ruta_comprimida = ruta[:-len(".xlsx")] + ".jsonl.gz"
+        if os.path.exists(ruta_comprimida):
+            ruta = ruta_comprimida # Se comprimió después de leer el índice
+    if ruta.endswith(".jsonl.gz"):
+        with gzip.open(ruta, 'rt', encoding='utf-8') as f:
+            for linea in f:
+                if linea.strip():
+                    yield json.loads(linea)
+        return
+    import openpyxl
+    workbook = openpyxl.load_workbook(ruta, read_only=True)
+    try:
+        filas = workbook.active.iter_rows(values_only=True)
+        next(filas, None) # Encabezados
+        for fila in filas:
+            if any(valor is not None for valor in fila):
+                yield list(fila)
+    finally:
+        workbook.close()
+
+def listar_archivos_registro(desde=None, hasta=None):
+    """
+    Entradas del índice de archivos (de la más antigua a la más reciente) cuyo rango de fechas se
+    superpone con [desde, hasta]. Cada una tiene 'archivo', 'ruta', 'desde', 'hasta', 'filas' y 'primera'.
+    """
+    archivos = []
+    for entrada in _leer_indice():
+        if (desde and entrada["hasta"][:10] < desde) or (hasta and entrada["desde"][:10] > hasta):
+            continue
+        archivos.append(dict(entrada, ruta=os.path.join(EXCEL_LOG_ARCHIVO_PATH, entrada["archivo"])))
+    return archivos
+
+def iterar_registro_actividad(desde=None, hasta=None):
+    """
+    Recorre en orden las acciones registradas entre los días 'desde' y 'hasta' (AAAA-MM-DD,
+    incluidos): primero las de los archivos de períodos anteriores que se superponen con el
+    rango, después las del libro vigente (en modo read_only, fila por fila) y por último las
+    pendientes del diario. Cada acción es una lista con los valores de ENCABEZADOS_LOG.
+    """
+    rutas = [entrada["ruta"] for entrada in listar_archivos_registro(desde, hasta)]
+    if os.path.exists(EXCEL_LOG_FILE_FULL_PATH):
+        rutas.append(EXCEL_LOG_FILE_FULL_PATH)
+    for ruta in rutas:
+        for fila in iterar_filas_archivo(ruta):
+            if _en_rango(fila, desde, hasta):
+                yield fila
+    try:
+        with _lock_diario:
+            pendientes = _leer_diario()
+    except FileNotFoundError:
+        pendientes = []
+    for fila in pendientes:
+        if _en_rango(fila, desde, hasta):
+            yield fila
+
+def _diario_tiene_pendientes():
+    """Indica si hay entradas en el diario sin volcar al Excel."""
+    try:
+        return os.path.getsize(EXCEL_LOG_JOURNAL_FULL_PATH) > 0
+    except OSError:
+        return False
+
+@instrumentacion.medido("excel_logger.compactar_diario")
+def compactar_diario_en_excel():
+    """
+    Vuelca todas las entradas del diario al archivo Excel (una carga y un guardado) y vacía el diario.
+    Si el guardado falla, las entradas se conservan en el diario para el siguiente intento.
+    Retorna la cantidad de entradas volcadas.
+    """
+    with _lock_diario:
+        if not _diario_tiene_pendientes():
+            return 0
+        try:
+            entradas = _leer_diario()
+            if os.path.exists(EXCEL_LOG_FILE_FULL_PATH):
+                import openpyxl
+                workbook = openpyxl.load_workbook(EXCEL_LOG_FILE_FULL_PATH)
+                sheet = workbook.active
+            else:
+                print(f"ADVERTENCIA: Archivo de log '{EXCEL_LOG_FILE_FULL_PATH}' no encontrado. Creando uno nuevo.")
+                workbook, sheet = _crear_libro_log()
+            archivos = None # Índice de archivos, se lee solo si hay que rotar
+            filas_libro = sheet.max_row - 1
+            periodo_libro = str(sheet.cell(row=2, column=1).value or "")[:7] if filas_libro > 0 else None
+            for log_entry in entradas:
+                periodo = str(log_entry[0])[:7]
+                if periodo_libro and (periodo != periodo_libro or filas_libro >= EXCEL_LOG_ROTACION_MAX_FILAS):
+                    if archivos is None:
+                        archivos = _leer_indice()
+                    _archivar_libro(sheet, workbook, archivos)
+                    workbook, sheet = _crear_libro_log()
+                    filas_libro, periodo_libro = 0, None
+                sheet.append(log_entry)
+                filas_libro += 1
+                periodo_libro = periodo_libro or periodo
+            if archivos is not None:
+                # El índice se guarda antes que el libro nuevo: si el guardado se interrumpe, el
+                # próximo volcado vuelve a rotar el mismo libro y _archivar_libro lo reconoce
+                _escribir_indice(archivos)
+            workbook.save(EXCEL_LOG_FILE_FULL_PATH)
+        except Exception as e:
+            print(f"ERROR al volcar el diario de actividad en Excel: {e}. Las entradas se conservan en '{EXCEL_LOG_JOURNAL_FULL_PATH}'.")
+            return 0
+        try:
+            os.remove(EXCEL_LOG_JOURNAL_FULL_PATH)
+        except OSError as e:
+            print(f"ADVERTENCIA: No se pudo vaciar el diario de actividad '{EXCEL_LOG_JOURNAL_FULL_PATH}': {e}")
+        if archivos is not None:
+            _comprimir_archivos_antiguos(archivos)
+        return len(entradas)
+
+# --- Rotación, archivos de períodos anteriores e índice ---
+def _leer_indice():
+    """Lista de archivos del índice. Si el índice falta o está dañado, se reconstruye recorriendo logs/archivo."""
+    try:
+        with open(EXCEL_LOG_INDICE_FULL_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)["archivos"]
+    except FileNotFoundError:
+        if not os.path.isdir(EXCEL_LOG_ARCHIVO_PATH):
+            return []
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ADVERTENCIA: Índice del registro '{EXCEL_LOG_INDICE_FULL_PATH}' ilegible ({e}); se reconstruye.")
+    return _reconstruir_indice()
+
+def _escribir_indice(archivos):
+    archivos.sort(key=lambda entrada: (entrada["desde"], entrada["archivo"]))
+    _asegurar_directorio_logs()
+    escribir_json_atomico(EXCEL_LOG_INDICE_FULL_PATH, {"archivos": archivos}, indent=2, ensure_ascii=False)
+
+def _describir_archivo(nombre_archivo, filas):
+    """Entrada del índice para un archivo a partir de sus filas (None si no tiene ninguna)."""
+    primera = ultima = None
+    cantidad = 0
+    for fila in filas:
+        if primera is None:
+            primera = fila
+        ultima = fila
+        cantidad += 1
+    if primera is None:
+        return None
+    return {"archivo": nombre_archivo, "desde": str(primera[0]), "hasta": str(ultima[0]), "filas": cantidad,
+            "primera": [None if valor is None else str(valor) for valor in primera]}
+
+def _reconstruir_indice():
+    archivos = []
+    try:
+        nombres = sorted(os.listdir(EXCEL_LOG_ARCHIVO_PATH))
+    except OSError:
+        return archivos
+    for nombre in nombres:
+        if not nombre.endswith((".xlsx", ".jsonl.gz")):
+            continue
+        try:
+            entrada = _describir_archivo(nombre, iterar_filas_archivo(os.path.join(EXCEL_LOG_ARCHIVO_PATH, nombre)))
+        except Exception as e:
+            print(f"ADVERTENCIA: No se pudo leer el archivo del registro '{nombre}', queda fuera del índice: {e}")
+            continue
+        if entrada:
+            archivos.append(entrada)
+    try:
+        _escribir_indice(archivos)
+    except OSError as e:
+        print(f"ADVERTENCIA: No se pudo guardar el índice del registro reconstruido: {e}")
+    return archivos
+
+def _archivar_libro(sheet, workbook, archivos):
+    """Guarda el libro vigente en logs/archivo con el nombre de su período y lo agrega a 'archivos' (el índice)."""
+    filas = (list(fila) for fila in sheet.iter_rows(min_row=2, values_only=True) if any(valor is not None for valor in fila))
+    entrada = _describir_archivo(None, filas)
+    if entrada is None:
+        return
+    for existente in archivos:
+        if existente["primera"] == entrada["primera"] and existente["filas"] == entrada["filas"]:
+            return # Ya se archivó en un volcado que se interrumpió antes de guardar el libro nuevo
+    base = os.path.splitext(os.path.basename(EXCEL_LOG_FILE_FULL_PATH))[0]
+    periodo = entrada["desde"][:7]
+    nombre, numero = f"{base}_{periodo}.xlsx", 2
+    while os.path.exists(os.path.join(EXCEL_LOG_ARCHIVO_PATH, nombre)) or \
+            os.path.exists(os.path.join(EXCEL_LOG_ARCHIVO_PATH, nombre[:-len(".xlsx")] + ".jsonl.gz")):
+        nombre, numero = f"{base}_{periodo}_{numero}.xlsx", numero + 1 # Rotación por cantidad de filas dentro del mes
+    os.makedirs(EXCEL_LOG_ARCHIVO_PATH, exist_ok=True)
+    workbook.save(os.path.join(EXCEL_LOG_ARCHIVO_PATH, nombre))
+    entrada["archivo"] = nombre
+    archivos.append(entrada)
+    print(f"INFO: Registro de actividad archivado en '{nombre}' ({entrada['filas']} acciones, {entrada['desde'][:10]} a {entrada['hasta'][:10]}).")
+
+def _periodo_limite_compresion():
+    """Primer mes (AAAA-MM) que se conserva sin comprimir."""
+    hoy = datetime.date.today()
+    meses = hoy.year * 12 + hoy.month - 1 - EXCEL_LOG_MESES_SIN_COMPRIMIR
+    return f"{meses // 12:04d}-{meses % 12 + 1:02d}"
+
+def _comprimir_archivos_antiguos(archivos):
+    """Convierte a .jsonl.gz los archivos .xlsx de meses anteriores a EXCEL_LOG_MESES_SIN_COMPRIMIR."""
+    limite = _periodo_limite_compresion()
+    comprimidos = []
+    for entrada in archivos:
+        if not entrada["archivo"].endswith(".xlsx") or entrada["hasta"][:7] >= limite:
+            continue
+        ruta = os.path.join(EXCEL_LOG_ARCHIVO_PATH, entrada["archivo"])
+        nombre_comprimido = entrada["archivo"][:-len(".xlsx")] + ".jsonl.gz"
+        ruta_comprimida = os.path.join(EXCEL_LOG_ARCHIVO_PATH, nombre_comprimido)
+        try:
+            with gzip.open(f"{ruta_comprimida}.tmp", 'wt', encoding='utf-8') as f:
+                for fila in iterar_filas_archivo(ruta):
+                    f.write(json.dumps(fila, ensure_ascii=False, default=str) + "\n")
+            os.replace(f"{ruta_comprimida}.tmp", ruta_comprimida)
+        except Exception as e:
+            print(f"ADVERTENCIA: No se pudo comprimir el archivo del registro '{entrada['archivo']}': {e}")
+            continue
+        entrada["archivo"] = nombre_comprimido
+        comprimidos.append(ruta)
+    if not comprimidos:
+        return
+    try:
+        _escribir_indice(archivos)
+    except OSError as e:
+        print(f"ADVERTENCIA: No se pudo actualizar el índice del registro: {e}")
+        return # Se conservan los .xlsx, que son los que figuran en el índice
+    for ruta in comprimidos:
+        try:
+            os.remove(ruta)
+        except OSError as e:
+            print(f"ADVERTENCIA: No se pudo eliminar '{ruta}' después de comprimirlo: {e}")
+    print(f"INFO: Se comprimieron {len(comprimidos)} archivos del registro de actividad.")
+
+# --- Hilo escritor ---
+def iniciar_registro_excel():
+    """
+    Arranca el hilo escritor, que además crea el archivo Excel si falta (inicializar_excel_log).
+    La app lo llama una vez visible la ventana de login; registrar_accion_excel también lo arranca.
+    """
+    _asegurar_hilo_escritor()
+
+def _asegurar_hilo_escritor():
+    """Arranca el hilo escritor si todavía no está corriendo."""
+    global _hilo_escritor
+    with _lock_hilo_escritor:
+        if _hilo_escritor is None or not _hilo_escritor.is_alive():
+            _hilo_escritor = threading.Thread(target=_bucle_escritor, name="EscritorRegistroExcel", daemon=True)
+            _hilo_escritor.start()
+
+def _bucle_escritor():
+    """Agrupa las entradas encoladas en lotes, las escribe en el diario y compacta según el intervalo configurado."""
+    inicializar_excel_log() # Fuera del hilo de la interfaz: puede requerir crear el libro con openpyxl
+    # Si quedó un diario de una ejecución anterior (p. ej. un cierre abrupto), se compacta de inmediato.
+    ultima_compactacion = float("-inf") if _diario_tiene_pendientes() else time.monotonic()
+    while True:
+        espera = EXCEL_LOG_INTERVALO_COMPACTACION_SEG - (time.monotonic() - ultima_compactacion)
+        try:
+            primera = _cola_registros.get(timeout=max(0.1, espera))
+        except queue.Empty:
+            primera = None
+
+        lote = []
+        terminar = primera is _FIN_ESCRITOR
+        if primera is not None and not terminar:
+            lote.append(primera)
+            while len(lote) < EXCEL_LOG_LOTE_MAXIMO:
+                try:
+                    siguiente = _cola_registros.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is _FIN_ESCRITOR:
+                    terminar = True
+                    break
+                lote.append(siguiente)
+
+        if lote:
+            _escribir_lote_diario(lote)
+        if terminar:
+            return
+        if time.monotonic() - ultima_compactacion >= EXCEL_LOG_INTERVALO_COMPACTACION_SEG:
+            compactar_diario_en_excel()
+            ultima_compactacion = time.monotonic()
+
+def finalizar_registro_excel(timeout_seg=10):
+    """
+    Vacía la cola, detiene el hilo escritor y vuelca el diario al Excel.
+    Se llama al cerrar la aplicación y además queda registrada con atexit como garantía.
+    """
+    global _hilo_escritor
+    with _lock_hilo_escritor:
+        hilo = _hilo_escritor
+        _hilo_escritor = None
+    if hilo is None:
+        # El hilo escritor no se usó en este proceso (p. ej. cli.py) o ya se finalizó: no se
+        # carga openpyxl solo para volcar un diario que otra sesión de la aplicación volcará
+        return
+    if hilo.is_alive():
+        _cola_registros.put(_FIN_ESCRITOR)
+        hilo.join(timeout_seg)
+
+    # Entradas encoladas después del centinela (o si el hilo no respondió a tiempo)
+    restantes = []
+    while True:
+        try:
+            log_entry = _cola_registros.get_nowait()
+        except queue.Empty:
+            break
+        if log_entry is not _FIN_ESCRITOR:
+            restantes.append(log_entry)
+    if restantes:
+        _escribir_lote_diario(restantes)
+    compactar_diario_en_excel()
+
+atexit.register(finalizar_registro_excel)
@@ -0,0 +1,223 @@
+# hash_contrasenas.py
+# Hash de contraseñas con una función de derivación lenta (PBKDF2 o scrypt, ambas de hashlib) y
+# sal aleatoria. Cada hash guarda su algoritmo y su costo, así que se puede subir el costo o
+# cambiar de algoritmo sin invalidar las contraseñas existentes:
+#
+#   pbkdf2_sha256$<iteraciones>$<sal>$<hash>
+#   scrypt$<n>$<r>$<p>$<sal>$<hash>           (sal y hash en base64)
+#   <64 dígitos hexadecimales>                (SHA-256 sin sal de versiones anteriores)
+#
+# El costo se calibra una vez por instalación para que verificar una contraseña tarde cerca de
+# CONTRASENA_KDF_TIEMPO_OBJETIVO_MS en este equipo, y se guarda en data/kdf_calibracion.json.
+# Para volver a calibrar (p. ej. después de cambiar de equipo):
+#
+#     python hash_contrasenas.py --calibrar [--algoritmo scrypt] [--objetivo-ms 300]
+#
+# Verificar es deliberadamente lento: la interfaz lo hace fuera del hilo de Tk.
+
+import os
+import sys
+import json
+import hmac
+import math
+import time
+import base64
+import socket
+import hashlib
+import argparse
+import contextlib
+import datetime
+import threading
+
+from config import CONTRASENA_KDF_ALGORITMO, CONTRASENA_KDF_TIEMPO_OBJETIVO_MS, CONTRASENA_KDF_CALIBRACION_FULL_PATH
+from persistencia_json import escribir_json_atomico
+
+_BYTES_SAL = 16
+
+def _b64(datos):
+    return base64.b64encode(datos).decode("ascii")
+
+# --- Algoritmos ---
+class HasherPBKDF2:
+    """PBKDF2-HMAC-SHA256; el costo es la cantidad de iteraciones."""
+    nombre = "pbkdf2_sha256"
+    costo_minimo = 100_000
+    costo_maximo = 50_000_000
+
+    def generar(self, contrasena, costo):
+        sal = os.urandom(_BYTES_SAL)
+        derivada = hashlib.pbkdf2_hmac("sha256", contrasena.encode("utf-8"), sal, costo)
+        return f"{self.nombre}${costo}${_b64(sal)}${_b64(derivada)}"
+
+    def verificar(self, hash_guardado, contrasena):
+        _, iteraciones, sal, esperado = hash_guardado.split("$")
+        derivada = hashlib.pbkdf2_hmac("sha256", contrasena.encode("utf-8"), base64.b64decode(sal), int(iteraciones))
+        return hmac.compare_digest(derivada, base64.b64decode(esperado))
+
+    def costo(self, hash_guardado):
+        return int(hash_guardado.split("$")[1])
+
+    def ajustar_costo(self, costo):
+        """Redondea el costo calibrado a miles de iteraciones."""
+        return max(self.costo_minimo, min(self.costo_maximo, int(round(costo, -3))))
+
+class HasherScrypt:
+    """scrypt con r=8 y p=1; el costo es n (potencia de 2). Usa 128 * n * r bytes de memoria."""
+    nombre = "scrypt"
+    costo_minimo = 2 ** 14
+    costo_maximo = 2 ** 17 # 128 MB por verificación
+    r, p = 8, 1
+
+    def _derivar(self, contrasena, sal, n, r, p):
+        return hashlib.scrypt(contrasena.encode("utf-8"), salt=sal, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024, dklen=32)
+
+    def generar(self, contrasena, costo):
+        sal = os.urandom(_BYTES_SAL)
+        derivada = self._derivar(contrasena, sal, costo, self.r, self.p)
+        return f"{self.nombre}${costo}${self.r}${self.p}${_b64(sal)}${_b64(derivada)}"
+
+    def verificar(self, hash_guardado, contrasena):
+        _, n, r, p, sal, esperado = hash_guardado.split("$")
+        derivada = self._derivar(contrasena, base64.b64decode(sal), int(n), int(r), int(p))
+        return hmac.compare_digest(derivada, base64.b64decode(esperado))
+
+    def costo(self, hash_guardado):
+        return int(hash_guardado.split("$")[1])
+
+    def ajustar_costo(self, costo):
+        """n tiene que ser potencia de 2: se toma la más cercana (en escala logarítmica)."""
+        return max(self.costo_minimo, min(self.costo_maximo, 2 ** round(math.log2(max(costo, 2)))))
+
+class HasherSHA256Legado:
+    """SHA-256 sin sal de versiones anteriores: solo se verifica, para reemplazarlo al iniciar sesión."""
+    nombre = "sha256"
+
+    def generar(self, contrasena, costo=None):
+        return hashlib.sha256(contrasena.encode()).hexdigest()
+
+    def verificar(self, hash_guardado, contrasena):
+        return hmac.compare_digest(hash_guardado, self.generar(contrasena))
+
+    def costo(self, hash_guardado):
+        return 0
+
+_HASHERS = {hasher.nombre: hasher for hasher in (HasherPBKDF2(), HasherScrypt(), HasherSHA256Legado())}
+
+def registrar_hasher(hasher):
+    """Agrega un algoritmo (objeto con nombre, generar, verificar, costo, costo_minimo/maximo y ajustar_costo)."""
+    _HASHERS[hasher.nombre] = hasher
+
+def _algoritmo_configurado():
+    if CONTRASENA_KDF_ALGORITMO == "scrypt" and not hasattr(hashlib, "scrypt"):
+        # hashlib.scrypt requiere Python compilado con OpenSSL 1.1 o superior
+        return "pbkdf2_sha256"
+    return CONTRASENA_KDF_ALGORITMO
+
+def obtener_hasher(hash_guardado):
+    """Hasher que corresponde a un hash guardado (por su prefijo; sin prefijo es el SHA-256 anterior)."""
+    if "$" not in hash_guardado:
+        return _HASHERS["sha256"]
+    return _HASHERS[hash_guardado.split("$", 1)[0]]
+
+# --- Calibración ---
+_calibracion = None # {algoritmo: {"costo", "objetivo_ms", "medido_ms", ...}} leído de data/kdf_calibracion.json
+_lock_calibracion = threading.Lock()
+
+def _medir_ms(hasher, costo, repeticiones=3):
+    """Mejor tiempo (ms) de generar un hash con ese costo."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        hasher.generar("calibracion", costo)
+        mejor = min(mejor, (time.perf_counter() - inicio) * 1000)
+    return mejor
+
+def calibrar(algoritmo=None, objetivo_ms=CONTRASENA_KDF_TIEMPO_OBJETIVO_MS, guardar=True):
+    """
+    Busca el costo con el que una verificación tarda alrededor de 'objetivo_ms' en este equipo:
+    duplica el costo hasta acercarse al objetivo y extrapola (el tiempo es proporcional al costo).
+    Retorna {'algoritmo', 'costo', 'objetivo_ms', 'medido_ms', ...} y, con 'guardar', lo persiste.
+    """
+    global _calibracion
+    algoritmo = algoritmo or _algoritmo_configurado()
+    hasher = _HASHERS[algoritmo]
+    costo = hasher.costo_minimo
+    medido_ms = _medir_ms(hasher, costo)
+    while medido_ms < objetivo_ms / 4 and costo < hasher.costo_maximo:
+        costo = min(costo * 2, hasher.costo_maximo)
+        medido_ms = _medir_ms(hasher, costo)
+    costo = hasher.ajustar_costo(costo * objetivo_ms / medido_ms)
+    resultado = {"algoritmo": algoritmo, "costo": costo, "objetivo_ms": objetivo_ms,
+                 "medido_ms": round(_medir_ms(hasher, costo, repeticiones=1), 1),
+                 "equipo": socket.gethostname(), "fecha": datetime.datetime.now().isoformat(timespec="seconds")}
+    print(f"INFO (hash_contrasenas): Calibrado {algoritmo}: costo {costo} ({resultado['medido_ms']} ms, objetivo {objetivo_ms} ms).")
+    if guardar:
+        with _lock_calibracion:
+            calibracion = dict(_leer_calibracion())
+            calibracion[algoritmo] = resultado
+            try:
+                escribir_json_atomico(CONTRASENA_KDF_CALIBRACION_FULL_PATH, calibracion, indent=2)
+            except OSError as e:
+                print(f"ADVERTENCIA (hash_contrasenas): No se pudo guardar la calibración '{CONTRASENA_KDF_CALIBRACION_FULL_PATH}': {e}")
+            _calibracion = calibracion
+    return resultado
+
+def _leer_calibracion():
+    global _calibracion
+    if _calibracion is None:
+        try:
+            with open(CONTRASENA_KDF_CALIBRACION_FULL_PATH, 'r', encoding='utf-8') as f:
+                _calibracion = json.load(f)
+        except FileNotFoundError:
+            _calibracion = {}
+        except (OSError, ValueError) as e:
+            print(f"ADVERTENCIA (hash_contrasenas): Calibración ilegible ({e}); se vuelve a calibrar.")
+            _calibracion = {}
+    return _calibracion
+
+def obtener_costo(algoritmo):
+    """Costo vigente del algoritmo; la primera vez se calibra."""
+    with _lock_calibracion:
+        datos = _leer_calibracion().get(algoritmo)
+    if datos:
+        return datos["costo"]
+    return calibrar(algoritmo)["costo"]
+
+# --- API ---
+def generar_hash(contrasena):
+    """Hash de la contraseña con el algoritmo configurado, sal aleatoria y el costo calibrado."""
+    algoritmo = _algoritmo_configurado()
+    return _HASHERS[algoritmo].generar(contrasena, obtener_costo(algoritmo))
+
+def verificar_contrasena(hash_guardado, contrasena):
+    """Indica si la contraseña corresponde al hash guardado (comparación en tiempo constante)."""
+    try:
+        return obtener_hasher(hash_guardado).verificar(hash_guardado, contrasena)
+    except (KeyError, ValueError, TypeError) as e:
+        print(f"ADVERTENCIA (hash_contrasenas): Hash de contraseña con formato desconocido: {e}")
+        return False
+
+def requiere_actualizacion(hash_guardado):
+    """Indica si el hash usa otro algoritmo o un costo menor que el vigente (se regenera al iniciar sesión)."""
+    hasher = obtener_hasher(hash_guardado)
+    algoritmo = _algoritmo_configurado()
+    return hasher.nombre != algoritmo or hasher.costo(hash_guardado) < obtener_costo(algoritmo)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibración del hash de contraseñas.")
+    parser.add_argument("--calibrar", action="store_true", help="Vuelve a calibrar y guarda el resultado")
+    parser.add_argument("--algoritmo", choices=[nombre for nombre in _HASHERS if nombre != "sha256"], default=None)
+    parser.add_argument("--objetivo-ms", type=int, default=CONTRASENA_KDF_TIEMPO_OBJETIVO_MS)
+    argumentos = parser.parse_args(argv)
+    if argumentos.calibrar:
+        with contextlib.redirect_stdout(sys.stderr): # La salida estándar queda solo para el JSON
+            resultado = calibrar(argumentos.algoritmo, argumentos.objetivo_ms)
+    else:
+        resultado = _leer_calibracion()
+    json.dump(resultado, sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+# importacion_catalogo.py
+# Importación y exportación masiva del catálogo de productos (CSV y XLSX).
+# La lectura es por streaming (csv / openpyxl en modo read_only), cada fila se valida con
+# las mismas reglas que el formulario de registro y todo el lote se guarda en una sola escritura.
+# La exportación también es por streaming (openpyxl en modo write_only).
+
+import os
+import re
+import csv
+import datetime
+
+import data_manager
+from config import LOGS_PATH
+from indice_trigramas import normalizar_texto_busqueda
+from validacion_productos import es_recurso_valido, es_stock_valido
+
+# Columnas del catálogo en el orden de exportación: (campo interno, encabezado)
+COLUMNAS_CATALOGO = [
+    ("nombre", "Nombre Producto"),
+    ("serie", "Serie"),
+    ("manual", "Manual"),
+    ("calibracion", "Calibracion"),
+    ("bateria", "Bateria"),
+    ("info", "Info Adicional"),
+    ("imagen", "Imagen"),
+    ("stock", "Stock"),
+]
+
+# Encabezados aceptados al importar (ya normalizados: sin acentos, minúsculas, sin paréntesis)
+_ALIAS_COLUMNAS = {
+    "nombre": "nombre", "nombre producto": "nombre", "producto": "nombre", "modelo": "nombre",
+    "serie": "serie", "numero de serie": "serie",
+    "manual": "manual",
+    "calibracion": "calibracion",
+    "bateria": "bateria",
+    "info": "info", "info adicional": "info",
+    "imagen": "imagen",
+    "stock": "stock", "stock inicial": "stock",
+}
+
+def _normalizar_encabezado(encabezado):
+    texto = normalizar_texto_busqueda(str(encabezado or ""))
+    texto = re.sub(r"\(.*?\)", "", texto).replace("_", " ").replace(":", "")
+    return " ".join(texto.split())
+
+def _mapear_encabezados(encabezados):
+    """Retorna una lista paralela a los encabezados con el campo interno de cada columna (o None)."""
+    campos = [_ALIAS_COLUMNAS.get(_normalizar_encabezado(e)) for e in encabezados]
+    if "nombre" not in campos:
+        raise ValueError("El archivo no tiene una columna de nombre de producto (p. ej. 'Nombre Producto').")
+    return campos
+
+def _valor_como_texto(valor):
+    """Convierte el valor de una celda a texto (los números enteros de Excel llegan como float)."""
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+# --- Lectura por streaming ---
+def _leer_filas_csv(ruta_archivo):
+    """Genera (número_de_fila, {campo: texto}) leyendo el CSV línea a línea."""
+    with open(ruta_archivo, 'r', encoding='utf-8-sig', newline='') as f:
+        muestra = f.read(4096)
+        f.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(f, dialecto)
+        campos = _mapear_encabezados(next(lector, []))
+        for num_fila, valores in enumerate(lector, 2):
+            if not any(v.strip() for v in valores):
+                continue
+            yield num_fila, {campo: _valor_como_texto(v) for campo, v in zip(campos, valores) if campo}
+
+def _leer_filas_xlsx(ruta_archivo):
+    """Genera (número_de_fila, {campo: texto}) leyendo la primera hoja en modo read_only."""
+    import openpyxl # Importación diferida: solo se carga al importar/exportar un XLSX
+    workbook = openpyxl.load_workbook(ruta_archivo, read_only=True, data_only=True)
+    try:
+        filas = workbook.active.iter_rows(values_only=True)
+        campos = _mapear_encabezados(next(filas, ()))
+        for num_fila, valores in enumerate(filas, 2):
+            if all(v is None or str(v).strip() == "" for v in valores):
+                continue
+            yield num_fila, {campo: _valor_como_texto(v) for campo, v in zip(campos, valores) if campo}
+    finally:
+        workbook.close()
+
+def _leer_filas(ruta_archivo):
+    extension = os.path.splitext(ruta_archivo)[1].lower()
+    if extension == ".csv":
+        return _leer_filas_csv(ruta_archivo)
+    if extension in (".xlsx", ".xlsm"):
+        return _leer_filas_xlsx(ruta_archivo)
+    raise ValueError(f"Formato no soportado: '{extension}'. Use un archivo .csv o .xlsx.")
+
+# --- Validación ---
+def validar_fila_producto(valores, producto_nuevo=True):
+    """
+    Valida una fila con las reglas del formulario de registro.
+    Retorna (nombre, datos_producto) o lanza ValueError con el motivo. Para un producto nuevo
+    las columnas que faltan quedan vacías (y el stock es obligatorio); para uno existente solo
+    se retornan las columnas presentes en el archivo, así la actualización no borra el resto.
+    """
+    nombre_producto = valores.get("nombre", "")
+    if not nombre_producto:
+        raise ValueError("El nombre del producto es obligatorio.")
+    if ("stock" in valores or producto_nuevo) and not es_stock_valido(valores.get("stock", "")):
+        raise ValueError("El stock debe ser un número entero mayor o igual a 0.")
+    manual_url = valores.get("manual", "")
+    if manual_url and not es_recurso_valido(manual_url):
+        raise ValueError("URL/Archivo del manual no válida. Debe comenzar con http:// o https://, o ser un nombre de archivo local existente en la carpeta de manuales.")
+    calibracion_url = valores.get("calibracion", "")
+    if calibracion_url and not es_recurso_valido(calibracion_url):
+        raise ValueError("URL de calibración no válida. Debe comenzar con http:// o https://.")
+    datos_producto = {campo: valores[campo] for campo, _ in COLUMNAS_CATALOGO[1:] if campo in valores}
+    if producto_nuevo:
+        datos_producto = {**{campo: "" for campo, _ in COLUMNAS_CATALOGO[1:]}, **datos_producto}
+    if "stock" in datos_producto:
+        datos_producto["stock"] = int(datos_producto["stock"])
+    return nombre_producto, datos_producto
+
+# --- Importación ---
+def importar_catalogo(ruta_archivo, actualizar_existentes=False, cancelado=None):
+    """
+    Importa productos desde un CSV o XLSX. Las filas válidas se guardan todas juntas en una
+    sola escritura; las inválidas se reportan. Retorna un diccionario con:
+    'filas_leidas', 'registrados', 'actualizados' y 'errores' (lista de (fila, nombre, motivo)).
+    Si cancelado() retorna True durante la lectura, no se guarda nada y retorna None.
+    """
+    productos_validos = {}
+    errores = []
+    filas_leidas = 0
+    for num_fila, valores in _leer_filas(ruta_archivo):
+        if cancelado is not None and cancelado():
+            return None
+        filas_leidas += 1
+        nombre_fila = valores.get("nombre", "")
+        try:
+            existente = bool(nombre_fila) and data_manager.get_producto_data(nombre_fila) is not None
+            nombre_producto, datos_producto = validar_fila_producto(valores, producto_nuevo=not existente)
+            if nombre_producto in productos_validos:
+                raise ValueError("El producto aparece repetido en el archivo.")
+            if existente and not actualizar_existentes:
+                raise ValueError(f"El producto '{nombre_producto}' ya existe.")
+        except ValueError as e:
+            errores.append((num_fila, nombre_fila, str(e)))
+            continue
+        productos_validos[nombre_producto] = datos_producto
+
+    if cancelado is not None and cancelado():
+        return None
+    registrados, actualizados = data_manager.registrar_productos_lote(productos_validos, actualizar_existentes=actualizar_existentes)
+    return {"filas_leidas": filas_leidas, "registrados": registrados, "actualizados": actualizados, "errores": errores}
+
+def escribir_reporte_errores(errores, ruta_reporte=None):
+    """Escribe los errores de una importación en un CSV dentro de la carpeta de logs. Retorna la ruta."""
+    if ruta_reporte is None:
+        os.makedirs(LOGS_PATH, exist_ok=True)
+        marca = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        ruta_reporte = os.path.join(LOGS_PATH, f"reporte_importacion_{marca}.csv")
+    with open(ruta_reporte, 'w', encoding='utf-8-sig', newline='') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["Fila", "Nombre Producto", "Motivo"])
+        escritor.writerows(errores)
+    return ruta_reporte
+
+# --- Exportación ---
+def _filas_catalogo(cancelado=None):
+    """Genera las filas del catálogo en orden alfabético, sin copiar el catálogo completo."""
+    for nombre_producto in data_manager.buscar_productos_por_prefijo(""):
+        if cancelado is not None and cancelado():
+            return
+        datos_producto = data_manager.get_producto_data(nombre_producto)
+        if datos_producto is None:
+            continue # Eliminado mientras se exportaba
+        yield [nombre_producto] + [datos_producto.get(campo, "") for campo, _ in COLUMNAS_CATALOGO[1:]]
+
+def exportar_catalogo(ruta_archivo, cancelado=None):
+    """
+    Exporta el catálogo a CSV o XLSX (según la extensión) por streaming. Retorna la cantidad de
+    productos, o None si cancelado() retornó True (el archivo a medio escribir se borra).
+    """
+    extension = os.path.splitext(ruta_archivo)[1].lower()
+    encabezados = [encabezado for _, encabezado in COLUMNAS_CATALOGO]
+    cantidad = 0
+    if extension == ".csv":
+        with open(ruta_archivo, 'w', encoding='utf-8-sig', newline='') as f:
+            escritor = csv.writer(f)
+            escritor.writerow(encabezados)
+            for fila in _filas_catalogo(cancelado):
+                escritor.writerow(fila)
+                cantidad += 1
+        if cancelado is not None and cancelado():
+            os.remove(ruta_archivo)
+            return None
+    elif extension == ".xlsx":
+        import openpyxl
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("Catalogo")
+        sheet.append(encabezados)
+        for fila in _filas_catalogo(cancelado):
+            sheet.append(fila)
+            cantidad += 1
+        if cancelado is not None and cancelado():
+            return None
+        workbook.save(ruta_archivo)
+    else:
+        raise ValueError(f"Formato no soportado: '{extension}'. Use un archivo .csv o .xlsx.")
+    return cantidad
@@ -0,0 +1,324 @@
+# indice_manuales.py
+# Búsqueda de texto completo dentro de los manuales PDF locales (carpeta manuales_productos).
+# Se indexan los PDF referenciados en el campo "manual" de los productos: cada página es un
+# documento, el ranking es BM25 y el índice invertido se guarda en data/ para que al volver a
+# abrir la aplicación solo se procesen los archivos cuyo tamaño o fecha de modificación cambió.
+# La primera construcción (o cualquier lote grande) extrae el texto en un pool de procesos.
+#
+# La extracción de texto usa el paquete opcional 'pypdf' (pip install pypdf). Si no está
+# instalado, la búsqueda en manuales queda desactivada y pypdf_disponible() retorna False.
+
+import os
+import re
+import math
+import heapq
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from config import (MANUALES_INDICE_FULL_PATH, MANUALES_INDICE_PROCESOS, MANUALES_INDICE_MIN_ARCHIVOS_POOL,
+                    MANUALES_BUSQUEDA_LIMITE)
+from indice_trigramas import normalizar_texto_busqueda
+from persistencia_json import escribir_json_atomico, cargar_json_con_recuperacion
+
+VERSION_FORMATO_INDICE = 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Palabras y códigos: "E-04", "3.7V" y "RS232" se indexan enteros y además por partes ("e", "04")
+_PATRON_TERMINO = re.compile(r"[0-9a-zñ]+(?:[-./][0-9a-zñ]+)*")
+_PATRON_PARTE = re.compile(r"[0-9a-zñ]+")
+
+def pypdf_disponible():
+    try:
+        import pypdf # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def extraer_terminos(texto):
+    """Retorna la lista de términos (normalizados, con repeticiones) de un texto."""
+    terminos = []
+    for termino in _PATRON_TERMINO.findall(normalizar_texto_busqueda(texto)):
+        terminos.append(termino)
+        if not termino.isalnum():
+            terminos.extend(_PATRON_PARTE.findall(termino))
+    return terminos
+
+def _extraer_paginas_pdf(ruta_pdf):
+    """
+    Retorna [{termino: frecuencia}] (una entrada por página) de un PDF. Se ejecuta en los
+    procesos del pool, por eso es una función de módulo y no devuelve el texto completo.
+    """
+    from pypdf import PdfReader
+    paginas = []
+    for pagina in PdfReader(ruta_pdf).pages:
+        try:
+            texto = pagina.extract_text() or ""
+        except Exception:
+            texto = "" # Una página dañada no invalida el resto del manual
+        paginas.append(dict(Counter(extraer_terminos(texto))))
+    return paginas
+
+def _extraer_paginas_pdf_seguro(ruta_pdf):
+    """Como _extraer_paginas_pdf, pero retorna (paginas, error) en lugar de lanzar excepciones."""
+    try:
+        return _extraer_paginas_pdf(ruta_pdf), None
+    except Exception as e:
+        return None, str(e)
+
+class IndiceManuales:
+    """Índice invertido termino -> {id_documento: frecuencia}; cada documento es una página de un manual."""
+
+    def __init__(self):
+        self._archivos = {} # {ruta_relativa: {"tamano", "mtime_ns", "documentos": [ids]}}
+        self._documentos = {} # {id_documento: (ruta_relativa, numero_pagina, cantidad_terminos)}
+        self._postings = {} # {termino: {id_documento: frecuencia}}
+        self._siguiente_id = 0
+        self._total_terminos = 0
+        self.modificado = False
+
+    def __len__(self):
+        return len(self._archivos)
+
+    @property
+    def cantidad_paginas(self):
+        return len(self._documentos)
+
+    # --- Mantenimiento ---
+    def _quitar_archivo(self, ruta_relativa):
+        info = self._archivos.pop(ruta_relativa, None)
+        if info is None:
+            return
+        for id_documento in info["documentos"]:
+            _, _, cantidad_terminos = self._documentos.pop(id_documento)
+            self._total_terminos -= cantidad_terminos
+        ids = set(info["documentos"])
+        for termino in info["terminos"]:
+            postings_termino = self._postings.get(termino)
+            if postings_termino is None:
+                continue
+            for id_documento in ids.intersection(postings_termino):
+                del postings_termino[id_documento]
+            if not postings_termino:
+                del self._postings[termino]
+        self.modificado = True
+
+    def _agregar_archivo(self, ruta_relativa, tamano, mtime_ns, paginas):
+        ids, terminos_archivo = [], set()
+        for numero_pagina, frecuencias in enumerate(paginas, 1):
+            id_documento = self._siguiente_id
+            self._siguiente_id += 1
+            cantidad_terminos = sum(frecuencias.values())
+            self._documentos[id_documento] = (ruta_relativa, numero_pagina, cantidad_terminos)
+            self._total_terminos += cantidad_terminos
+            for termino, frecuencia in frecuencias.items():
+                self._postings.setdefault(termino, {})[id_documento] = frecuencia
+            terminos_archivo.update(frecuencias)
+            ids.append(id_documento)
+        self._archivos[ruta_relativa] = {"tamano": tamano, "mtime_ns": mtime_ns, "documentos": ids, "terminos": sorted(terminos_archivo)}
+        self.modificado = True
+
+    def actualizar(self, archivos, procesos=MANUALES_INDICE_PROCESOS, cancelado=None):
+        """
+        Sincroniza el índice con {ruta_relativa: ruta_completa}: quita los manuales que ya no están
+        y (re)indexa solo los nuevos o los que cambiaron de tamaño/fecha. Retorna
+        (reindexados, eliminados, errores) donde errores es una lista de (ruta_relativa, motivo).
+        Si cancelado() retorna True se deja de extraer entre un archivo y otro: los ya procesados
+        quedan en el índice y el resto se indexa en la próxima actualización.
+        """
+        eliminados = [ruta for ruta in self._archivos if ruta not in archivos]
+        for ruta_relativa in eliminados:
+            self._quitar_archivo(ruta_relativa)
+
+        pendientes = {} # {ruta_relativa: (ruta_completa, tamano, mtime_ns)}
+        for ruta_relativa, ruta_completa in archivos.items():
+            try:
+                info_archivo = os.stat(ruta_completa)
+            except OSError:
+                continue
+            info = self._archivos.get(ruta_relativa)
+            if info is None or info["tamano"] != info_archivo.st_size or info["mtime_ns"] != info_archivo.st_mtime_ns:
+                pendientes[ruta_relativa] = (ruta_completa, info_archivo.st_size, info_archivo.st_mtime_ns)
+        if not pendientes:
+            return 0, len(eliminados), []
+
+        rutas = [ruta_completa for ruta_completa, _, _ in pendientes.values()]
+        resultados = []
+        if len(rutas) >= MANUALES_INDICE_MIN_ARCHIVOS_POOL and procesos != 1:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                futuros = [pool.submit(_extraer_paginas_pdf_seguro, ruta) for ruta in rutas]
+                for futuro in futuros:
+                    if cancelado is not None and cancelado():
+                        for pendiente in futuros:
+                            pendiente.cancel() # Los que ya están corriendo terminan su archivo
+                        break
+                    resultados.append(futuro.result())
+        else:
+            for ruta in rutas:
+                if cancelado is not None and cancelado():
+                    break
+                resultados.append(_extraer_paginas_pdf_seguro(ruta))
+
+        errores = []
+        for (ruta_relativa, (_, tamano, mtime_ns)), (paginas, error) in zip(pendientes.items(), resultados):
+            self._quitar_archivo(ruta_relativa)
+            if error is not None:
+                errores.append((ruta_relativa, error))
+                continue
+            self._agregar_archivo(ruta_relativa, tamano, mtime_ns, paginas)
+        return len(resultados) - len(errores), len(eliminados), errores
+
+    def copiar(self):
+        """Retorna una copia independiente (para actualizarla sin bloquear las búsquedas)."""
+        copia = IndiceManuales()
+        copia._archivos = {ruta: dict(info) for ruta, info in self._archivos.items()}
+        copia._documentos = dict(self._documentos)
+        copia._postings = {termino: dict(postings_termino) for termino, postings_termino in self._postings.items()}
+        copia._siguiente_id = self._siguiente_id
+        copia._total_terminos = self._total_terminos
+        return copia
+
+    # --- Búsqueda ---
+    def buscar(self, texto, limite=MANUALES_BUSQUEDA_LIMITE):
+        """
+        Retorna hasta 'limite' páginas ordenadas por relevancia BM25, como tuplas
+        (ruta_relativa, numero_pagina, puntaje).
+        """
+        terminos = set(extraer_terminos(texto))
+        cantidad_documentos = len(self._documentos)
+        if not terminos or not cantidad_documentos:
+            return []
+        longitud_media = self._total_terminos / cantidad_documentos or 1.0
+        puntajes = defaultdict(float)
+        for termino in terminos:
+            postings_termino = self._postings.get(termino)
+            if not postings_termino:
+                continue
+            idf = math.log(1 + (cantidad_documentos - len(postings_termino) + 0.5) / (len(postings_termino) + 0.5))
+            for id_documento, frecuencia in postings_termino.items():
+                longitud = self._documentos[id_documento][2]
+                puntajes[id_documento] += idf * frecuencia * (BM25_K1 + 1) / (frecuencia + BM25_K1 * (1 - BM25_B + BM25_B * longitud / longitud_media))
+        mejores = heapq.nlargest(limite, puntajes.items(), key=lambda item: item[1])
+        return [(self._documentos[id_documento][0], self._documentos[id_documento][1], puntaje) for id_documento, puntaje in mejores]
+
+    # --- Persistencia ---
+    def cargar(self, ruta_archivo):
+        """Carga un índice guardado. Si no existe o es ilegible, el índice queda vacío (se reconstruirá)."""
+        self.__init__()
+        try:
+            contenido, _ = cargar_json_con_recuperacion(ruta_archivo)
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            print(f"ADVERTENCIA (indice_manuales): No se pudo leer el índice '{ruta_archivo}': {e}. Se reconstruirá.")
+            return
+        if contenido.get("version") != VERSION_FORMATO_INDICE:
+            print(f"ADVERTENCIA (indice_manuales): Formato de índice desconocido en '{ruta_archivo}'. Se reconstruirá.")
+            return
+        self._archivos = contenido["archivos"]
+        self._documentos = {int(id_documento): tuple(datos) for id_documento, datos in contenido["documentos"].items()}
+        self._postings = {termino: {int(id_documento): frecuencia for id_documento, frecuencia in postings_termino}
+                          for termino, postings_termino in contenido["postings"].items()}
+        self._siguiente_id = contenido["siguiente_id"]
+        self._total_terminos = sum(datos[2] for datos in self._documentos.values())
+
+    def guardar(self, ruta_archivo):
+        """Guarda el índice en disco (solo si cambió desde la última carga/guardado)."""
+        if not self.modificado:
+            return
+        contenido = {
+            "version": VERSION_FORMATO_INDICE,
+            "siguiente_id": self._siguiente_id,
+            "archivos": self._archivos,
+            "documentos": self._documentos,
+            "postings": {termino: list(postings_termino.items()) for termino, postings_termino in self._postings.items()},
+        }
+        escribir_json_atomico(ruta_archivo, contenido, ensure_ascii=False, separators=(",", ":"))
+        self.modificado = False
+
+# --- Índice compartido por la aplicación ---
+_indice = None
+_lock_indice = threading.Lock() # Protege el índice entre la actualización (hilo) y las búsquedas
+_lock_actualizacion = threading.Lock() # Una sola actualización a la vez
+_manuales_por_producto = (None, {}) # (generación del catálogo, {ruta_relativa_normalizada: [productos]})
+
+def _obtener_indice():
+    global _indice
+    with _lock_indice:
+        if _indice is None:
+            _indice = IndiceManuales()
+            _indice.cargar(MANUALES_INDICE_FULL_PATH)
+        return _indice
+
+def _clave_manual(ruta_relativa):
+    return os.path.normcase(os.path.normpath(ruta_relativa))
+
+def _productos_por_manual():
+    """{ruta_relativa_normalizada: [productos]} de los manuales locales; se recalcula solo si cambió el catálogo."""
+    global _manuales_por_producto
+    import data_manager
+    from validacion_productos import es_url_web
+    generacion = data_manager.get_generacion_productos()
+    if _manuales_por_producto[0] != generacion:
+        mapa = defaultdict(list)
+        # Corre en hilos de trabajo: se recorre una copia, no la vista que otros hilos modifican
+        for nombre_producto, datos_producto in data_manager.copiar_productos_data().items():
+            manual = str(datos_producto.get("manual", "") or "").strip()
+            if manual and not es_url_web(manual):
+                mapa[_clave_manual(manual)].append(nombre_producto)
+        _manuales_por_producto = (generacion, dict(mapa))
+    return _manuales_por_producto[1]
+
+def manuales_referenciados():
+    """Retorna {ruta_relativa: ruta_completa} de los PDF locales existentes que figuran como manual de algún producto."""
+    from validacion_productos import obtener_ruta_manual
+    archivos = {}
+    for clave in _productos_por_manual():
+        ruta_completa = obtener_ruta_manual(clave)
+        if ruta_completa and ruta_completa.lower().endswith(".pdf") and os.path.isfile(ruta_completa):
+            archivos[clave] = ruta_completa
+    return archivos
+
+def actualizar_indice_manuales(cancelado=None):
+    """
+    Sincroniza el índice con los manuales referenciados por el catálogo y lo guarda.
+    Pensada para correr en un hilo de fondo. Retorna (reindexados, eliminados, errores).
+    Con 'cancelado' (ver IndiceManuales.actualizar) se puede cortar a mitad y guardar lo avanzado.
+    """
+    if not pypdf_disponible():
+        raise RuntimeError("El paquete 'pypdf' no está instalado (pip install pypdf).")
+    with _lock_actualizacion:
+        archivos = manuales_referenciados()
+        # La extracción se hace sobre una copia para no bloquear las búsquedas mientras tanto
+        copia = _obtener_indice().copiar()
+        resultado = copia.actualizar(archivos, cancelado=cancelado)
+        for ruta_relativa, motivo in resultado[2]:
+            print(f"ADVERTENCIA (indice_manuales): No se pudo leer el manual '{ruta_relativa}': {motivo}")
+        if copia.modificado:
+            try:
+                copia.guardar(MANUALES_INDICE_FULL_PATH)
+            except Exception as e:
+                print(f"ERROR (indice_manuales): No se pudo guardar el índice de manuales: {e}")
+        _reemplazar_indice(copia)
+        return resultado
+
+def _reemplazar_indice(nuevo):
+    global _indice
+    with _lock_indice:
+        _indice = nuevo
+
+def estado_indice_manuales():
+    """Retorna (cantidad_manuales, cantidad_paginas) del índice en memoria."""
+    indice = _obtener_indice()
+    return len(indice), indice.cantidad_paginas
+
+def buscar_en_manuales(texto, limite=MANUALES_BUSQUEDA_LIMITE):
+    """
+    Busca el texto dentro de los manuales indexados. Retorna una lista de diccionarios
+    {'manual', 'pagina', 'puntaje', 'productos'} ordenada por relevancia.
+    """
+    resultados = _obtener_indice().buscar(texto, limite)
+    productos = _productos_por_manual() if resultados else {}
+    return [{"manual": ruta_relativa, "pagina": pagina, "puntaje": puntaje, "productos": productos.get(ruta_relativa, [])}
+            for ruta_relativa, pagina, puntaje in resultados]
@@ -0,0 +1,211 @@
+# indice_trigramas.py
+# Índice invertido de trigramas para la búsqueda de productos tolerante a errores de tipeo.
+# Indexa el nombre, la serie, la batería y la info adicional de cada producto, y se guarda
+# junto a products.json para que al arrancar solo se recalculen los productos que cambiaron.
+
+import os
+import json
+import heapq
+import hashlib
+import unicodedata
+from collections import Counter
+from itertools import chain
+
+from persistencia_json import escribir_json_atomico
+
+# Campos indexados y su peso en el ranking ("nombre" es la clave del producto en el catálogo)
+PESOS_CAMPOS = {"nombre": 1.0, "serie": 0.9, "bateria": 0.6, "info": 0.5}
+VERSION_FORMATO_INDICE = 1
+
+def normalizar_texto_busqueda(texto):
+    """Normaliza un texto para búsquedas: sin acentos y sin distinguir mayúsculas/minúsculas."""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+def extraer_trigramas(texto):
+    """
+    Retorna el conjunto de trigramas de un texto. Cada palabra se rellena con espacios
+    en los bordes para que el inicio de la palabra pese más en la comparación.
+    """
+    trigramas = set()
+    for palabra in normalizar_texto_busqueda(texto).split():
+        palabra_rellena = f"  {palabra} "
+        for i in range(len(palabra_rellena) - 2):
+            trigramas.add(palabra_rellena[i:i + 3])
+    return trigramas
+
+def _textos_campos(nombre_producto, datos_producto):
+    """Retorna {campo: texto} con los campos indexables de un producto."""
+    textos = {"nombre": nombre_producto}
+    for campo in PESOS_CAMPOS:
+        if campo != "nombre":
+            textos[campo] = str(datos_producto.get(campo, "") or "")
+    return textos
+
+def _huella_producto(textos_campos):
+    """Huella de los campos indexados; si no cambia, los trigramas guardados siguen siendo válidos."""
+    contenido = "\x1f".join(textos_campos[campo] for campo in PESOS_CAMPOS)
+    return hashlib.sha1(contenido.encode("utf-8")).hexdigest()
+
+class IndiceTrigramas:
+    """Índice invertido trigrama -> productos, separado por campo."""
+
+    def __init__(self):
+        self._huellas = {} # {nombre_producto: huella de sus campos indexados}
+        self._trigramas_nombre = {} # {nombre_producto: cantidad de trigramas del nombre}
+        self._postings = {campo: {} for campo in PESOS_CAMPOS} # {campo: {trigrama: set(nombres)}}
+        self.modificado = False
+
+    def __len__(self):
+        return len(self._huellas)
+
+    # --- Mantenimiento ---
+    def _agregar(self, nombre_producto, textos):
+        for campo, texto in textos.items():
+            postings_campo = self._postings[campo]
+            trigramas = extraer_trigramas(texto)
+            for trigrama in trigramas:
+                postings_campo.setdefault(trigrama, set()).add(nombre_producto)
+            if campo == "nombre":
+                self._trigramas_nombre[nombre_producto] = len(trigramas)
+        self._huellas[nombre_producto] = _huella_producto(textos)
+
+    def _quitar(self, nombre_producto, textos):
+        for campo, texto in textos.items():
+            postings_campo = self._postings[campo]
+            for trigrama in extraer_trigramas(texto):
+                nombres = postings_campo.get(trigrama)
+                if nombres is not None:
+                    nombres.discard(nombre_producto)
+                    if not nombres:
+                        del postings_campo[trigrama]
+        self._huellas.pop(nombre_producto, None)
+        self._trigramas_nombre.pop(nombre_producto, None)
+
+    def _quitar_en_bloque(self, nombres_productos):
+        """Quita varios productos sin conocer sus textos anteriores (una pasada por los postings)."""
+        if not nombres_productos:
+            return
+        for postings_campo in self._postings.values():
+            for trigrama in list(postings_campo):
+                nombres = postings_campo[trigrama]
+                nombres -= nombres_productos
+                if not nombres:
+                    del postings_campo[trigrama]
+        for nombre_producto in nombres_productos:
+            self._huellas.pop(nombre_producto, None)
+            self._trigramas_nombre.pop(nombre_producto, None)
+        self.modificado = True
+
+    def actualizar_producto(self, nombre_producto, datos_producto, datos_anteriores=None):
+        """
+        Indexa (o reindexa) un producto. Si sus campos indexados no cambiaron no hace nada.
+        datos_anteriores permite quitar los trigramas viejos sin recorrer todo el índice.
+        """
+        textos = _textos_campos(nombre_producto, datos_producto)
+        huella_anterior = self._huellas.get(nombre_producto)
+        if huella_anterior == _huella_producto(textos):
+            return
+        if huella_anterior is not None:
+            if datos_anteriores is not None:
+                self._quitar(nombre_producto, _textos_campos(nombre_producto, datos_anteriores))
+            else:
+                self._quitar_en_bloque({nombre_producto})
+        self._agregar(nombre_producto, textos)
+        self.modificado = True
+
+    def eliminar_producto(self, nombre_producto, datos_producto):
+        """Quita un producto del índice a partir de los datos con los que fue indexado."""
+        if nombre_producto in self._huellas:
+            self._quitar(nombre_producto, _textos_campos(nombre_producto, datos_producto))
+            self.modificado = True
+
+    def sincronizar(self, productos):
+        """
+        Alinea el índice con el catálogo: reindexa solo los productos nuevos o modificados
+        y descarta los que ya no existen. Retorna la cantidad de productos reindexados.
+        """
+        pendientes = {}
+        for nombre_producto, datos_producto in productos.items():
+            textos = _textos_campos(nombre_producto, datos_producto)
+            if self._huellas.get(nombre_producto) != _huella_producto(textos):
+                pendientes[nombre_producto] = textos
+        obsoletos = {n for n in self._huellas if n not in productos}
+        obsoletos.update(n for n in pendientes if n in self._huellas)
+        self._quitar_en_bloque(obsoletos)
+        for nombre_producto, textos in pendientes.items():
+            self._agregar(nombre_producto, textos)
+        if pendientes:
+            self.modificado = True
+        return len(pendientes)
+
+    # --- Persistencia ---
+    def cargar(self, ruta_archivo):
+        """Carga un índice guardado. Si no existe o es ilegible, el índice queda vacío (se reconstruirá)."""
+        self.__init__()
+        if not os.path.exists(ruta_archivo):
+            return
+        try:
+            with open(ruta_archivo, 'r', encoding='utf-8') as f:
+                contenido = json.load(f)
+            if contenido.get("version") != VERSION_FORMATO_INDICE:
+                print(f"ADVERTENCIA (indice_trigramas): Formato de índice desconocido en '{ruta_archivo}'. Se reconstruirá.")
+                return
+            self._huellas = contenido["huellas"]
+            self._trigramas_nombre = contenido["trigramas_nombre"]
+            for campo in PESOS_CAMPOS:
+                self._postings[campo] = {trigrama: set(nombres) for trigrama, nombres in contenido["postings"][campo].items()}
+        except Exception as e:
+            print(f"ADVERTENCIA (indice_trigramas): No se pudo leer el índice '{ruta_archivo}': {e}. Se reconstruirá.")
+            self.__init__()
+
+    def guardar(self, ruta_archivo):
+        """Guarda el índice en disco (solo si cambió desde la última carga/guardado)."""
+        if not self.modificado:
+            return
+        contenido = {
+            "version": VERSION_FORMATO_INDICE,
+            "huellas": self._huellas,
+            "trigramas_nombre": self._trigramas_nombre,
+            "postings": {campo: {trigrama: list(nombres) for trigrama, nombres in postings_campo.items()}
+                         for campo, postings_campo in self._postings.items()},
+        }
+        try:
+            escribir_json_atomico(ruta_archivo, contenido, ensure_ascii=False, separators=(",", ":"))
+            self.modificado = False
+        except Exception as e:
+            print(f"ERROR (indice_trigramas): No se pudo guardar el índice en '{ruta_archivo}': {e}")
+
+    # --- Búsqueda ---
+    def buscar(self, texto_busqueda, limite=20, umbral=0.35):
+        """
+        Retorna una lista de (nombre_producto, puntaje) ordenada de mayor a menor puntaje.
+        El puntaje de cada campo es la fracción de trigramas de la búsqueda presentes en el campo,
+        multiplicada por el peso del campo; en el nombre se premia además la similitud de longitud.
+        """
+        trigramas_busqueda = extraer_trigramas(texto_busqueda)
+        if not trigramas_busqueda:
+            return []
+        total_busqueda = len(trigramas_busqueda)
+
+        puntajes = {}
+        for campo, peso in PESOS_CAMPOS.items():
+            postings_campo = self._postings[campo]
+            # Counter cuenta en C: cuántos trigramas de la búsqueda comparte cada producto
+            coincidencias = Counter(chain.from_iterable(postings_campo.get(t, ()) for t in trigramas_busqueda))
+            # Un producto que no alcanza el umbral ni con todos sus trigramas compartidos se descarta sin calcular más
+            minimo_compartidos = umbral * total_busqueda / peso
+            for nombre_producto, compartidos in coincidencias.items():
+                if compartidos < minimo_compartidos:
+                    continue
+                if campo == "nombre":
+                    total_campo = self._trigramas_nombre[nombre_producto]
+                    similitud = compartidos / (total_busqueda + total_campo - compartidos)
+                    puntaje = peso * (compartidos / total_busqueda + similitud) / 2
+                else:
+                    puntaje = peso * compartidos / total_busqueda
+                if puntaje > puntajes.get(nombre_producto, 0.0):
+                    puntajes[nombre_producto] = puntaje
+
+        candidatos = ((nombre, puntaje) for nombre, puntaje in puntajes.items() if puntaje >= umbral)
+        return heapq.nsmallest(limite, candidatos, key=lambda r: (-r[1], r[0]))
@@ -0,0 +1,183 @@
+# instrumentacion.py
+# Mediciones de tiempo opcionales de las operaciones críticas (carga/guardado de datos, registro
+# de actividad, imágenes, búsquedas, login). Se activa con config.INSTRUMENTACION_ACTIVA; por
+# operación se acumula cantidad, suma, máximo y una muestra de las últimas duraciones para calcular
+# p50/p95/p99, y todo se exporta periódicamente a un archivo local en JSON o en formato de texto
+# de Prometheus.
+#
+# Con la instrumentación desactivada el costo es casi nulo: @medido devuelve la función original
+# sin envolver, medir() entrega un contexto vacío compartido y marca_tiempo() retorna None.
+#
+#     @instrumentacion.medido("data_manager.cargar_productos")
+#     def _cargar_productos(): ...
+#
+#     with instrumentacion.medir("ui.login"):
+#         ...
+#
+#     inicio = instrumentacion.marca_tiempo()             # operaciones asíncronas:
+#     ...                                                 # el fin ocurre en otro callback
+#     instrumentacion.registrar_desde("ui.cargar_imagen", inicio)
+
+import os
+import re
+import time
+import atexit
+import threading
+import functools
+from collections import deque
+
+from config import (INSTRUMENTACION_ACTIVA, INSTRUMENTACION_FORMATO, INSTRUMENTACION_ARCHIVO_FULL_PATH,
+                    INSTRUMENTACION_INTERVALO_EXPORTACION_SEG, INSTRUMENTACION_MUESTRAS_POR_OPERACION)
+from persistencia_json import escribir_json_atomico
+
+CUANTILES = (0.5, 0.95, 0.99)
+
+class _Histograma:
+    """Duraciones de una operación: totales exactos y las últimas N muestras para los cuantiles."""
+
+    __slots__ = ("cantidad", "suma_seg", "maximo_seg", "muestras")
+
+    def __init__(self, max_muestras):
+        self.cantidad = 0
+        self.suma_seg = 0.0
+        self.maximo_seg = 0.0
+        self.muestras = deque(maxlen=max_muestras)
+
+    def agregar(self, duracion_seg):
+        self.cantidad += 1
+        self.suma_seg += duracion_seg
+        if duracion_seg > self.maximo_seg:
+            self.maximo_seg = duracion_seg
+        self.muestras.append(duracion_seg)
+
+    def resumen(self):
+        ordenadas = sorted(self.muestras)
+        cuantiles = {f"p{int(q * 100)}": ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * q))] * 1000 if ordenadas else 0.0
+                     for q in CUANTILES}
+        return {"cantidad": self.cantidad, "suma_ms": self.suma_seg * 1000, "max_ms": self.maximo_seg * 1000, **cuantiles}
+
+_histogramas = {} # {operacion: _Histograma}
+_lock = threading.Lock()
+_temporizador_exportacion = None
+
+class _ContextoVacio:
+    """Contexto que no hace nada (instrumentación desactivada). Se usa una única instancia."""
+    __slots__ = ()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+
+_CONTEXTO_VACIO = _ContextoVacio()
+
+class _Tramo:
+    """Contexto que mide el tiempo entre la entrada y la salida (también si hay una excepción)."""
+    __slots__ = ("operacion", "inicio")
+    def __init__(self, operacion):
+        self.operacion = operacion
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+    def __exit__(self, *exc):
+        registrar_duracion(self.operacion, time.perf_counter() - self.inicio)
+        return False
+
+def registrar_duracion(operacion, duracion_seg):
+    """Agrega una duración (en segundos) al histograma de la operación."""
+    if not INSTRUMENTACION_ACTIVA:
+        return
+    with _lock:
+        histograma = _histogramas.get(operacion)
+        if histograma is None:
+            histograma = _histogramas[operacion] = _Histograma(INSTRUMENTACION_MUESTRAS_POR_OPERACION)
+            _asegurar_exportacion_periodica()
+        histograma.agregar(duracion_seg)
+
+def medir(operacion):
+    """Contexto que mide un tramo de código: with medir("operacion"): ..."""
+    return _Tramo(operacion) if INSTRUMENTACION_ACTIVA else _CONTEXTO_VACIO
+
+def medido(operacion):
+    """Decorador que mide cada llamada a la función. Desactivado, retorna la función sin cambios."""
+    def decorador(funcion):
+        if not INSTRUMENTACION_ACTIVA:
+            return funcion
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                registrar_duracion(operacion, time.perf_counter() - inicio)
+        return envoltura
+    return decorador
+
+def marca_tiempo():
+    """Inicio de una operación asíncrona (None si la instrumentación está desactivada)."""
+    return time.perf_counter() if INSTRUMENTACION_ACTIVA else None
+
+def registrar_desde(operacion, inicio):
+    """Cierra una operación asíncrona iniciada con marca_tiempo()."""
+    if inicio is not None:
+        registrar_duracion(operacion, time.perf_counter() - inicio)
+
+def obtener_metricas():
+    """Retorna {operacion: {'cantidad', 'suma_ms', 'max_ms', 'p50', 'p95', 'p99'}} (tiempos en ms)."""
+    with _lock:
+        return {operacion: histograma.resumen() for operacion, histograma in sorted(_histogramas.items())}
+
+# --- Exportación ---
+def _nombre_prometheus(operacion):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", operacion)
+
+def formatear_prometheus(metricas):
+    """Convierte las métricas al formato de texto de Prometheus (un summary en segundos por operación)."""
+    lineas = []
+    for operacion, datos in metricas.items():
+        nombre = f"balanzas_{_nombre_prometheus(operacion)}_segundos"
+        lineas.append(f"# TYPE {nombre} summary")
+        for q in CUANTILES:
+            lineas.append(f'{nombre}{{quantile="{q}"}} {datos[f"p{int(q * 100)}"] / 1000:.6f}')
+        lineas.append(f"{nombre}_sum {datos['suma_ms'] / 1000:.6f}")
+        lineas.append(f"{nombre}_count {datos['cantidad']}")
+        lineas.append(f"# TYPE {nombre}_max gauge")
+        lineas.append(f"{nombre}_max {datos['max_ms'] / 1000:.6f}")
+    return "\n".join(lineas) + "\n"
+
+def exportar_metricas(ruta_archivo=INSTRUMENTACION_ARCHIVO_FULL_PATH, formato=INSTRUMENTACION_FORMATO):
+    """Escribe las métricas acumuladas en el archivo (reemplazo atómico). Retorna True si se escribió."""
+    metricas = obtener_metricas()
+    if not metricas:
+        return False
+    try:
+        os.makedirs(os.path.dirname(ruta_archivo), exist_ok=True)
+        if formato == "prometheus":
+            ruta_temporal = f"{ruta_archivo}.tmp"
+            with open(ruta_temporal, 'w', encoding='utf-8') as f:
+                f.write(formatear_prometheus(metricas))
+            os.replace(ruta_temporal, ruta_archivo)
+        else:
+            escribir_json_atomico(ruta_archivo, {"generado": time.strftime("%Y-%m-%d %H:%M:%S"), "operaciones": metricas}, indent=2, ensure_ascii=False)
+        return True
+    except Exception as e:
+        print(f"ADVERTENCIA (instrumentacion): No se pudieron exportar las métricas a '{ruta_archivo}': {e}")
+        return False
+
+def _exportacion_periodica():
+    global _temporizador_exportacion
+    exportar_metricas()
+    with _lock:
+        _temporizador_exportacion = None
+        _asegurar_exportacion_periodica()
+
+def _asegurar_exportacion_periodica():
+    """Programa la próxima exportación (se llama con _lock tomado)."""
+    global _temporizador_exportacion
+    if _temporizador_exportacion is None:
+        _temporizador_exportacion = threading.Timer(INSTRUMENTACION_INTERVALO_EXPORTACION_SEG, _exportacion_periodica)
+        _temporizador_exportacion.daemon = True
+        _temporizador_exportacion.name = "ExportacionMetricas"
+        _temporizador_exportacion.start()
+
+if INSTRUMENTACION_ACTIVA:
+    atexit.register(exportar_metricas)
@@ -0,0 +1,178 @@
+# lista_virtual.py
+# Lista virtualizada para catálogos muy grandes: en lugar de insertar cada elemento en una
+# tk.Listbox, dibuja en un Canvas solo las filas visibles, tomándolas por posición de una
+# secuencia (cualquier objeto con len() e índices, p. ej. la lista de sugerencias).
+# Con 1.000.000 de elementos asignar el contenido es inmediato y desplazarse cuesta lo mismo
+# que con 20, porque siempre se reutilizan los mismos pocos ítems del Canvas.
+#
+# Imita la parte de la interfaz de tk.Listbox que usa la aplicación: curselection(), get(),
+# size(), see(), yview() para la barra de desplazamiento, el evento <<ListboxSelect>> y
+# bind("<Double-Button-1>", ...) para abrir el elemento seleccionado.
+
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk
+
+import config
+
+class ListaVirtual(ttk.Frame):
+    """Lista de solo lectura con selección simple que dibuja únicamente las filas visibles."""
+
+    def __init__(self, padre, font=("Arial", 12), width=38, height=10, bg=config.COLOR_LISTBOX_BG, fg=config.COLOR_LISTBOX_FG,
+                 selectbackground=config.COLOR_LISTBOX_SELECT_BG, selectforeground=config.COLOR_LISTBOX_SELECT_FG, **kwargs):
+        super().__init__(padre, **kwargs)
+        fuente_texto = tkfont.Font(root=self, font=font)
+        self._alto_fila = fuente_texto.metrics("linespace") + 4
+        self._fuente_texto = fuente_texto
+        self._colores = {"bg": bg, "fg": fg, "sel_bg": selectbackground, "sel_fg": selectforeground}
+
+        self._elementos = []
+        self._seleccion = None # Posición seleccionada (o None)
+        self._desplazamiento = 0 # Píxeles desplazados desde la primera fila
+        self._filas_dibujadas = [] # [(id_rectangulo, id_texto)], se reutilizan al desplazarse
+
+        self._canvas = tk.Canvas(self, width=fuente_texto.measure("0") * width, height=self._alto_fila * height, bg=bg,
+                                 highlightthickness=0, borderwidth=1, relief="solid", takefocus=1)
+        self._canvas.pack(side="left", fill="both", expand=True)
+        self._barra = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self._barra.pack(side="right", fill="y")
+
+        self._canvas.bind("<Configure>", lambda event: self._redibujar())
+        self._canvas.bind("<Button-1>", self._al_hacer_clic)
+        self._canvas.bind("<MouseWheel>", self._al_girar_rueda) # Windows / macOS
+        self._canvas.bind("<Button-4>", lambda event: self.yview("scroll", -3, "units")) # Linux (X11)
+        self._canvas.bind("<Button-5>", lambda event: self.yview("scroll", 3, "units"))
+        for tecla, paso in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "pagina-"), ("<Next>", "pagina+"), ("<Home>", "inicio"), ("<End>", "fin")):
+            self._canvas.bind(tecla, lambda event, paso=paso: self._mover_seleccion(paso))
+
+    # --- Contenido ---
+    def establecer_elementos(self, elementos):
+        """
+        Reemplaza el contenido por la secuencia dada (no se copia). Si el elemento seleccionado
+        sigue en la misma posición se conservan la selección y el desplazamiento; si no, se
+        vuelve al comienzo de la lista.
+        """
+        seleccion_anterior = self._seleccion
+        conservar = (seleccion_anterior is not None and seleccion_anterior < len(elementos)
+                     and elementos[seleccion_anterior] == self._elementos[seleccion_anterior])
+        self._elementos = elementos
+        if not conservar:
+            self._seleccion = None
+            self._desplazamiento = 0
+            if seleccion_anterior is not None:
+                self.event_generate("<<ListboxSelect>>")
+        self._redibujar()
+
+    def size(self):
+        return len(self._elementos)
+
+    def get(self, indice):
+        return self._elementos[indice]
+
+    # --- Selección ---
+    def curselection(self):
+        return () if self._seleccion is None else (self._seleccion,)
+
+    def selection_clear(self, *args):
+        self._seleccion = None
+        self._redibujar()
+
+    def selection_set(self, indice):
+        self._seleccion = indice if 0 <= indice < len(self._elementos) else None
+        self._redibujar()
+
+    def see(self, indice):
+        """Desplaza lo mínimo necesario para que la fila 'indice' quede visible."""
+        alto_vista = self._alto_vista()
+        arriba = indice * self._alto_fila
+        if arriba < self._desplazamiento:
+            self._desplazar_a(arriba)
+        elif arriba + self._alto_fila > self._desplazamiento + alto_vista:
+            self._desplazar_a(arriba + self._alto_fila - alto_vista)
+
+    def _al_hacer_clic(self, event):
+        self._canvas.focus_set()
+        indice = (self._desplazamiento + event.y) // self._alto_fila
+        if indice < len(self._elementos) and indice != self._seleccion:
+            self._seleccion = indice
+            self._redibujar()
+            self.event_generate("<<ListboxSelect>>")
+
+    def _mover_seleccion(self, paso):
+        if not self._elementos:
+            return
+        filas_por_pagina = max(1, self._alto_vista() // self._alto_fila)
+        actual = -1 if self._seleccion is None else self._seleccion
+        if isinstance(paso, int):
+            destino = actual + paso
+        else:
+            destino = {"inicio": 0, "fin": len(self._elementos) - 1, "pagina-": actual - filas_por_pagina,
+                       "pagina+": actual + filas_por_pagina}[paso]
+        destino = min(max(destino, 0), len(self._elementos) - 1)
+        if destino != self._seleccion:
+            self._seleccion = destino
+            self.see(destino)
+            self._redibujar()
+            self.event_generate("<<ListboxSelect>>")
+
+    def bind(self, secuencia=None, funcion=None, add=None):
+        """Los eventos virtuales (<<ListboxSelect>>) se atienden en el marco; el mouse y el teclado, en el Canvas."""
+        if secuencia and not secuencia.startswith("<<"):
+            return self._canvas.bind(secuencia, funcion, add)
+        return super().bind(secuencia, funcion, add)
+
+    def focus_set(self):
+        self._canvas.focus_set()
+
+    # --- Desplazamiento ---
+    def _alto_vista(self):
+        return max(self._canvas.winfo_height(), self._alto_fila)
+
+    def _desplazar_a(self, desplazamiento):
+        maximo = max(0, len(self._elementos) * self._alto_fila - self._alto_vista())
+        desplazamiento = int(min(max(desplazamiento, 0), maximo))
+        if desplazamiento != self._desplazamiento:
+            self._desplazamiento = desplazamiento
+            self._redibujar()
+
+    def yview(self, *args):
+        """Mismo protocolo que Listbox.yview, para conectar la barra de desplazamiento."""
+        if not args:
+            total = max(len(self._elementos) * self._alto_fila, 1)
+            return self._desplazamiento / total, min(1.0, (self._desplazamiento + self._alto_vista()) / total)
+        if args[0] == "moveto":
+            self._desplazar_a(float(args[1]) * len(self._elementos) * self._alto_fila)
+        elif args[0] == "scroll":
+            paso = self._alto_vista() - self._alto_fila if args[2] == "pages" else self._alto_fila
+            self._desplazar_a(self._desplazamiento + int(args[1]) * paso)
+
+    def _al_girar_rueda(self, event):
+        if event.delta:
+            self.yview("scroll", -3 if event.delta > 0 else 3, "units")
+
+    # --- Dibujo ---
+    def _redibujar(self):
+        """Reubica los ítems del Canvas sobre las filas visibles y actualiza textos y colores."""
+        alto_vista = self._alto_vista()
+        ancho = self._canvas.winfo_width()
+        filas_necesarias = alto_vista // self._alto_fila + 2
+        while len(self._filas_dibujadas) < filas_necesarias:
+            self._filas_dibujadas.append((self._canvas.create_rectangle(0, 0, 0, 0, width=0),
+                                          self._canvas.create_text(0, 0, anchor="w", font=self._fuente_texto)))
+
+        primera = self._desplazamiento // self._alto_fila
+        corrimiento = self._desplazamiento % self._alto_fila
+        for posicion, (id_rectangulo, id_texto) in enumerate(self._filas_dibujadas):
+            indice = primera + posicion
+            if posicion >= filas_necesarias or indice >= len(self._elementos):
+                self._canvas.itemconfigure(id_rectangulo, state="hidden")
+                self._canvas.itemconfigure(id_texto, state="hidden")
+                continue
+            y = posicion * self._alto_fila - corrimiento
+            seleccionada = indice == self._seleccion
+            self._canvas.coords(id_rectangulo, 0, y, ancho, y + self._alto_fila)
+            self._canvas.itemconfigure(id_rectangulo, state="normal", fill=self._colores["sel_bg"] if seleccionada else self._colores["bg"])
+            self._canvas.coords(id_texto, 4, y + self._alto_fila // 2)
+            self._canvas.itemconfigure(id_texto, state="normal", text=str(self._elementos[indice]),
+                                       fill=self._colores["sel_fg"] if seleccionada else self._colores["fg"])
+        self._barra.set(*self.yview())
@@ -0,0 +1,45 @@
+# medicion_arranque.py
+# Mediciones del arranque de la aplicación: "tiempo hasta la ventana de login" y "tiempo hasta la
+# primera búsqueda". app.py lo importa antes que cualquier otro módulo para que el instante de
+# inicio sea lo más temprano posible. Cada marca se registra una sola vez y se compara con su
+# presupuesto en config; también se avisa si un módulo pesado que debería cargarse de forma
+# diferida (openpyxl, PIL) ya fue importado.
+
+import sys
+import time
+
+_INICIO_PROCESO = time.perf_counter()
+MODULOS_DIFERIDOS = ("openpyxl", "PIL")
+
+_marcas = {} # {evento: ms desde el inicio del proceso}
+
+def marcar(evento, desde=None, presupuesto_ms=None):
+    """
+    Registra el instante de 'evento' (solo la primera vez). Si se indica 'desde' (otra marca), el
+    tiempo informado es relativo a ella. Retorna los ms informados, o None si ya estaba marcado.
+    """
+    if evento in _marcas:
+        return None
+    _marcas[evento] = (time.perf_counter() - _INICIO_PROCESO) * 1000
+    transcurrido_ms = _marcas[evento] - _marcas.get(desde, 0.0)
+    referencia = f"desde '{desde}'" if desde else "desde el inicio"
+    print(f"INFO (medicion_arranque): '{evento}' a los {transcurrido_ms:.0f} ms ({referencia}).")
+    if presupuesto_ms is not None and transcurrido_ms > presupuesto_ms:
+        print(f"ADVERTENCIA (medicion_arranque): '{evento}' tardó {transcurrido_ms:.0f} ms, por encima del presupuesto de {presupuesto_ms} ms.")
+    return transcurrido_ms
+
+def modulos_diferidos_cargados():
+    """Retorna los módulos de MODULOS_DIFERIDOS que ya están importados."""
+    return [modulo for modulo in MODULOS_DIFERIDOS if modulo in sys.modules]
+
+def verificar_importaciones_diferidas(etapa):
+    """Avisa si openpyxl o PIL ya están cargados en 'etapa' (deberían cargarse recién al usarse)."""
+    cargados = modulos_diferidos_cargados()
+    if cargados:
+        print(f"ADVERTENCIA (medicion_arranque): {', '.join(cargados)} ya importado(s) en '{etapa}'. "
+              f"Alguna importación anticipada está retrasando el arranque.")
+    return cargados
+
+def obtener_marcas():
+    """Retorna {evento: ms desde el inicio del proceso} con las marcas registradas."""
+    return dict(_marcas)
@@ -0,0 +1,68 @@
+# motor_busqueda.py
+# Cálculo de sugerencias de productos fuera del hilo de la interfaz.
+# Solo se atiende la consulta más reciente: las anteriores se descartan sin calcularse
+# (o se ignoran sus resultados si ya estaban en curso).
+
+import queue
+import threading
+
+import data_manager
+import instrumentacion
+from config import BUSQUEDA_DIFUSA_MIN_CARACTERES
+
+@instrumentacion.medido("busqueda.calcular_sugerencias")
+def calcular_sugerencias(texto_busqueda):
+    """
+    Retorna la lista de nombres a sugerir: primero las coincidencias exactas por prefijo
+    (en orden alfabético) y después las aproximadas por trigramas.
+    """
+    sugerencias = data_manager.buscar_productos_por_prefijo(texto_busqueda)
+    # Se agregan al final las coincidencias aproximadas (errores de tipeo, serie, batería, info)
+    if len(texto_busqueda.strip()) >= BUSQUEDA_DIFUSA_MIN_CARACTERES:
+        ya_sugeridos = set(sugerencias)
+        sugerencias += [nombre for nombre, _ in data_manager.buscar_productos_similares(texto_busqueda) if nombre not in ya_sugeridos]
+    return sugerencias
+
+class TrabajadorBusqueda:
+    """
+    Hilo de trabajo que calcula sugerencias. solicitar() reemplaza cualquier consulta
+    que todavía no empezó; los resultados quedan en la cola 'resultados' como
+    (id_consulta, sugerencias) y la interfaz los recoge con after().
+    """
+
+    def __init__(self):
+        self._condicion = threading.Condition()
+        self._consulta_pendiente = None # (id_consulta, texto) aún no iniciada
+        self._hilo = None
+        self.ultimo_id = 0
+        self.resultados = queue.Queue()
+
+    def solicitar(self, texto_busqueda):
+        """Encola una consulta (descartando la pendiente, si la hay) y retorna su identificador."""
+        with self._condicion:
+            self.ultimo_id += 1
+            self._consulta_pendiente = (self.ultimo_id, texto_busqueda)
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name="TrabajadorBusqueda", daemon=True)
+                self._hilo.start()
+            self._condicion.notify()
+            return self.ultimo_id
+
+    def es_vigente(self, id_consulta):
+        """Indica si la consulta sigue siendo la más reciente."""
+        return id_consulta == self.ultimo_id
+
+    def _bucle(self):
+        while True:
+            with self._condicion:
+                while self._consulta_pendiente is None:
+                    self._condicion.wait()
+                id_consulta, texto_busqueda = self._consulta_pendiente
+                self._consulta_pendiente = None
+            try:
+                sugerencias = calcular_sugerencias(texto_busqueda)
+            except Exception as e:
+                print(f"ERROR (motor_busqueda): Falló la búsqueda de '{texto_busqueda}': {e}")
+                sugerencias = []
+            if self.es_vigente(id_consulta):
+                self.resultados.put((id_consulta, sugerencias))
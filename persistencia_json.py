@@ -0,0 +1,135 @@
+# persistencia_json.py
+# Escritura segura y agrupada de los archivos JSON de datos.
+#   - escribir_json_atomico: archivo temporal + fsync + renombrado atómico, conservando
+#     las últimas N generaciones (archivo.json.1, archivo.json.2, ...) para recuperación.
+#   - cargar_json_con_recuperacion: si el archivo principal está dañado, usa la generación
+#     válida más reciente en lugar de arrancar con datos vacíos.
+#   - GuardadoDiferido: agrupa muchas modificaciones en un solo guardado tras una pausa.
+
+import os
+import json
+import time
+import datetime
+import threading
+
+def _ruta_generacion(ruta_archivo, numero):
+    return f"{ruta_archivo}.{numero}"
+
+def _sincronizar_directorio(ruta_directorio):
+    """Asegura en disco el renombrado (POSIX). En Windows no es posible abrir un directorio y se omite."""
+    if os.name != "posix":
+        return
+    try:
+        descriptor = os.open(ruta_directorio, os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+    except OSError:
+        pass
+
+def escribir_json_atomico(ruta_archivo, datos, generaciones=0, **opciones_json):
+    """
+    Escribe 'datos' como JSON de forma que un corte a mitad de escritura nunca deja el
+    archivo truncado. Antes de reemplazarlo, el archivo actual pasa a ser la generación 1
+    y las anteriores se desplazan (se conservan como máximo 'generaciones').
+    """
+    ruta_temporal = f"{ruta_archivo}.tmp"
+    with open(ruta_temporal, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, **opciones_json)
+        f.flush()
+        os.fsync(f.fileno())
+
+    if generaciones > 0 and os.path.exists(ruta_archivo):
+        for numero in range(generaciones - 1, 0, -1):
+            if os.path.exists(_ruta_generacion(ruta_archivo, numero)):
+                os.replace(_ruta_generacion(ruta_archivo, numero), _ruta_generacion(ruta_archivo, numero + 1))
+        os.replace(ruta_archivo, _ruta_generacion(ruta_archivo, 1))
+    os.replace(ruta_temporal, ruta_archivo)
+    _sincronizar_directorio(os.path.dirname(os.path.abspath(ruta_archivo)))
+
+def cargar_json_con_recuperacion(ruta_archivo, generaciones=0):
+    """
+    Lee un JSON probando primero el archivo principal y luego sus generaciones anteriores.
+    Retorna (datos, ruta_leida). Si el principal estaba dañado se aparta como '.corrupto-<fecha>'
+    para no perderlo. Lanza FileNotFoundError si no hay ninguna copia, o ValueError si
+    existen copias pero ninguna es legible.
+    """
+    candidatas = [ruta_archivo] + [_ruta_generacion(ruta_archivo, n) for n in range(1, generaciones + 1)]
+    existentes = [ruta for ruta in candidatas if os.path.exists(ruta)]
+    if not existentes:
+        raise FileNotFoundError(ruta_archivo)
+
+    errores = []
+    for ruta in existentes:
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except (OSError, ValueError) as e:
+            errores.append(f"{ruta}: {e}")
+            continue
+        if ruta != ruta_archivo:
+            print(f"ADVERTENCIA (persistencia_json): '{ruta_archivo}' ilegible o ausente. Se recuperaron los datos desde '{ruta}'.")
+            if os.path.exists(ruta_archivo):
+                marca = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+                try:
+                    os.replace(ruta_archivo, f"{ruta_archivo}.corrupto-{marca}")
+                except OSError:
+                    pass
+        return datos, ruta
+    raise ValueError("; ".join(errores))
+
+class GuardadoDiferido:
+    """
+    Agrupa modificaciones: marcar_modificado() programa un guardado para cuando pasen
+    'espera_seg' sin nuevos cambios (pero nunca más tarde que 'espera_maxima_seg' desde el
+    primer cambio pendiente). flush() guarda de inmediato lo pendiente.
+    Si funcion_guardado retorna False, los cambios se mantienen pendientes y se reintenta.
+    """
+
+    def __init__(self, funcion_guardado, espera_seg, espera_maxima_seg, nombre="datos"):
+        self._funcion_guardado = funcion_guardado
+        self._espera_seg = espera_seg
+        self._espera_maxima_seg = espera_maxima_seg
+        self._nombre = nombre
+        self._lock = threading.Lock()
+        self._lock_guardado = threading.Lock() # Evita dos guardados simultáneos (temporizador y flush)
+        self._temporizador = None
+        self._pendiente = False
+        self._primer_cambio = None
+
+    @property
+    def pendiente(self):
+        return self._pendiente
+
+    def marcar_modificado(self):
+        """Registra un cambio y (re)programa el guardado."""
+        with self._lock:
+            ahora = time.monotonic()
+            if not self._pendiente:
+                self._pendiente = True
+                self._primer_cambio = ahora
+            if self._temporizador is not None:
+                self._temporizador.cancel()
+            restante_maximo = self._espera_maxima_seg - (ahora - self._primer_cambio)
+            self._temporizador = threading.Timer(max(0.0, min(self._espera_seg, restante_maximo)), self.flush)
+            self._temporizador.daemon = True
+            self._temporizador.name = f"GuardadoDiferido-{self._nombre}"
+            self._temporizador.start()
+
+    def flush(self):
+        """Guarda ya los cambios pendientes (si los hay). Retorna True si se guardó algo."""
+        with self._lock_guardado:
+            with self._lock:
+                if self._temporizador is not None:
+                    self._temporizador.cancel()
+                    self._temporizador = None
+                if not self._pendiente:
+                    return False
+                self._pendiente = False
+                self._primer_cambio = None
+            if self._funcion_guardado() is False:
+                # El guardado falló: los cambios siguen pendientes y se reintenta más tarde
+                self.marcar_modificado()
+                return False
+            return True
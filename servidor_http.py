@@ -0,0 +1,328 @@
+# servidor_http.py
+# Servidor HTTP/JSON de solo lectura sobre el catálogo, para otras herramientas del taller
+# (impresoras de etiquetas, un kiosco web) que hoy solo pueden consultar los datos desde la
+# interfaz Tk. No importa tkinter ni PIL: usa data_manager directamente.
+#
+#     python servidor_http.py                         -> escucha en config.SERVIDOR_HTTP_HOST:PUERTO
+#     python servidor_http.py --host 0.0.0.0 --puerto 8080
+#
+#   GET /api/productos/<nombre>              datos de un producto (404 si no existe)
+#   GET /api/buscar?prefijo=<texto>&limite=N nombres que empiezan con el texto, en orden alfabético
+#   GET /api/buscar?q=<texto>&limite=N       búsqueda tolerante a errores: [{"nombre", "puntaje"}]
+#   GET /api/stock                           totales de stock (como el resumen de la interfaz)
+#   GET /manuales/<archivo>                  manual local (carpeta de manuales)
+#   GET /imagenes/<archivo>                  imagen de producto
+#
+# Las respuestas JSON se guardan en memoria por URL y se descartan cuando cambia la generación
+# del catálogo (cualquier alta, edición o baja, propia o de otra estación vía el diario de
+# cambios). Todas llevan ETag: un cliente que repite la consulta con If-None-Match recibe 304
+# sin cuerpo. El JSON se comprime con gzip si el cliente lo acepta (los PDF e imágenes ya vienen
+# comprimidos y se envían tal cual). Las solicitudes se atienden en un pool de hilos fijo; cada
+# conexión persistente ocupa un hilo, así que cuando todos están ocupados la respuesta lleva
+# 'Connection: close' para que un kiosco inactivo no deje esperando a los demás clientes.
+
+import os
+import gzip
+import json
+import shutil
+import signal
+import mimetypes
+import hashlib
+import argparse
+import datetime
+import ipaddress
+import threading
+import http.server
+import urllib.parse
+import collections
+import concurrent.futures
+
+import config
+import data_manager
+import instrumentacion
+from excel_logger import registrar_accion_excel, finalizar_registro_excel
+from validacion_productos import ResolutorRecursos, obtener_ruta_manual, es_url_web
+
+# Las imágenes se resuelven con una foto en memoria de su carpeta, igual que los manuales
+_resolutor_imagenes = ResolutorRecursos(config.IMAGENES_PRODUCTOS_PATH)
+
+TIPOS_COMPRIMIBLES = ("application/json", "text/")
+PREFIJO_API_PRODUCTOS = "/api/productos/"
+
+def direccion_permitida(direccion):
+    """Solo se atienden clientes del propio equipo o de la red local (direcciones privadas)."""
+    try:
+        ip = ipaddress.ip_address(direccion)
+    except ValueError:
+        return False
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_loopback or ip.is_private or ip.is_link_local
+
+def _es_nombre_archivo_seguro(nombre_archivo):
+    """Rechaza rutas absolutas y '..': por HTTP solo se sirve lo que está dentro de la carpeta."""
+    partes = nombre_archivo.replace("\\", "/").split("/")
+    return bool(nombre_archivo) and not os.path.isabs(nombre_archivo) and ".." not in partes and "" not in partes
+
+# --- Caché de respuestas JSON ---
+class CacheRespuestas:
+    """
+    Respuestas JSON ya serializadas (y comprimidas, si alguien las pidió con gzip), por URL.
+    Todo el contenido corresponde a una generación del catálogo: al cambiar, se vacía.
+    """
+
+    def __init__(self, max_entradas=config.SERVIDOR_HTTP_CACHE_MAX_ENTRADAS):
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._generacion = None
+        self._entradas = collections.OrderedDict() # {clave: respuesta}, la más reciente al final
+
+    def obtener(self, clave, generacion, calcular):
+        """
+        Retorna la respuesta {'estado', 'cuerpo', 'etag', 'cuerpo_gzip'} de la clave para la
+        generación dada, calculándola con calcular() -> (estado, objeto) si no está guardada.
+        """
+        with self._lock:
+            if generacion != self._generacion:
+                self._entradas.clear()
+                self._generacion = generacion
+            respuesta = self._entradas.get(clave)
+            if respuesta is not None:
+                self._entradas.move_to_end(clave)
+                return respuesta
+
+        estado, objeto = calcular() # Fuera del candado: las consultas distintas no se esperan entre sí
+        cuerpo = json.dumps(objeto, ensure_ascii=False).encode("utf-8")
+        respuesta = {"estado": estado, "cuerpo": cuerpo, "cuerpo_gzip": None,
+                     "etag": f'"{generacion}-{hashlib.sha1(cuerpo).hexdigest()[:16]}"'}
+        with self._lock:
+            if generacion == self._generacion:
+                self._entradas[clave] = respuesta
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+        return respuesta
+
+    def cuerpo_gzip(self, respuesta):
+        """Retorna el cuerpo comprimido de la respuesta (se comprime una sola vez)."""
+        if respuesta["cuerpo_gzip"] is None:
+            respuesta["cuerpo_gzip"] = gzip.compress(respuesta["cuerpo"], compresslevel=6)
+        return respuesta["cuerpo_gzip"]
+
+_cache_respuestas = CacheRespuestas()
+
+# --- Consultas ---
+def _enlaces_producto(datos_producto):
+    """Rutas de este servidor para el manual y la imagen locales del producto (las URL web se dejan igual)."""
+    enlaces = {}
+    manual = str(datos_producto.get("manual", "") or "").strip()
+    if manual:
+        enlaces["manual"] = manual if es_url_web(manual) else f"/manuales/{urllib.parse.quote(manual)}"
+    imagen = str(datos_producto.get("imagen", "") or "").strip()
+    if imagen:
+        enlaces["imagen"] = f"/imagenes/{urllib.parse.quote(imagen)}"
+    return enlaces
+
+def consultar_producto(nombre_producto):
+    datos_producto = data_manager.get_producto_data(nombre_producto)
+    if datos_producto is None:
+        return 404, {"error": f"Producto '{nombre_producto}' no encontrado."}
+    return 200, {"nombre": nombre_producto, "datos": dict(datos_producto), "enlaces": _enlaces_producto(datos_producto)}
+
+def consultar_busqueda(parametros):
+    try:
+        limite = int(parametros.get("limite", [config.SERVIDOR_HTTP_BUSQUEDA_LIMITE])[0])
+    except ValueError:
+        return 400, {"error": "El parámetro 'limite' debe ser un número entero."}
+    limite = max(1, limite)
+    if "q" in parametros:
+        similares = data_manager.buscar_productos_similares(parametros["q"][0], limite=limite)
+        return 200, {"resultados": [{"nombre": nombre, "puntaje": round(puntaje, 4)} for nombre, puntaje in similares]}
+    if "prefijo" in parametros:
+        return 200, {"resultados": data_manager.buscar_productos_por_prefijo(parametros["prefijo"][0], limite=limite)}
+    return 400, {"error": "Indique 'prefijo' (búsqueda por comienzo) o 'q' (búsqueda aproximada)."}
+
+def consultar_stock():
+    resumen = data_manager.get_resumen_stock()
+    for clave in ("por_bateria", "por_prefijo_serie"):
+        resumen[clave] = {str(grupo): {"stock": stock, "productos": cantidad} for grupo, (stock, cantidad) in resumen[clave].items()}
+    return 200, resumen
+
+# --- Servidor ---
+class ManejadorCatalogo(http.server.BaseHTTPRequestHandler):
+    """Atiende GET y HEAD sobre la API y los archivos; cualquier otro método recibe 501."""
+
+    protocol_version = "HTTP/1.1" # Conexiones persistentes (con 'timeout' para no retener hilos del pool)
+    server_version = "BalanzasTriunfoAPI/1.0"
+    timeout = config.SERVIDOR_HTTP_KEEPALIVE_SEG
+
+    def do_GET(self):
+        self._atender(enviar_cuerpo=True)
+
+    def do_HEAD(self):
+        self._atender(enviar_cuerpo=False)
+
+    def log_message(self, formato, *args):
+        pass # El acceso relevante va al registro de actividad; no se repite cada solicitud por consola
+
+    def _atender(self, enviar_cuerpo):
+        inicio = instrumentacion.marca_tiempo()
+        if not direccion_permitida(self.client_address[0]):
+            self._enviar_json(403, {"error": "Solo se atienden clientes locales o de la red local."}, enviar_cuerpo)
+            return
+        url = urllib.parse.urlsplit(self.path)
+        partes = [urllib.parse.unquote(parte) for parte in url.path.split("/") if parte]
+        operacion = "desconocida"
+        try:
+            if url.path.startswith(PREFIJO_API_PRODUCTOS) and len(url.path) > len(PREFIJO_API_PRODUCTOS):
+                # El resto de la ruta se decodifica entero: el nombre puede tener '/' ("Balanza 30/60 kg")
+                operacion = "producto"
+                nombre_producto = urllib.parse.unquote(url.path[len(PREFIJO_API_PRODUCTOS):])
+                registrar_accion_excel("Consulta Producto (API)", f"Producto: {nombre_producto}. Cliente: {self.client_address[0]}")
+                self._responder_api(lambda: consultar_producto(nombre_producto), enviar_cuerpo)
+            elif partes == ["api", "buscar"]:
+                operacion = "buscar"
+                parametros = urllib.parse.parse_qs(url.query)
+                self._responder_api(lambda: consultar_busqueda(parametros), enviar_cuerpo)
+            elif partes == ["api", "stock"]:
+                operacion = "stock"
+                self._responder_api(consultar_stock, enviar_cuerpo)
+            elif len(partes) >= 2 and partes[0] in ("manuales", "imagenes"):
+                operacion = partes[0]
+                nombre_archivo = "/".join(partes[1:])
+                ruta = None
+                if _es_nombre_archivo_seguro(nombre_archivo):
+                    ruta = obtener_ruta_manual(nombre_archivo) if partes[0] == "manuales" else _resolutor_imagenes.ruta_local(nombre_archivo)
+                if ruta is None or not os.path.isfile(ruta):
+                    self._enviar_json(404, {"error": f"Archivo '{nombre_archivo}' no encontrado."}, enviar_cuerpo)
+                else:
+                    self._enviar_archivo(ruta, enviar_cuerpo)
+            else:
+                self._enviar_json(404, {"error": "Ruta desconocida. Use /api/productos/<nombre>, /api/buscar, /api/stock, /manuales/<archivo> o /imagenes/<archivo>."}, enviar_cuerpo)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # El cliente cerró la conexión antes de recibir la respuesta
+        except Exception as e:
+            print(f"ERROR (servidor_http): Falló la solicitud '{self.path}': {e}")
+            self._enviar_json(500, {"error": "Error interno del servidor."}, enviar_cuerpo)
+        instrumentacion.registrar_desde(f"http.{operacion}", inicio)
+
+    def _acepta_gzip(self):
+        return "gzip" in self.headers.get("Accept-Encoding", "").lower()
+
+    def _coincide_etag(self, etag):
+        pedido = self.headers.get("If-None-Match")
+        return pedido is not None and (pedido.strip() == "*" or etag in [valor.strip() for valor in pedido.split(",")])
+
+    def _responder_api(self, calcular, enviar_cuerpo):
+        respuesta = _cache_respuestas.obtener(self.path, data_manager.get_generacion_productos(), calcular)
+        if respuesta["estado"] == 200 and self._coincide_etag(respuesta["etag"]):
+            self._enviar_cabeceras(304, {"ETag": respuesta["etag"]})
+            return
+        cuerpo, cabeceras = respuesta["cuerpo"], {"Content-Type": "application/json; charset=utf-8", "ETag": respuesta["etag"], "Vary": "Accept-Encoding"}
+        if len(cuerpo) >= config.SERVIDOR_HTTP_GZIP_MIN_BYTES and self._acepta_gzip():
+            cuerpo = _cache_respuestas.cuerpo_gzip(respuesta)
+            cabeceras["Content-Encoding"] = "gzip"
+        cabeceras["Content-Length"] = str(len(cuerpo))
+        self._enviar_cabeceras(respuesta["estado"], cabeceras)
+        if enviar_cuerpo:
+            self.wfile.write(cuerpo)
+
+    def _enviar_json(self, estado, objeto, enviar_cuerpo):
+        cuerpo = json.dumps(objeto, ensure_ascii=False).encode("utf-8")
+        self._enviar_cabeceras(estado, {"Content-Type": "application/json; charset=utf-8", "Content-Length": str(len(cuerpo))})
+        if enviar_cuerpo:
+            self.wfile.write(cuerpo)
+
+    def _enviar_archivo(self, ruta, enviar_cuerpo):
+        """Envía un archivo por partes (sin cargarlo entero en memoria), con ETag según tamaño y fecha."""
+        info = os.stat(ruta)
+        etag = f'"{info.st_mtime_ns:x}-{info.st_size:x}"'
+        if self._coincide_etag(etag):
+            self._enviar_cabeceras(304, {"ETag": etag})
+            return
+        tipo = mimetypes.guess_type(ruta)[0] or "application/octet-stream"
+        registrar_accion_excel("Descarga Recurso (API)", f"Recurso: {os.path.basename(ruta)}. Cliente: {self.client_address[0]}")
+        with open(ruta, 'rb') as f:
+            self._enviar_cabeceras(200, {"Content-Type": tipo, "Content-Length": str(info.st_size), "ETag": etag,
+                                         "Last-Modified": self.date_time_string(int(info.st_mtime))})
+            if enviar_cuerpo:
+                shutil.copyfileobj(f, self.wfile, 256 * 1024)
+
+    def _enviar_cabeceras(self, estado, cabeceras):
+        self.send_response(estado)
+        for nombre, valor in cabeceras.items():
+            self.send_header(nombre, valor)
+        if self.server.pool_saturado():
+            self.send_header("Connection", "close") # Libera el hilo para las conexiones en espera
+        self.end_headers()
+
+class ServidorConPoolDeHilos(http.server.HTTPServer):
+    """HTTPServer que atiende cada conexión en un pool de hilos de tamaño fijo."""
+
+    def __init__(self, direccion, manejador, hilos=config.SERVIDOR_HTTP_HILOS):
+        super().__init__(direccion, manejador)
+        self.hilos = hilos
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="ServidorHTTP")
+        self._conexiones = 0 # Conexiones abiertas: atendiéndose o esperando un hilo libre
+        self._lock_conexiones = threading.Lock()
+
+    def pool_saturado(self):
+        """Indica si no queda ningún hilo libre para otra conexión (las persistentes se cierran tras responder)."""
+        return self._conexiones >= self.hilos
+
+    def process_request(self, request, client_address):
+        with self._lock_conexiones:
+            self._conexiones += 1
+        self._pool.submit(self._atender_conexion, request, client_address)
+
+    def _atender_conexion(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._lock_conexiones:
+                self._conexiones -= 1
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+def _sondear_cambios(detener):
+    """Aplica los cambios de otras estaciones (diario de cambios) para que la API no quede desactualizada."""
+    while not detener.wait(config.CAMBIOS_SONDEO_MS / 1000):
+        data_manager.sincronizar_cambios()
+
+def ejecutar_servidor(host=config.SERVIDOR_HTTP_HOST, puerto=config.SERVIDOR_HTTP_PUERTO, hilos=config.SERVIDOR_HTTP_HILOS):
+    """Carga el catálogo y atiende solicitudes hasta Ctrl+C."""
+    data_manager.usuario_actual = {"nombre": "servidor_http", "rol": "servicio"} # Así figura en el registro de actividad
+    data_manager.cargar_datos()
+    servidor = ServidorConPoolDeHilos((host, puerto), ManejadorCatalogo, hilos)
+    detener = threading.Event()
+    threading.Thread(target=_sondear_cambios, args=(detener,), name="SondeoCambiosHTTP", daemon=True).start()
+    # SIGTERM (p. ej. un administrador de servicios) termina igual que Ctrl+C; shutdown() no puede
+    # llamarse desde el hilo que ejecuta serve_forever(), por eso va en otro hilo
+    signal.signal(signal.SIGTERM, lambda *args: threading.Thread(target=servidor.shutdown).start())
+    registrar_accion_excel("Inicio Servidor HTTP", f"Escuchando en {host}:{puerto}")
+    inicio = datetime.datetime.now()
+    print(f"INFO (servidor_http): Atendiendo en http://{host}:{servidor.server_address[1]}/ con {hilos} hilos (Ctrl+C para terminar).")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        detener.set()
+        servidor.server_close()
+        duracion_min = (datetime.datetime.now() - inicio).total_seconds() / 60
+        registrar_accion_excel("Cierre Servidor HTTP", f"Escuchaba en {host}:{puerto}", duracion_min=duracion_min)
+        finalizar_registro_excel()
+        data_manager.flush()
+        print("INFO (servidor_http): Servidor detenido.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor HTTP/JSON de solo lectura sobre el catálogo.")
+    parser.add_argument("--host", default=config.SERVIDOR_HTTP_HOST, help="Dirección en la que escuchar (por defecto %(default)s)")
+    parser.add_argument("--puerto", type=int, default=config.SERVIDOR_HTTP_PUERTO, help="Puerto (por defecto %(default)s)")
+    parser.add_argument("--hilos", type=int, default=config.SERVIDOR_HTTP_HILOS, help="Hilos del pool (por defecto %(default)s)")
+    argumentos = parser.parse_args()
+    ejecutar_servidor(argumentos.host, argumentos.puerto, argumentos.hilos)
@@ -0,0 +1,192 @@
+# tareas_segundo_plano.py
+# Ejecutor de tareas para la interfaz: las operaciones bloqueantes (guardar datos, importar o
+# exportar el catálogo, verificar contraseñas, leer índices del disco) corren en un grupo de
+# hilos de trabajo y su resultado vuelve al hilo de Tk por una cola de terminadas que se recoge
+# con after(). Los hilos de trabajo nunca tocan widgets.
+#
+#     tareas.ejecutar(data_manager.eliminar_producto_data, nombre,
+#                     al_terminar=lambda eliminado: ..., titulo_error="Error al Eliminar", padre=ventana)
+#
+# - Prioridades: las tareas con menor número salen primero (PRIORIDAD_ALTA para lo que el
+#   usuario está esperando, PRIORIDAD_BAJA para mantenimiento como el índice de manuales).
+# - Cancelación: una tarea pendiente cancelada no llega a ejecutarse; si ya estaba corriendo, su
+#   resultado se descarta. Las tareas largas reciben tarea_cancelada como parámetro 'cancelado' y
+#   la consultan entre un archivo o fila y el siguiente (índice de manuales, importar/exportar).
+#   Con 'clave', una tarea nueva cancela la anterior con la misma clave (p. ej. una búsqueda).
+# - Errores: la excepción se entrega a al_fallar en el hilo de Tk; sin al_fallar se muestra con
+#   messagebox.showerror.
+
+import queue
+import itertools
+import threading
+import traceback
+from tkinter import messagebox
+
+from config import TAREAS_HILOS, TAREAS_SONDEO_MS
+
+PRIORIDAD_ALTA = 0
+PRIORIDAD_NORMAL = 10
+PRIORIDAD_BAJA = 20
+
+_local = threading.local()
+
+def tarea_actual():
+    """Tarea que está corriendo en este hilo de trabajo (None fuera de una tarea)."""
+    return getattr(_local, "tarea", None)
+
+def tarea_cancelada():
+    """Indica si se canceló la tarea que corre en este hilo (para cortar un trabajo largo a mitad)."""
+    tarea = tarea_actual()
+    return tarea is not None and tarea.cancelada
+
+class Tarea:
+    """Una llamada encolada en el ejecutor. Se crea con EjecutorTareas.ejecutar()."""
+
+    def __init__(self, funcion, args, kwargs, al_terminar, al_fallar, prioridad, clave, titulo_error, padre):
+        self.funcion = funcion
+        self.args = args
+        self.kwargs = kwargs
+        self.al_terminar = al_terminar
+        self.al_fallar = al_fallar
+        self.prioridad = prioridad
+        self.clave = clave
+        self.titulo_error = titulo_error
+        self.padre = padre
+        self.cancelada = False
+        self.terminada = False # El resultado ya se entregó (o se descartó) en el hilo de Tk
+
+    def cancelar(self):
+        """Evita que se ejecute (si todavía está pendiente) y descarta su resultado."""
+        self.cancelada = True
+
+class EjecutorTareas:
+    """Grupo de hilos con cola de prioridad y entrega de resultados en el hilo de Tk."""
+
+    def __init__(self, cantidad_hilos=TAREAS_HILOS, intervalo_sondeo_ms=TAREAS_SONDEO_MS):
+        self.cantidad_hilos = cantidad_hilos
+        self.intervalo_sondeo_ms = intervalo_sondeo_ms
+        self._pendientes = queue.PriorityQueue() # (prioridad, orden, tarea)
+        self._terminadas = queue.Queue() # (tarea, resultado, error)
+        self._orden = itertools.count() # Desempata por orden de llegada dentro de la misma prioridad
+        self._hilos = []
+        self._por_clave = {} # {clave: tarea} de la última tarea enviada con esa clave
+        self._en_vuelo = 0 # Tareas cuyo resultado todavía no se entregó (solo se usa en el hilo de Tk)
+        self._condicion = threading.Condition() # Avisa a esperar_pendientes() cuando termina una tarea
+        self._por_ejecutar = 0 # Tareas encoladas o corriendo (protegido por _condicion)
+        self._widget = None
+        self._id_sondeo = None
+
+    def configurar(self, widget_tk):
+        """Widget cuyo after() se usa para recoger los resultados (normalmente la ventana principal)."""
+        self._widget = widget_tk
+
+    def ejecutar(self, funcion, *args, al_terminar=None, al_fallar=None, prioridad=PRIORIDAD_NORMAL,
+                 clave=None, titulo_error="Error", padre=None, **kwargs):
+        """
+        Encola funcion(*args, **kwargs) y retorna la Tarea. Debe llamarse desde el hilo de Tk.
+        al_terminar(resultado) y al_fallar(excepcion) se llaman en el hilo de Tk; si falla y no hay
+        al_fallar, el error se muestra en un messagebox con 'titulo_error' sobre 'padre'.
+        """
+        tarea = Tarea(funcion, args, kwargs, al_terminar, al_fallar, prioridad, clave, titulo_error, padre)
+        if clave is not None:
+            anterior = self._por_clave.get(clave)
+            if anterior is not None:
+                anterior.cancelar()
+            self._por_clave[clave] = tarea
+        self._asegurar_hilos()
+        self._en_vuelo += 1
+        with self._condicion:
+            self._por_ejecutar += 1
+        self._pendientes.put((prioridad, next(self._orden), tarea))
+        self._programar_recoleccion()
+        return tarea
+
+    def ocupado(self, clave):
+        """Indica si la última tarea con esa clave todavía no entregó su resultado (p. ej. para ignorar un doble clic)."""
+        tarea = self._por_clave.get(clave)
+        return tarea is not None and not tarea.terminada and not tarea.cancelada
+
+    def cancelar(self, clave):
+        """Cancela la última tarea enviada con esa clave, si la hay."""
+        tarea = self._por_clave.pop(clave, None)
+        if tarea is not None:
+            tarea.cancelar()
+
+    def esperar_pendientes(self, timeout_seg=None):
+        """
+        Espera a que los hilos terminen lo encolado (al cerrar la aplicación, para no cortar un
+        guardado). Los resultados ya no se entregan a la interfaz. Retorna False si venció el plazo.
+        """
+        with self._condicion:
+            return self._condicion.wait_for(lambda: self._por_ejecutar == 0, timeout_seg)
+
+    # --- Hilos de trabajo ---
+    def _asegurar_hilos(self):
+        self._hilos = [hilo for hilo in self._hilos if hilo.is_alive()]
+        while len(self._hilos) < self.cantidad_hilos:
+            hilo = threading.Thread(target=self._bucle_trabajo, name=f"TareaSegundoPlano-{len(self._hilos) + 1}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def _bucle_trabajo(self):
+        while True:
+            _, _, tarea = self._pendientes.get()
+            _local.tarea = tarea
+            try:
+                if tarea.cancelada:
+                    self._terminadas.put((tarea, None, None)) # Se descarta sin ejecutarla
+                else:
+                    self._terminadas.put((tarea, tarea.funcion(*tarea.args, **tarea.kwargs), None))
+            except Exception as e:
+                print(f"ERROR (tareas_segundo_plano): Falló '{getattr(tarea.funcion, '__name__', tarea.funcion)}': {e}")
+                traceback.print_exc()
+                self._terminadas.put((tarea, None, e))
+            finally:
+                _local.tarea = None
+                with self._condicion:
+                    self._por_ejecutar -= 1
+                    self._condicion.notify_all()
+
+    # --- Entrega en el hilo de Tk ---
+    def _programar_recoleccion(self):
+        if self._id_sondeo is None and self._widget is not None:
+            self._id_sondeo = self._widget.after(self.intervalo_sondeo_ms, self._recoger_terminadas)
+
+    def _recoger_terminadas(self):
+        """Entrega (hilo de Tk) los resultados de las tareas terminadas; se reprograma mientras queden en vuelo."""
+        self._id_sondeo = None
+        while True:
+            try:
+                tarea, resultado, error = self._terminadas.get_nowait()
+            except queue.Empty:
+                break
+            self._en_vuelo -= 1
+            tarea.terminada = True
+            if tarea.clave is not None and self._por_clave.get(tarea.clave) is tarea:
+                del self._por_clave[tarea.clave]
+            if tarea.cancelada:
+                continue
+            try:
+                if error is None:
+                    if tarea.al_terminar is not None:
+                        tarea.al_terminar(resultado)
+                elif tarea.al_fallar is not None:
+                    tarea.al_fallar(error)
+                else:
+                    self._mostrar_error(tarea, error)
+            except Exception as e:
+                print(f"ERROR (tareas_segundo_plano): Falló la entrega del resultado de una tarea: {e}")
+                traceback.print_exc()
+        if self._en_vuelo > 0 and self._widget is not None:
+            try:
+                self._id_sondeo = self._widget.after(self.intervalo_sondeo_ms, self._recoger_terminadas)
+            except Exception: # La ventana principal ya se destruyó (cierre de la aplicación)
+                self._id_sondeo = None
+
+    def _mostrar_error(self, tarea, error):
+        padre = tarea.padre if tarea.padre is not None and tarea.padre.winfo_exists() else self._widget
+        messagebox.showerror(tarea.titulo_error, str(error) or error.__class__.__name__, parent=padre)
+
+# Ejecutor compartido por toda la interfaz
+ejecutor = EjecutorTareas()
+ejecutar = ejecutor.ejecutar
@@ -0,0 +1,38 @@
+# tests/test_analitica_registro.py
+# Conteo de consultas por producto en analitica_registro: las filas de la interfaz, la CLI y la
+# API tienen que sumar al mismo producto, aunque la API agregue el cliente al detalle.
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analitica_registro
+
+
+class TestConsultasPorProducto(unittest.TestCase):
+
+    def test_interfaz_cli_y_api_cuentan_el_mismo_producto(self):
+        resumen = analitica_registro._resumen_vacio()
+        filas = [
+            ("2026-10-01 09:00:00", "ana", "usuario", "Consulta Producto", "Producto: Balanza X", None),
+            ("2026-10-01 09:05:00", "ana", "usuario", "Consulta Producto (CLI)", "Producto: Balanza X", None),
+            ("2026-10-01 09:10:00", "N/A", "N/A", "Consulta Producto (API)", "Producto: Balanza X. Cliente: 192.168.1.5", None),
+            ("2026-10-01 09:11:00", "N/A", "N/A", "Consulta Producto (API)", "Producto: Balanza X. Cliente: 192.168.1.6", None),
+        ]
+        for fila in filas:
+            analitica_registro._acumular(resumen, fila)
+        self.assertEqual(resumen["consultas_por_producto"], {"Balanza X": 4})
+
+    def test_nombre_con_punto_desde_la_api(self):
+        resumen = analitica_registro._resumen_vacio()
+        analitica_registro._acumular(resumen, ("2026-10-01 09:00:00", "N/A", "N/A", "Consulta Producto (API)",
+                                               "Producto: Balanza 30/60 kg. Mod. B. Cliente: 10.0.0.2", None))
+        analitica_registro._acumular(resumen, ("2026-10-01 09:01:00", "ana", "usuario", "Consulta Producto",
+                                               "Producto: Balanza 30/60 kg. Mod. B", None))
+        self.assertEqual(resumen["consultas_por_producto"], {"Balanza 30/60 kg. Mod. B": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,17 +2,27 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from PIL import Image, ImageTk
 import os
 import datetime
-import re 
+import queue
 
 # Importaciones de otros módulos del proyecto
 import config
+import medicion_arranque
+import instrumentacion
 import data_manager
 import auth_handler 
-from excel_logger import registrar_accion_excel
+import importacion_catalogo
+from excel_logger import registrar_accion_excel, finalizar_registro_excel
 from utils import abrir_enlace_web_util
+from motor_busqueda import TrabajadorBusqueda
+from cache_imagenes import CacheImagenesProductos
+from validacion_productos import es_recurso_valido, es_stock_valido
+from lista_virtual import ListaVirtual
+from vista_producto import VistaDetalleProducto
+import indice_manuales
+import tareas_segundo_plano
+from tareas_segundo_plano import PRIORIDAD_ALTA, PRIORIDAD_BAJA
 
 # -w- Variables de Módulo para Referencias a Widgets -w-
 app_principal_ref = None # Referencia a la ventana Tkinter principal (root_app)
@@ -20,10 +30,30 @@ entrada_modelo_busqueda_widget = None
 lista_sugerencias_busqueda_widget = None
 notebook_widget = None
 tab_info_producto_widget = None
-frame_info_producto_dinamico = None
+vista_detalle_producto_widget = None # Vista de detalle persistente (se reutiliza para cada producto)
 lbl_total_stock_widget = None
+entrada_busqueda_manuales_widget = None
+lista_resultados_manuales_widget = None
+lbl_estado_manuales_widget = None
 style_aplicacion_global = None
 
+# Estado de la búsqueda de sugerencias (anti-rebote, hilo de trabajo y contenido mostrado)
+_trabajador_busqueda = TrabajadorBusqueda()
+_id_busqueda_programada = None # after() pendiente del anti-rebote
+_id_sondeo_busqueda = None # after() que recoge los resultados del hilo
+_id_busqueda_aplicada = 0 # Última consulta cuyo resultado se mostró
+_clave_sugerencias_mostradas = None # (texto, generación del catálogo) de lo mostrado
+_consulta_solicitada = (0, None, None) # (id_consulta, clave, inicio) de la última consulta enviada al hilo
+
+# Búsqueda dentro de los manuales PDF (el índice se actualiza como tarea en segundo plano)
+_resultados_manuales_mostrados = [] # Resultados paralelos a la Listbox de la pestaña de manuales
+
+# Sondeo del diario de cambios: aplica lo que modifican otras estaciones que comparten la carpeta de datos
+_id_sondeo_cambios = None
+
+# Caché de miniaturas de productos (memoria + disco); decodifica fuera del hilo de Tk
+_cache_imagenes = CacheImagenesProductos()
+
 # Variable para almacenar la referencia a la ventana de login Toplevel
 # Esto nos permite gestionarla más directamente.
 ventana_login_actual_ref = None 
@@ -34,49 +64,176 @@ def _limpiar_frame_contenido_widgets(frame):
     for widget in frame.winfo_children():
         widget.destroy()
 
+def _vaciar_campo(campo):
+    """Borra el contenido de un Entry o de un Text."""
+    if isinstance(campo, tk.Text): campo.delete("1.0", tk.END)
+    else: campo.delete(0, tk.END)
+
+# --- Diálogos reutilizables (registro, edición y gestión de usuarios) ---
+# Cada diálogo se construye la primera vez que se abre; al cerrarlo se oculta y al reabrirlo
+# solo se repuebla. Si fue destruido (p. ej. al cerrar sesión) se vuelve a construir.
+_dialogos = {} # {clave: {"ventana": Toplevel, "preparar": función que lo repuebla}}
+
+def _obtener_dialogo(clave, construir):
+    dialogo = _dialogos.get(clave)
+    if dialogo is None or not dialogo["ventana"].winfo_exists():
+        dialogo = _dialogos[clave] = construir()
+        dialogo["ventana"].protocol("WM_DELETE_WINDOW", lambda ventana=dialogo["ventana"]: _ocultar_dialogo(ventana))
+    return dialogo
+
+def _crear_ventana_dialogo(padre, titulo, geometria):
+    """Crea la ventana de un diálogo, oculta hasta que se muestre con _mostrar_dialogo."""
+    ventana = tk.Toplevel(padre)
+    ventana.withdraw()
+    ventana.title(titulo)
+    ventana.geometry(geometria)
+    ventana.configure(background=config.COLOR_BACKGROUND)
+    return ventana
+
+def _mostrar_dialogo(ventana):
+    ventana.deiconify()
+    ventana.lift()
+    ventana.grab_set()
+
+def _ocultar_dialogo(ventana):
+    ventana.grab_release()
+    ventana.withdraw()
+    # Un diálogo abierto desde otro (nuevo usuario desde la gestión) le devuelve el foco modal
+    if isinstance(ventana.master, tk.Toplevel) and ventana.master.winfo_viewable():
+        ventana.master.grab_set()
+
 def actualizar_sugerencias_ui(event=None):
-    """Actualiza la lista de sugerencias de productos en la UI."""
-    if entrada_modelo_busqueda_widget and lista_sugerencias_busqueda_widget:
-        texto_busqueda = entrada_modelo_busqueda_widget.get().strip().lower()
-        lista_sugerencias_busqueda_widget.delete(0, tk.END)
-        productos_dict = data_manager.get_productos_data()
-        if texto_busqueda:
-            sugerencias = [p for p in productos_dict.keys() if p.lower().startswith(texto_busqueda)]
-        else:
-            sugerencias = sorted(productos_dict.keys())
-        for s in sugerencias: lista_sugerencias_busqueda_widget.insert(tk.END, s)
+    """
+    Actualiza la lista de sugerencias de productos en la UI.
+    Al teclear se espera una breve pausa (anti-rebote) antes de buscar; las llamadas
+    internas (sin evento) buscan de inmediato. El cálculo corre en el hilo de búsqueda.
+    """
+    global _id_busqueda_programada
+    if not (entrada_modelo_busqueda_widget and lista_sugerencias_busqueda_widget and app_principal_ref):
+        return
+    if _id_busqueda_programada is not None:
+        app_principal_ref.after_cancel(_id_busqueda_programada)
+        _id_busqueda_programada = None
+    if event is None:
+        _lanzar_busqueda_sugerencias()
+    else:
+        _id_busqueda_programada = app_principal_ref.after(config.BUSQUEDA_ESPERA_TECLEO_MS, _lanzar_busqueda_sugerencias)
 
-def _calcular_y_actualizar_total_stock_ui():
-    """Calcula y actualiza el stock total de productos en la UI (solo para administradores)."""
-    if lbl_total_stock_widget and data_manager.usuario_actual["rol"] == "administrador":
-        total = sum(int(d.get("stock", 0)) for d in data_manager.get_productos_data().values())
-        lbl_total_stock_widget.config(text=f"Stock Total Global: {total} unidades")
+def _lanzar_busqueda_sugerencias():
+    """Envía el texto actual al hilo de búsqueda y comienza a sondear sus resultados."""
+    global _id_busqueda_programada, _id_sondeo_busqueda, _consulta_solicitada
+    _id_busqueda_programada = None
+    if not entrada_modelo_busqueda_widget or not entrada_modelo_busqueda_widget.winfo_exists():
+        return
+    # Teclas que no cambian el texto (flechas, Shift...) con el catálogo sin cambios: nada que recalcular
+    clave = (entrada_modelo_busqueda_widget.get(), data_manager.get_generacion_productos())
+    if clave == _clave_sugerencias_mostradas and _id_busqueda_aplicada == _trabajador_busqueda.ultimo_id:
+        return
+    _consulta_solicitada = (_trabajador_busqueda.solicitar(clave[0]), clave, instrumentacion.marca_tiempo())
+    if _id_sondeo_busqueda is None:
+        _id_sondeo_busqueda = app_principal_ref.after(config.BUSQUEDA_SONDEO_RESULTADOS_MS, _recoger_resultados_busqueda)
+
+def _recoger_resultados_busqueda():
+    """Aplica en la lista el resultado más reciente del hilo de búsqueda; los obsoletos se descartan."""
+    global _id_sondeo_busqueda, _id_busqueda_aplicada, _clave_sugerencias_mostradas
+    _id_sondeo_busqueda = None
+    resultado_vigente = None
+    while True:
+        try:
+            id_consulta, sugerencias = _trabajador_busqueda.resultados.get_nowait()
+        except queue.Empty:
+            break
+        if _trabajador_busqueda.es_vigente(id_consulta):
+            resultado_vigente = (id_consulta, sugerencias)
+
+    if resultado_vigente is not None:
+        _id_busqueda_aplicada = resultado_vigente[0]
+        _aplicar_sugerencias_en_lista(resultado_vigente[1])
+        if _consulta_solicitada[0] == _id_busqueda_aplicada:
+            _clave_sugerencias_mostradas = _consulta_solicitada[1]
+            instrumentacion.registrar_desde("ui.actualizar_sugerencias", _consulta_solicitada[2]) # Desde la solicitud hasta verlo en la lista
+        medicion_arranque.marcar("primera_busqueda", desde="enciclopedia", presupuesto_ms=config.ARRANQUE_PRESUPUESTO_PRIMERA_BUSQUEDA_MS)
+
+    # Se sigue sondeando mientras quede una consulta sin aplicar
+    if _id_busqueda_aplicada != _trabajador_busqueda.ultimo_id and app_principal_ref:
+        _id_sondeo_busqueda = app_principal_ref.after(config.BUSQUEDA_SONDEO_RESULTADOS_MS, _recoger_resultados_busqueda)
+
+def _aplicar_sugerencias_en_lista(sugerencias):
+    """
+    Muestra las sugerencias en la lista virtualizada: solo se dibujan las filas visibles,
+    así que el costo no depende del tamaño del catálogo.
+    """
+    if not lista_sugerencias_busqueda_widget or not lista_sugerencias_busqueda_widget.winfo_exists():
+        return
+    lista_sugerencias_busqueda_widget.establecer_elementos(sugerencias)
 
-def _es_url_valida(url_string):
-    """Valida si un string es una URL HTTP/HTTPS básica o una ruta de archivo local existente.
-    
-    Args:
-        url_string (str): La cadena a validar.
+def _calcular_y_actualizar_total_stock_ui():
+    """
+    Actualiza el stock total de productos en la UI (solo para administradores).
+    data_manager mantiene los totales al día con cada cambio, así que no se recorre el catálogo.
+    Si el catálogo todavía se está cargando en segundo plano, se reintenta sin bloquear la interfaz.
+    """
+    if lbl_total_stock_widget and lbl_total_stock_widget.winfo_exists() and data_manager.usuario_actual["rol"] == "administrador":
+        if not data_manager.productos_cargados():
+            lbl_total_stock_widget.config(text="Stock Total Global: (cargando catálogo...)")
+            lbl_total_stock_widget.after(100, _calcular_y_actualizar_total_stock_ui)
+            return
+        resumen = data_manager.get_resumen_stock()
+        lbl_total_stock_widget.config(text=f"Stock Total Global: {resumen['total']} unidades | Stock bajo: {resumen['stock_bajo']}")
 
-    Returns:
-        bool: True si es una URL válida o una ruta de archivo local existente, False en caso contrario.
+def _sondear_cambios_otras_estaciones():
     """
-    # Permitir cadenas vacías, ya que la ausencia de un recurso es válida.
-    if not url_string: 
-        return True
-    
-    # Comprobar si es una URL web (http o https)
-    url_pattern = re.compile(r'^(http|https)://[^\s/$.?#].[^\s]*$')
-    if re.match(url_pattern, url_string) is not None:
-        return True
-    
-    # Si no es una URL web, comprobar si es una ruta de archivo local
-    # Se asume que los manuales locales están dentro de MANUALES_PRODUCTOS_PATH
-    ruta_completa_recurso = os.path.join(config.MANUALES_PRODUCTOS_PATH, url_string)
-    if os.path.exists(ruta_completa_recurso):
-        return True
+    Aplica los cambios que otras estaciones hicieron en la carpeta de datos compartida y refresca
+    las sugerencias, el stock y el producto mostrado. Se reprograma cada config.CAMBIOS_SONDEO_MS.
+    La lectura del diario corre en segundo plano: en una carpeta de red puede demorar.
+    """
+    global _id_sondeo_cambios
+    _id_sondeo_cambios = None
+    if not (app_principal_ref and vista_detalle_producto_widget and vista_detalle_producto_widget.winfo_exists()):
+        return
+    if not tareas_segundo_plano.ejecutor.ocupado("sondeo_cambios"):
+        tareas_segundo_plano.ejecutar(data_manager.sincronizar_cambios, al_terminar=_refrescar_tras_cambios_externos,
+                                      al_fallar=lambda e: print(f"ADVERTENCIA (ui_components): No se pudo leer el diario de cambios: {e}"),
+                                      prioridad=PRIORIDAD_BAJA, clave="sondeo_cambios")
+    _id_sondeo_cambios = app_principal_ref.after(config.CAMBIOS_SONDEO_MS, _sondear_cambios_otras_estaciones)
+
+def _refrescar_tras_cambios_externos(hubo_cambios):
+    if not (hubo_cambios and vista_detalle_producto_widget and vista_detalle_producto_widget.winfo_exists()):
+        return
+    actualizar_sugerencias_ui() # La generación del catálogo cambió: se recalculan las sugerencias
+    _calcular_y_actualizar_total_stock_ui()
+    nombre_mostrado = vista_detalle_producto_widget.nombre_mostrado
+    if nombre_mostrado is not None:
+        datos_prod = data_manager.get_producto_data(nombre_mostrado)
+        if datos_prod is None:
+            vista_detalle_producto_widget.mostrar_mensaje("El producto fue eliminado en otra estación.")
+        else:
+            vista_detalle_producto_widget.mostrar_producto(nombre_mostrado, datos_prod) # No hace nada si no cambió
+
+def _mostrar_resumen_stock_ui_accion(event=None):
+    """Muestra el detalle del stock: por tipo de batería, por prefijo de serie y productos con stock bajo."""
+    resumen = data_manager.get_resumen_stock()
+
+    def _lineas_grupos(grupos, etiqueta_vacia):
+        return [f"  {clave or etiqueta_vacia}: {stock} unidades ({cantidad} productos)"
+                for clave, (stock, cantidad) in sorted(grupos.items(), key=lambda item: (-item[1][0], item[0]))]
+
+    stock_bajo = data_manager.get_productos_stock_bajo()
+    lineas = [f"Stock Total Global: {resumen['total']} unidades en {resumen['productos']} productos", "", "Por tipo de batería:"]
+    lineas += _lineas_grupos(resumen["por_bateria"], "(sin batería)")
+    lineas += ["", "Por prefijo de serie:"]
+    lineas += _lineas_grupos(resumen["por_prefijo_serie"], "(sin prefijo)")
+    lineas += ["", f"Stock bajo (≤ {config.STOCK_BAJO_UMBRAL} unidades): {len(stock_bajo)} productos"]
+    lineas += [f"  {nombre}" for nombre in stock_bajo[:15]]
+    if len(stock_bajo) > 15:
+        lineas.append(f"  ... y {len(stock_bajo) - 15} más")
+    messagebox.showinfo("Resumen de Stock", "\n".join(lineas), parent=app_principal_ref)
 
-    return False
+def _es_url_valida(url_string):
+    """Valida si un string es una URL HTTP/HTTPS básica o un archivo existente en la carpeta de manuales.
+    La regla vive en validacion_productos para que la importación masiva use exactamente la misma.
+    """
+    return es_recurso_valido(url_string)
 
 
 # --- Funciones de Gestión de Sesión ---
@@ -88,6 +245,11 @@ def cerrar_sesion_ui():
         duracion_minutos = duracion.total_seconds() / 60
         registrar_accion_excel("Cierre Sesion", f"Usuario: {data_manager.usuario_actual['nombre']}", duracion_min=duracion_minutos)
     
+    global _id_sondeo_cambios
+    if _id_sondeo_cambios is not None and app_principal_ref:
+        app_principal_ref.after_cancel(_id_sondeo_cambios)
+        _id_sondeo_cambios = None
+
     # Limpia los datos del usuario actual
     data_manager.usuario_actual = {"nombre": None, "rol": None}
     data_manager.hora_inicio_sesion_actual = None
@@ -105,24 +267,14 @@ def cerrar_sesion_ui():
 
 # --- Funciones CRUD de Productos (con interacción UI) ---
 
-def _abrir_ventana_registrar_producto_ui_accion():
-    """Abre una ventana para registrar un nuevo producto."""
-    ventana_reg = tk.Toplevel(app_principal_ref)
-    ventana_reg.title("Registrar Nuevo Producto")
-    ventana_reg.geometry("500x600")
-    ventana_reg.configure(background=config.COLOR_BACKGROUND)
-    ventana_reg.grab_set() 
-
-    reg_style = ttk.Style(ventana_reg)
-    reg_style.theme_use(style_aplicacion_global.theme_use())
-    reg_style.configure("Reg.TFrame", background=config.COLOR_BACKGROUND)
-    reg_style.configure("Reg.TLabel", background=config.COLOR_BACKGROUND, font=("Arial", 10))
-    reg_style.configure("Reg.TEntry", font=("Arial", 10), padding=3)
+def _construir_ventana_registrar_producto():
+    """Construye (oculta) la ventana de registro de productos. Se llama una sola vez por sesión."""
+    ventana_reg = _crear_ventana_dialogo(app_principal_ref, "Registrar Nuevo Producto", "500x600")
 
     main_frame_reg = ttk.Frame(ventana_reg, style="Reg.TFrame", padding=15)
     main_frame_reg.pack(expand=True, fill="both")
     ttk.Label(main_frame_reg, text="Registrar Nuevo Producto", font=("Arial", 14, "bold"), background=config.COLOR_BACKGROUND, foreground=config.COLOR_HEADER_BG).pack(pady=(0,15))
-    
+
     campos_reg_defs_ui = ["Nombre Producto:", "Serie:", "Manual (URL/Archivo):", "Calibración (URL):", "Batería:", "Info Adicional:", "Imagen (ej: nombre.png):", "Stock Inicial:"]
     entries_reg_ui = {}
     for campo_text_ui in campos_reg_defs_ui:
@@ -135,23 +287,24 @@ def _abrir_ventana_registrar_producto_ui_accion():
         else: entry_ui = ttk.Entry(row_frame_ui, style="Reg.TEntry", width=35)
         entry_ui.pack(side="left", fill="x", expand=True)
         entries_reg_ui[key_reg_ui] = entry_ui
-    
+
     def guardar_nuevo_prod_accion_interna():
+        if tareas_segundo_plano.ejecutor.ocupado("guardar_producto"): return # Doble clic mientras se guarda
         nuevo_nombre_prod = entries_reg_ui["nombre_producto"].get().strip()
-        if not nuevo_nombre_prod: 
+        if not nuevo_nombre_prod:
             messagebox.showerror("Error", "El nombre del producto es obligatorio.", parent=ventana_reg)
             return
-        
-        if nuevo_nombre_prod in data_manager.get_productos_data(): 
+
+        if nuevo_nombre_prod in data_manager.get_productos_data():
             messagebox.showerror("Error", f"El producto '{nuevo_nombre_prod}' ya existe.", parent=ventana_reg)
             return
-        
+
         try:
             stock_str_reg_ui = entries_reg_ui["stock_inicial"].get().strip()
-            if not stock_str_reg_ui.isdigit() or int(stock_str_reg_ui) < 0: 
+            if not es_stock_valido(stock_str_reg_ui):
                 messagebox.showerror("Error", "El stock debe ser un número entero mayor o igual a 0.", parent=ventana_reg)
                 return
-            
+
             manual_url = entries_reg_ui["manual"].get().strip()
             calibracion_url = entries_reg_ui["calibracion"].get().strip()
 
@@ -172,46 +325,48 @@ def _abrir_ventana_registrar_producto_ui_accion():
                 "imagen": entries_reg_ui["imagen"].get().strip(),
                 "stock": int(stock_str_reg_ui)
             }
-            
-            if data_manager.registrar_producto_data(nuevo_nombre_prod, nuevo_producto_datos_reg):
-                registrar_accion_excel("Registro Producto", f"Producto: {nuevo_nombre_prod}, Stock: {nuevo_producto_datos_reg['stock']}")
-                messagebox.showinfo("Éxito", f"Producto '{nuevo_nombre_prod}' registrado.", parent=ventana_reg)
-                actualizar_sugerencias_ui()
-                _calcular_y_actualizar_total_stock_ui()
-                ventana_reg.destroy() 
-            else: messagebox.showerror("Error", f"No se pudo registrar '{nuevo_nombre_prod}'.", parent=ventana_reg)
+
+            def _al_registrar(registrado):
+                if registrado:
+                    registrar_accion_excel("Registro Producto", f"Producto: {nuevo_nombre_prod}, Stock: {nuevo_producto_datos_reg['stock']}")
+                    messagebox.showinfo("Éxito", f"Producto '{nuevo_nombre_prod}' registrado.", parent=ventana_reg)
+                    actualizar_sugerencias_ui()
+                    _calcular_y_actualizar_total_stock_ui()
+                    _ocultar_dialogo(ventana_reg)
+                else: messagebox.showerror("Error", f"No se pudo registrar '{nuevo_nombre_prod}'.", parent=ventana_reg)
+
+            # El guardado escribe el catálogo y el diario de cambios: corre fuera del hilo de Tk
+            tareas_segundo_plano.ejecutar(data_manager.registrar_producto_data, nuevo_nombre_prod, nuevo_producto_datos_reg,
+                                          al_terminar=_al_registrar, prioridad=PRIORIDAD_ALTA, clave="guardar_producto",
+                                          titulo_error="Error al Guardar", padre=ventana_reg)
         except Exception as e: messagebox.showerror("Error al Guardar", str(e), parent=ventana_reg)
 
     ttk.Button(main_frame_reg, text="Guardar Producto", command=guardar_nuevo_prod_accion_interna, style="Accent.TButton").pack(pady=20)
-    entries_reg_ui["nombre_producto"].focus()
 
+    def _preparar():
+        """Deja el formulario en blanco para un nuevo registro."""
+        for entry_ui in entries_reg_ui.values():
+            _vaciar_campo(entry_ui)
+        entries_reg_ui["nombre_producto"].focus()
 
-def _abrir_ventana_editar_producto_ui_accion(nombre_producto_original):
-    """Abre una ventana para editar un producto existente."""
-    if data_manager.usuario_actual["rol"] != "administrador":
-        messagebox.showwarning("Acceso Denegado", "Solo administradores pueden editar productos.", parent=app_principal_ref)
-        return
+    return {"ventana": ventana_reg, "preparar": _preparar}
 
-    datos_prod = data_manager.get_producto_data(nombre_producto_original)
-    if not datos_prod:
-        messagebox.showerror("Error", f"Producto '{nombre_producto_original}' no encontrado para editar.", parent=app_principal_ref)
-        return
+def _abrir_ventana_registrar_producto_ui_accion():
+    """Abre la ventana para registrar un nuevo producto (se construye una vez y se reutiliza)."""
+    dialogo = _obtener_dialogo("registrar_producto", _construir_ventana_registrar_producto)
+    _mostrar_dialogo(dialogo["ventana"])
+    dialogo["preparar"]()
 
-    ventana_editar = tk.Toplevel(app_principal_ref)
-    ventana_editar.title(f"Editar Producto: {nombre_producto_original}")
-    ventana_editar.geometry("500x650")
-    ventana_editar.configure(background=config.COLOR_BACKGROUND)
-    ventana_editar.grab_set()
 
-    edit_style = ttk.Style(ventana_editar)
-    edit_style.theme_use(style_aplicacion_global.theme_use())
-    edit_style.configure("Edit.TFrame", background=config.COLOR_BACKGROUND)
-    edit_style.configure("Edit.TLabel", background=config.COLOR_BACKGROUND, font=("Arial", 10))
-    edit_style.configure("Edit.TEntry", font=("Arial", 10), padding=3)
+def _construir_ventana_editar_producto():
+    """Construye (oculta) la ventana de edición de productos. Se repuebla con cada producto a editar."""
+    ventana_editar = _crear_ventana_dialogo(app_principal_ref, "Editar Producto", "500x650")
+    producto_en_edicion = {"nombre": None, "datos": None, "version": None} # Producto cargado en el formulario
 
     main_frame_edit = ttk.Frame(ventana_editar, style="Edit.TFrame", padding=15)
     main_frame_edit.pack(expand=True, fill="both")
-    ttk.Label(main_frame_edit, text=f"Editar Producto: {nombre_producto_original}", font=("Arial", 14, "bold"), background=config.COLOR_BACKGROUND, foreground=config.COLOR_HEADER_BG).pack(pady=(0,15))
+    lbl_titulo_edit = ttk.Label(main_frame_edit, text="", font=("Arial", 14, "bold"), background=config.COLOR_BACKGROUND, foreground=config.COLOR_HEADER_BG)
+    lbl_titulo_edit.pack(pady=(0,15))
 
     campos_edit_defs_ui = ["Nombre Producto:", "Serie:", "Manual (URL/Archivo):", "Calibración (URL):", "Batería:", "Info Adicional:", "Imagen (ej: nombre.png):", "Stock:"]
     entries_edit_ui = {}
@@ -220,39 +375,48 @@ def _abrir_ventana_editar_producto_ui_accion(nombre_producto_original):
         row_frame_ui.pack(fill="x", pady=3)
         ttk.Label(row_frame_ui, text=campo_text_ui, style="Edit.TLabel", width=20).pack(side="left")
         key_edit_ui = campo_text_ui.split(":")[0].lower().replace(" (url)", "").replace(" (url/archivo)", "").replace(" (ej nombrepng)", "").replace(" ", "_")
-        
+
         if key_edit_ui == "nombre_producto":
-            entry_ui = ttk.Label(row_frame_ui, text=nombre_producto_original, style="Edit.TLabel")
-            entry_ui.pack(side="left", fill="x", expand=True)
-        elif campo_text_ui == "Info Adicional:": 
+            lbl_nombre_edit = ttk.Label(row_frame_ui, text="", style="Edit.TLabel")
+            lbl_nombre_edit.pack(side="left", fill="x", expand=True)
+        elif campo_text_ui == "Info Adicional:":
             entry_ui = tk.Text(row_frame_ui, font=("Arial", 10), width=35, height=4, relief="solid", borderwidth=1, wrap="word")
-            entry_ui.insert("1.0", datos_prod.get("info", ""))
             entry_ui.pack(side="left", fill="x", expand=True)
             entries_edit_ui["info"] = entry_ui
-        else: 
+        else:
             entry_ui = ttk.Entry(row_frame_ui, style="Edit.TEntry", width=35)
-            entry_ui.insert(0, datos_prod.get(key_edit_ui, ''))
             entry_ui.pack(side="left", fill="x", expand=True)
             entries_edit_ui[key_edit_ui] = entry_ui
-    
+
+    def _al_fallar_edicion(accion_fallida):
+        """Manejador de errores de guardar/eliminar: un conflicto de versión es un aviso, no un error."""
+        def _al_fallar(e):
+            if isinstance(e, data_manager.ConflictoDeVersion):
+                messagebox.showwarning("Conflicto de Edición", f"{accion_fallida}: {e}", parent=ventana_editar)
+            else:
+                messagebox.showerror("Error", f"{accion_fallida}: {e}", parent=ventana_editar)
+        return _al_fallar
+
     def _guardar_cambios_prod_accion_interna():
+        if tareas_segundo_plano.ejecutor.ocupado("guardar_producto"): return # Doble clic mientras se guarda
+        nombre_producto_original, datos_prod = producto_en_edicion["nombre"], producto_en_edicion["datos"]
         try:
             datos_para_actualizar = {}
             cambios_detectados_log = []
-            
+
             for key, entry_widget in entries_edit_ui.items():
                 valor_actual_en_db = str(datos_prod.get(key, ''))
                 valor_nuevo_del_widget = entry_widget.get("1.0", tk.END).strip() if isinstance(entry_widget, tk.Text) else entry_widget.get().strip()
-                
+
                 if key == "stock":
-                    if not valor_nuevo_del_widget.isdigit() or int(valor_nuevo_del_widget) < 0:
+                    if not es_stock_valido(valor_nuevo_del_widget):
                         messagebox.showerror("Error de Validación", "Stock debe ser un número entero mayor o igual a 0.", parent=ventana_editar)
                         return
                     valor_nuevo_parsed = int(valor_nuevo_del_widget)
                     if valor_nuevo_parsed != int(valor_actual_en_db if valor_actual_en_db.isdigit() else -1):
                         cambios_detectados_log.append(f"{key}: '{valor_actual_en_db}' -> '{valor_nuevo_parsed}'")
                     datos_para_actualizar[key] = valor_nuevo_parsed
-                elif key in ["manual", "calibracion"]: 
+                elif key in ["manual", "calibracion"]:
                     if valor_nuevo_del_widget and not _es_url_valida(valor_nuevo_del_widget):
                         messagebox.showerror("Error de Validación", f"URL/Archivo de {key} no válida.", parent=ventana_editar)
                         return
@@ -263,34 +427,48 @@ def _abrir_ventana_editar_producto_ui_accion(nombre_producto_original):
                     if valor_nuevo_del_widget != valor_actual_en_db:
                         cambios_detectados_log.append(f"{key}: '{valor_actual_en_db}' -> '{valor_nuevo_del_widget}'")
                     datos_para_actualizar[key] = valor_nuevo_del_widget
-            
+
             if not cambios_detectados_log:
                 messagebox.showinfo("Sin Cambios", "No se detectaron cambios para guardar.", parent=ventana_editar); return
 
-            if data_manager.actualizar_producto_data(nombre_producto_original, datos_para_actualizar):
-                detalle_log = f"Producto: {nombre_producto_original}. Cambios: {'; '.join(cambios_detectados_log)}"
-                registrar_accion_excel("Edicion Producto (Guardado)", detalle_log)
-                messagebox.showinfo("Éxito", f"Producto '{nombre_producto_original}' actualizado.", parent=ventana_editar)
-                _calcular_y_actualizar_total_stock_ui()
-                mostrar_informacion_producto_seleccionado_ui() 
-                ventana_editar.destroy()
-            else:
-                messagebox.showerror("Error", "No se pudo actualizar el producto en el gestor de datos.", parent=ventana_editar)
+            def _al_actualizar(actualizado):
+                if actualizado:
+                    detalle_log = f"Producto: {nombre_producto_original}. Cambios: {'; '.join(cambios_detectados_log)}"
+                    registrar_accion_excel("Edicion Producto (Guardado)", detalle_log)
+                    messagebox.showinfo("Éxito", f"Producto '{nombre_producto_original}' actualizado.", parent=ventana_editar)
+                    _calcular_y_actualizar_total_stock_ui()
+                    mostrar_informacion_producto_seleccionado_ui()
+                    _ocultar_dialogo(ventana_editar)
+                else:
+                    messagebox.showerror("Error", "No se pudo actualizar el producto en el gestor de datos.", parent=ventana_editar)
+
+            # Con la versión leída al abrir: si otra estación lo cambió entre medio, no se pisa su cambio
+            tareas_segundo_plano.ejecutar(data_manager.actualizar_producto_data, nombre_producto_original, datos_para_actualizar,
+                                          version_esperada=producto_en_edicion["version"], al_terminar=_al_actualizar,
+                                          al_fallar=_al_fallar_edicion("No se guardaron cambios"),
+                                          prioridad=PRIORIDAD_ALTA, clave="guardar_producto")
 
         except Exception as e: messagebox.showerror("Error", f"No se guardaron cambios: {e}", parent=ventana_editar)
 
     def _eliminar_producto_desde_edicion():
+        if tareas_segundo_plano.ejecutor.ocupado("guardar_producto"): return
+        nombre_producto_original = producto_en_edicion["nombre"]
         if messagebox.askyesno("Confirmar Eliminación", f"¿Realmente desea eliminar el producto '{nombre_producto_original}'?", parent=ventana_editar):
-            if data_manager.eliminar_producto_data(nombre_producto_original):
-                registrar_accion_excel("Eliminacion Producto", f"Producto: {nombre_producto_original}")
-                messagebox.showinfo("Éxito", f"Producto '{nombre_producto_original}' eliminado.", parent=ventana_editar)
-                _limpiar_frame_contenido_widgets(frame_info_producto_dinamico) 
-                ttk.Label(frame_info_producto_dinamico, text="Producto eliminado. Seleccione otro.", style="Info.TLabel", justify=tk.CENTER).pack(expand=True, padx=20, pady=20)
-                actualizar_sugerencias_ui() 
-                _calcular_y_actualizar_total_stock_ui()
-                ventana_editar.destroy()
-            else:
-                messagebox.showerror("Error", "No se pudo eliminar el producto del gestor de datos.", parent=ventana_editar)
+            def _al_eliminar(eliminado):
+                if eliminado:
+                    registrar_accion_excel("Eliminacion Producto", f"Producto: {nombre_producto_original}")
+                    messagebox.showinfo("Éxito", f"Producto '{nombre_producto_original}' eliminado.", parent=ventana_editar)
+                    vista_detalle_producto_widget.mostrar_mensaje("Producto eliminado. Seleccione otro.")
+                    actualizar_sugerencias_ui()
+                    _calcular_y_actualizar_total_stock_ui()
+                    _ocultar_dialogo(ventana_editar)
+                else:
+                    messagebox.showerror("Error", "No se pudo eliminar el producto del gestor de datos.", parent=ventana_editar)
+
+            tareas_segundo_plano.ejecutar(data_manager.eliminar_producto_data, nombre_producto_original,
+                                          version_esperada=producto_en_edicion["version"], al_terminar=_al_eliminar,
+                                          al_fallar=_al_fallar_edicion("No se eliminó el producto"),
+                                          prioridad=PRIORIDAD_ALTA, clave="guardar_producto")
 
 
     btn_frame_edit = ttk.Frame(main_frame_edit, style="Edit.TFrame")
@@ -298,19 +476,164 @@ def _abrir_ventana_editar_producto_ui_accion(nombre_producto_original):
     ttk.Button(btn_frame_edit, text="Guardar Cambios", command=_guardar_cambios_prod_accion_interna, style="Accent.TButton").pack(side="left", padx=(0,10))
     ttk.Button(btn_frame_edit, text="Eliminar Producto", command=_eliminar_producto_desde_edicion, style="Accent.TButton").pack(side="left")
 
-    if "serie" in entries_edit_ui:
+    def _preparar(nombre_producto_original, datos_prod):
+        """Carga el producto en el formulario."""
+        producto_en_edicion["nombre"], producto_en_edicion["datos"] = nombre_producto_original, datos_prod
+        producto_en_edicion["version"] = data_manager.get_version_producto(nombre_producto_original)
+        ventana_editar.title(f"Editar Producto: {nombre_producto_original}")
+        lbl_titulo_edit.config(text=f"Editar Producto: {nombre_producto_original}")
+        lbl_nombre_edit.config(text=nombre_producto_original)
+        for key, entry_ui in entries_edit_ui.items():
+            _vaciar_campo(entry_ui)
+            if isinstance(entry_ui, tk.Text): entry_ui.insert("1.0", datos_prod.get(key, ''))
+            else: entry_ui.insert(0, datos_prod.get(key, ''))
         entries_edit_ui["serie"].focus()
 
+    return {"ventana": ventana_editar, "preparar": _preparar}
+
+def _abrir_ventana_editar_producto_ui_accion(nombre_producto_original):
+    """Abre la ventana para editar un producto existente (se construye una vez y se reutiliza)."""
+    if data_manager.usuario_actual["rol"] != "administrador":
+        messagebox.showwarning("Acceso Denegado", "Solo administradores pueden editar productos.", parent=app_principal_ref)
+        return
+
+    datos_prod = data_manager.get_producto_data(nombre_producto_original)
+    if not datos_prod:
+        messagebox.showerror("Error", f"Producto '{nombre_producto_original}' no encontrado para editar.", parent=app_principal_ref)
+        return
+
+    dialogo = _obtener_dialogo("editar_producto", _construir_ventana_editar_producto)
+    _mostrar_dialogo(dialogo["ventana"])
+    dialogo["preparar"](nombre_producto_original, datos_prod)
+
+
+def _importar_catalogo_ui_accion():
+    """Importa productos en lote desde un archivo CSV o XLSX elegido por el administrador."""
+    if tareas_segundo_plano.ejecutor.ocupado("catalogo"):
+        messagebox.showinfo("Catálogo", "Hay una importación o exportación en curso.", parent=app_principal_ref)
+        return
+    ruta_archivo = filedialog.askopenfilename(parent=app_principal_ref, title="Importar Catálogo",
+                                              filetypes=[("Catálogo (CSV o Excel)", "*.csv *.xlsx"), ("Todos los archivos", "*.*")])
+    if not ruta_archivo: return
+    actualizar_existentes = messagebox.askyesno("Productos Existentes", "¿Actualizar los productos que ya existen en el catálogo?\n(Si elige 'No', se omiten y se reportan como error.)", parent=app_principal_ref)
+
+    def _importar():
+        """En el hilo de trabajo: importa y, si hubo errores, escribe el reporte."""
+        resultado = importacion_catalogo.importar_catalogo(ruta_archivo, actualizar_existentes=actualizar_existentes,
+                                                           cancelado=tareas_segundo_plano.tarea_cancelada)
+        if resultado is None:
+            return None # Cancelada: el resultado ya no se entrega
+        ruta_reporte = importacion_catalogo.escribir_reporte_errores(resultado["errores"]) if resultado["errores"] else None
+        return resultado, ruta_reporte
+
+    def _al_fallar(e):
+        messagebox.showerror("Error al Importar", f"No se pudo importar '{os.path.basename(ruta_archivo)}': {e}", parent=app_principal_ref)
+
+    tareas_segundo_plano.ejecutar(_importar, al_terminar=lambda r: _mostrar_resultado_importacion(ruta_archivo, *r),
+                                  al_fallar=_al_fallar, clave="catalogo")
+
+def _mostrar_resultado_importacion(ruta_archivo, resultado, ruta_reporte):
+    errores = resultado["errores"]
+    registrar_accion_excel("Importacion Catalogo", f"Archivo: {os.path.basename(ruta_archivo)}, Registrados: {resultado['registrados']}, Actualizados: {resultado['actualizados']}, Errores: {len(errores)}")
+    resumen = (f"Filas leídas: {resultado['filas_leidas']}\nRegistrados: {resultado['registrados']}\n"
+               f"Actualizados: {resultado['actualizados']}\nCon errores: {len(errores)}")
+    if errores:
+        primeros_errores = "\n".join(f"Fila {fila} ({nombre or 'sin nombre'}): {motivo}" for fila, nombre, motivo in errores[:5])
+        messagebox.showwarning("Importación con Errores", f"{resumen}\n\nPrimeros errores:\n{primeros_errores}\n\nReporte completo: {ruta_reporte}", parent=app_principal_ref)
+    else:
+        messagebox.showinfo("Importación Completada", resumen, parent=app_principal_ref)
+    actualizar_sugerencias_ui()
+    _calcular_y_actualizar_total_stock_ui()
+
+def _exportar_catalogo_ui_accion():
+    """Exporta el catálogo completo a un archivo CSV o XLSX."""
+    if tareas_segundo_plano.ejecutor.ocupado("catalogo"):
+        messagebox.showinfo("Catálogo", "Hay una importación o exportación en curso.", parent=app_principal_ref)
+        return
+    ruta_archivo = filedialog.asksaveasfilename(parent=app_principal_ref, title="Exportar Catálogo", defaultextension=".xlsx",
+                                                filetypes=[("Excel", "*.xlsx"), ("CSV", "*.csv")])
+    if not ruta_archivo: return
+
+    def _al_exportar(cantidad):
+        registrar_accion_excel("Exportacion Catalogo", f"Archivo: {os.path.basename(ruta_archivo)}, Productos: {cantidad}")
+        messagebox.showinfo("Exportación Completada", f"Se exportaron {cantidad} productos a '{ruta_archivo}'.", parent=app_principal_ref)
+
+    def _al_fallar(e):
+        messagebox.showerror("Error al Exportar", f"No se pudo exportar el catálogo: {e}", parent=app_principal_ref)
+
+    tareas_segundo_plano.ejecutar(importacion_catalogo.exportar_catalogo, ruta_archivo, cancelado=tareas_segundo_plano.tarea_cancelada,
+                                  al_terminar=_al_exportar, al_fallar=_al_fallar, clave="catalogo")
+
+
+# --- Búsqueda en Manuales PDF ---
+def _iniciar_actualizacion_indice_manuales():
+    """Sincroniza el índice de manuales en segundo plano; solo se reindexan los PDF nuevos o modificados."""
+    if tareas_segundo_plano.ejecutor.ocupado("indice_manuales") or not app_principal_ref:
+        return
+    if not indice_manuales.pypdf_disponible():
+        _mostrar_estado_manuales("Búsqueda en manuales no disponible: instale el paquete 'pypdf' (pip install pypdf).")
+        return
+    _mostrar_estado_manuales("Actualizando el índice de manuales...")
+    tareas_segundo_plano.ejecutar(indice_manuales.actualizar_indice_manuales, cancelado=tareas_segundo_plano.tarea_cancelada,
+                                  al_terminar=_al_actualizar_indice_manuales,
+                                  al_fallar=lambda e: _mostrar_estado_manuales(f"No se pudo actualizar el índice de manuales: {e}"),
+                                  prioridad=PRIORIDAD_BAJA, clave="indice_manuales")
+
+def _al_actualizar_indice_manuales(resultado):
+    """Muestra el estado del índice de manuales una vez actualizado."""
+    cantidad_manuales, cantidad_paginas = indice_manuales.estado_indice_manuales()
+    texto_estado = f"Índice: {cantidad_manuales} manuales, {cantidad_paginas} páginas."
+    if resultado[2]:
+        texto_estado += f" {len(resultado[2])} manuales no se pudieron leer."
+    _mostrar_estado_manuales(texto_estado)
+
+def _mostrar_estado_manuales(texto):
+    if lbl_estado_manuales_widget and lbl_estado_manuales_widget.winfo_exists():
+        lbl_estado_manuales_widget.config(text=texto)
+
+def _buscar_en_manuales_ui_accion(event=None):
+    """Busca el texto ingresado dentro de los manuales indexados y muestra las páginas encontradas."""
+    if not (entrada_busqueda_manuales_widget and lista_resultados_manuales_widget):
+        return
+    texto = entrada_busqueda_manuales_widget.get().strip()
+    if not texto:
+        return
+    # La primera búsqueda lee el índice del disco: corre en segundo plano y una búsqueda nueva reemplaza a la anterior
+    inicio = instrumentacion.marca_tiempo()
+    tareas_segundo_plano.ejecutar(indice_manuales.buscar_en_manuales, texto, prioridad=PRIORIDAD_ALTA, clave="buscar_manuales",
+                                  al_terminar=lambda resultados: _mostrar_resultados_manuales(texto, resultados, inicio),
+                                  titulo_error="Error en la Búsqueda", padre=app_principal_ref)
+
+def _mostrar_resultados_manuales(texto, resultados, inicio):
+    global _resultados_manuales_mostrados
+    instrumentacion.registrar_desde("ui.buscar_en_manuales", inicio)
+    if not (lista_resultados_manuales_widget and lista_resultados_manuales_widget.winfo_exists()):
+        return
+    _resultados_manuales_mostrados = resultados
+    lista_resultados_manuales_widget.delete(0, tk.END)
+    for resultado in resultados:
+        productos = ", ".join(resultado["productos"]) or "(sin producto)"
+        lista_resultados_manuales_widget.insert(tk.END, f"{resultado['manual']} — pág. {resultado['pagina']} — {productos}")
+    if not resultados:
+        _mostrar_estado_manuales(f"No se encontró '{texto}' en los manuales indexados.")
+    else:
+        _mostrar_estado_manuales(f"{len(resultados)} páginas encontradas. Doble clic para abrir el manual.")
+    registrar_accion_excel("Busqueda Manuales", f"Texto: {texto}, Resultados: {len(resultados)}")
+
+def _abrir_manual_resultado_ui(event=None):
+    """Abre el manual del resultado seleccionado en la pestaña de manuales."""
+    if not lista_resultados_manuales_widget: return
+    indices = lista_resultados_manuales_widget.curselection()
+    if not indices or indices[0] >= len(_resultados_manuales_mostrados): return
+    abrir_enlace_web_util(_resultados_manuales_mostrados[indices[0]]["manual"], app_principal_ref)
 
 # --- Lógica Principal de la UI de la Enciclopedia ---
 def mostrar_informacion_producto_seleccionado_ui(event=None):
-    """Muestra la información del producto seleccionado en la UI."""
-    _limpiar_frame_contenido_widgets(frame_info_producto_dinamico) 
-    
-    if not lista_sugerencias_busqueda_widget: return
+    """Muestra la información del producto seleccionado en la vista de detalle (sin recrear sus widgets)."""
+    if not (lista_sugerencias_busqueda_widget and vista_detalle_producto_widget): return
     indices = lista_sugerencias_busqueda_widget.curselection()
     if not indices:
-        ttk.Label(frame_info_producto_dinamico, text="Seleccione un producto (doble clic) para ver su información.", style="Info.TLabel", justify=tk.CENTER).pack(expand=True, padx=20, pady=20)
+        vista_detalle_producto_widget.mostrar_mensaje("Seleccione un producto (doble clic) para ver su información.")
         return
         
     nombre_sel = lista_sugerencias_busqueda_widget.get(indices[0])
@@ -321,103 +644,12 @@ def mostrar_informacion_producto_seleccionado_ui(event=None):
     if not datos_prod: messagebox.showerror("Error", f"Datos no encontrados para {nombre_sel}.", parent=app_principal_ref); return
     if notebook_widget and tab_info_producto_widget: notebook_widget.select(tab_info_producto_widget)
 
-    main_info_frame = ttk.Frame(frame_info_producto_dinamico, style="Content.TFrame")
-    main_info_frame.pack(expand=True, fill="both", padx=10, pady=10)
-    text_frame = ttk.Frame(main_info_frame, style="Content.TFrame")
-    text_frame.pack(side="left", fill="both", expand=True, padx=(0,10))
-    
-    image_display_frame = ttk.Frame(main_info_frame, style="Content.TFrame", width=220, height=270)
-    image_display_frame.pack(side="right", fill="none", expand=False, padx=(10,0), anchor="ne")
-    image_display_frame.pack_propagate(False)
-
-    img_filename = datos_prod.get('imagen', '')
-    if img_filename:
-        try:
-            ruta_img = os.path.join(config.IMAGENES_PRODUCTOS_PATH, img_filename)
-            if os.path.exists(ruta_img):
-                img_original_pil = Image.open(ruta_img)
-                img_original_pil.thumbnail((200, 250)) 
-                img_tk_render_obj = ImageTk.PhotoImage(img_original_pil)
-                lbl_img_widget = tk.Label(image_display_frame, image=img_tk_render_obj, bg=config.COLOR_BACKGROUND)
-                lbl_img_widget.image = img_tk_render_obj
-                lbl_img_widget.pack(pady=5, padx=5, anchor="center")
-            else:
-                error_msg = f"(Imagen '{img_filename}' no encontrada)"
-                ttk.Label(image_display_frame, text=error_msg, style="ErrorImage.TLabel", wraplength=180).pack(pady=10, padx=5, anchor="n")
-        except Exception as e:
-            error_detalle = f"(Error al procesar imagen: {e})"
-            ttk.Label(image_display_frame, text=error_detalle, style="ErrorImage.TLabel", wraplength=180).pack(pady=10, padx=5, anchor="n")
-    else:
-        ttk.Label(image_display_frame, text="(Sin imagen asignada)", style="Info.TLabel").pack(pady=10, padx=5, anchor="n")
-    
-    ttk.Label(text_frame, text=f"Producto: {nombre_sel}", style="Info.Header.TLabel").pack(pady=(0, 10), anchor="nw")
-    
-    campos_def = {"serie": "Número de serie:", "manual": "Manual:", "calibracion": "Calibración:", "bateria": "Batería:", "info": "Info Adicional:", "imagen": "Archivo Imagen:", "stock": "Stock:"}
-    
-    for key, label_txt in campos_def.items():
-        # Los campos 'imagen' y 'stock' solo se muestran para administradores.
-        # Los botones de acción se gestionan por separado más abajo, por lo que este bucle solo
-        # se encarga de mostrar la etiqueta de texto y el valor del campo.
-        if data_manager.usuario_actual["rol"] != 'administrador' and key in ['imagen', 'stock']:
-            continue
-            
-        item_f = ttk.Frame(text_frame, style="Content.TFrame")
-        item_f.pack(fill="x", pady=3, anchor="nw")
-        ttk.Label(item_f, text=label_txt, style="Info.Bold.TLabel", width=18).pack(side="left", anchor="nw", padx=(0,5))
-        
-        val_dato = str(datos_prod.get(key, ''))
-
-        texto_a_mostrar = val_dato.strip() if val_dato.strip() else "No disponible"
-        
-        # MODIFICADO: Lógica para mostrar "Disponible" o "No disponible"
-        if key in ["manual", "calibracion"]:
-            if val_dato.strip() and _es_url_valida(val_dato):
-                texto_a_mostrar = "Disponible"
-            else:
-                texto_a_mostrar = "No disponible"
-
-        if key == "info":
-            lbl_val_w = ttk.Label(item_f, text=texto_a_mostrar, style="Info.TLabel", wraplength=text_frame.winfo_width() - 150 if text_frame.winfo_width() > 150 else 250)
-            lbl_val_w.pack(side="left", anchor="nw")
-        else:
-            ttk.Label(item_f, text=texto_a_mostrar, style="Info.TLabel").pack(side="left", anchor="nw")
-
-    btns_enlaces_f = ttk.Frame(text_frame, style="Content.TFrame")
-    btns_enlaces_f.pack(fill="x", pady=(15,5), anchor="nw")
-    
-    manual_valor = datos_prod.get('manual', '').strip()
-    # Se muestra el botón "Ver Manual" si hay un valor válido.
-    if manual_valor and _es_url_valida(manual_valor): 
-        ttk.Button(btns_enlaces_f, text="Ver Manual", style="Accent.TButton", command=lambda m=manual_valor: abrir_enlace_web_util(m, app_principal_ref)).pack(side="left", padx=(0,10))
-    
-    calibracion_valor = datos_prod.get('calibracion', '').strip()
-    # Se muestra el botón "Ver Calibración" si hay un valor válido.
-    if calibracion_valor and _es_url_valida(calibracion_valor): 
-        ttk.Button(btns_enlaces_f, text="Ver Calibración", style="Accent.TButton", command=lambda c=calibracion_valor: abrir_enlace_web_util(c, app_principal_ref)).pack(side="left", padx=(0,10))
-
-    if data_manager.usuario_actual["rol"] == "administrador":
-        admin_acts_f = ttk.Frame(text_frame, style="Content.TFrame")
-        admin_acts_f.pack(fill="x", pady=(10,5), anchor="nw", after=btns_enlaces_f)
-        ttk.Button(admin_acts_f, text="Editar/Eliminar Producto", style="Accent.TButton", command=lambda np=nombre_sel: _abrir_ventana_editar_producto_ui_accion(np)).pack(side="left", padx=(0,10))
+    vista_detalle_producto_widget.mostrar_producto(nombre_sel, datos_prod)
 
 # --- Funciones para la Gestión de Usuarios ---
-def _abrir_ventana_gestion_usuarios_ui_accion():
-    """Abre una ventana para que el administrador gestione usuarios."""
-    if data_manager.usuario_actual["rol"] != "administrador":
-        messagebox.showwarning("Acceso Denegado", "Solo administradores pueden gestionar usuarios.", parent=app_principal_ref)
-        return
-
-    ventana_gestion_usuarios = tk.Toplevel(app_principal_ref)
-    ventana_gestion_usuarios.title("Gestión de Usuarios")
-    ventana_gestion_usuarios.geometry("600x500")
-    ventana_gestion_usuarios.configure(background=config.COLOR_BACKGROUND)
-    ventana_gestion_usuarios.grab_set() 
-
-    gestion_style = ttk.Style(ventana_gestion_usuarios)
-    gestion_style.theme_use(style_aplicacion_global.theme_use())
-    gestion_style.configure("UserMgmt.TFrame", background=config.COLOR_BACKGROUND)
-    gestion_style.configure("UserMgmt.TLabel", background=config.COLOR_BACKGROUND, font=("Arial", 10))
-    gestion_style.configure("UserMgmt.TEntry", font=("Arial", 10), padding=3)
+def _construir_ventana_gestion_usuarios():
+    """Construye (oculta) la ventana de gestión de usuarios. Se repuebla cada vez que se abre."""
+    ventana_gestion_usuarios = _crear_ventana_dialogo(app_principal_ref, "Gestión de Usuarios", "600x500")
 
     main_frame_user_mgmt = ttk.Frame(ventana_gestion_usuarios, style="UserMgmt.TFrame", padding=15)
     main_frame_user_mgmt.pack(expand=True, fill="both")
@@ -425,15 +657,12 @@ def _abrir_ventana_gestion_usuarios_ui_accion():
 
     frame_lista_usuarios = ttk.Frame(main_frame_user_mgmt, style="UserMgmt.TFrame")
     frame_lista_usuarios.pack(fill="both", expand=True, pady=5)
-    
+
     lbl_usuarios = ttk.Label(frame_lista_usuarios, text="Usuarios Existentes:", style="UserMgmt.TLabel")
     lbl_usuarios.pack(anchor="w")
 
-    lista_usuarios_widget = tk.Listbox(frame_lista_usuarios, font=("Arial", 11), width=40, height=8, bg=config.COLOR_LISTBOX_BG, fg=config.COLOR_LISTBOX_FG, selectbackground=config.COLOR_LISTBOX_SELECT_BG, selectforeground=config.COLOR_LISTBOX_SELECT_FG, borderwidth=1, relief="solid", exportselection=False)
-    lista_usuarios_widget.pack(side="left", fill="both", expand=True)
-    scrollbar_usuarios = ttk.Scrollbar(frame_lista_usuarios, orient="vertical", command=lista_usuarios_widget.yview)
-    scrollbar_usuarios.pack(side="right", fill="y")
-    lista_usuarios_widget.config(yscrollcommand=scrollbar_usuarios.set)
+    lista_usuarios_widget = ListaVirtual(frame_lista_usuarios, font=("Arial", 11), width=40, height=8, style="UserMgmt.TFrame")
+    lista_usuarios_widget.pack(fill="both", expand=True)
 
     frame_edicion_usuario = ttk.Frame(main_frame_user_mgmt, style="UserMgmt.TFrame")
     frame_edicion_usuario.pack(fill="x", pady=10)
@@ -451,23 +680,21 @@ def _abrir_ventana_gestion_usuarios_ui_accion():
     entry_nueva_contrasena.pack(fill="x", pady=(0,10))
 
     def _actualizar_lista_usuarios():
-        """Carga la lista de usuarios desde data_manager y la muestra en la Listbox."""
-        lista_usuarios_widget.delete(0, tk.END)
-        for user_name in data_manager.get_usuarios_registrados_data().keys():
-            lista_usuarios_widget.insert(tk.END, user_name)
-        current_username_label.config(text="") 
+        """Carga la lista de usuarios desde data_manager y la muestra en la lista."""
+        lista_usuarios_widget.establecer_elementos(list(data_manager.get_usuarios_registrados_data()))
+        current_username_label.config(text="")
         combo_rol.set("")
-        entry_nueva_contrasena.set("")
+        _vaciar_campo(entry_nueva_contrasena)
 
     def _seleccionar_usuario_para_edicion(event=None):
-        """Maneja la selección de un usuario en la Listbox para editarlo."""
+        """Maneja la selección de un usuario en la lista para editarlo."""
         indices = lista_usuarios_widget.curselection()
         if not indices: return
         nombre_sel = lista_usuarios_widget.get(indices[0])
         current_username_label.config(text=nombre_sel)
         user_data = data_manager.get_usuarios_registrados_data().get(nombre_sel, {})
         combo_rol.set(user_data.get("rol", ""))
-        entry_nueva_contrasena.set("") 
+        _vaciar_campo(entry_nueva_contrasena)
 
     def _guardar_cambios_usuario():
         """Guarda los cambios realizados en un usuario seleccionado."""
@@ -476,41 +703,45 @@ def _abrir_ventana_gestion_usuarios_ui_accion():
             messagebox.showwarning("Advertencia", "Seleccione un usuario para editar.", parent=ventana_gestion_usuarios)
             return
 
+        if tareas_segundo_plano.ejecutor.ocupado("usuarios"): return # Doble clic mientras se guarda
+
         nuevo_rol = combo_rol.get().strip()
         nueva_contrasena = entry_nueva_contrasena.get().strip()
-        
-        cambios_detectados = []
         usuario_actual_data = data_manager.get_usuarios_registrados_data().get(nombre_usuario_sel, {})
 
-        if nuevo_rol and nuevo_rol != usuario_actual_data.get("rol"):
-            if auth_handler.cambiar_rol_usuario(nombre_usuario_sel, nuevo_rol):
+        def _guardar():
+            """En el hilo de trabajo (el hash de la contraseña es lento). Retorna (cambios, error)."""
+            cambios_detectados = []
+            if nuevo_rol and nuevo_rol != usuario_actual_data.get("rol"):
+                if not auth_handler.cambiar_rol_usuario(nombre_usuario_sel, nuevo_rol):
+                    return cambios_detectados, f"No se pudo cambiar el rol para '{nombre_usuario_sel}'."
                 cambios_detectados.append(f"Rol: '{usuario_actual_data.get('rol')}' -> '{nuevo_rol}'")
-            else:
-                messagebox.showerror("Error", f"No se pudo cambiar el rol para '{nombre_usuario_sel}'.", parent=ventana_gestion_usuarios)
-                return
-
-        if nueva_contrasena:
-            if auth_handler.cambiar_contrasena_usuario(nombre_usuario_sel, nueva_contrasena):
+            if nueva_contrasena:
+                if not auth_handler.cambiar_contrasena_usuario(nombre_usuario_sel, nueva_contrasena):
+                    return cambios_detectados, f"No se pudo cambiar la contraseña para '{nombre_usuario_sel}'."
                 cambios_detectados.append(f"Contraseña cambiada.")
+            return cambios_detectados, None
+
+        def _al_guardar(resultado):
+            cambios_detectados, error = resultado
+            if cambios_detectados:
+                detalle_log = f"Usuario: {nombre_usuario_sel}. Cambios: {'; '.join(cambios_detectados)}"
+                registrar_accion_excel("Edicion Usuario", detalle_log)
+            if error:
+                messagebox.showerror("Error", error, parent=ventana_gestion_usuarios)
+            elif cambios_detectados:
+                messagebox.showinfo("Éxito", f"Usuario '{nombre_usuario_sel}' actualizado.", parent=ventana_gestion_usuarios)
             else:
-                messagebox.showerror("Error", f"No se pudo cambiar la contraseña para '{nombre_usuario_sel}'.", parent=ventana_gestion_usuarios)
-                return
+                messagebox.showinfo("Sin Cambios", "No se detectaron cambios para guardar.", parent=ventana_gestion_usuarios)
+            if cambios_detectados:
+                _actualizar_lista_usuarios()
 
-        if cambios_detectados:
-            detalle_log = f"Usuario: {nombre_usuario_sel}. Cambios: {'; '.join(cambios_detectados)}"
-            registrar_accion_excel("Edicion Usuario", detalle_log)
-            messagebox.showinfo("Éxito", f"Usuario '{nombre_usuario_sel}' actualizado.", parent=ventana_gestion_usuarios)
-            _actualizar_lista_usuarios() 
-        else:
-            messagebox.showinfo("Sin Cambios", "No se detectaron cambios para guardar.", parent=ventana_gestion_usuarios)
+        tareas_segundo_plano.ejecutar(_guardar, al_terminar=_al_guardar, prioridad=PRIORIDAD_ALTA, clave="usuarios",
+                                      padre=ventana_gestion_usuarios)
 
-    def _registrar_nuevo_usuario_ui_accion():
-        """Abre una ventana para registrar un nuevo usuario."""
-        ventana_nuevo_usuario = tk.Toplevel(ventana_gestion_usuarios)
-        ventana_nuevo_usuario.title("Registrar Nuevo Usuario")
-        ventana_nuevo_usuario.geometry("350x250")
-        ventana_nuevo_usuario.configure(background=config.COLOR_BACKGROUND)
-        ventana_nuevo_usuario.grab_set()
+    def _construir_ventana_nuevo_usuario():
+        """Construye (oculta) la ventana para registrar un nuevo usuario."""
+        ventana_nuevo_usuario = _crear_ventana_dialogo(ventana_gestion_usuarios, "Registrar Nuevo Usuario", "350x250")
 
         frame_nuevo = ttk.Frame(ventana_nuevo_usuario, style="Reg.TFrame", padding=15)
         frame_nuevo.pack(expand=True, fill="both")
@@ -526,7 +757,6 @@ def _abrir_ventana_gestion_usuarios_ui_accion():
         ttk.Label(frame_nuevo, text="Rol:", style="Reg.TLabel").pack(anchor="w")
         combo_rol_nuevo = ttk.Combobox(frame_nuevo, values=["usuario", "administrador"], state="readonly", style="Reg.TEntry")
         combo_rol_nuevo.pack(fill="x", pady=(0,10))
-        combo_rol_nuevo.set("usuario")
 
         def _guardar_nuevo_usuario():
             """Guarda el nuevo usuario registrado."""
@@ -537,35 +767,61 @@ def _abrir_ventana_gestion_usuarios_ui_accion():
             if not nombre or not contrasena or not rol:
                 messagebox.showerror("Error", "Todos los campos son obligatorios para un nuevo usuario.", parent=ventana_nuevo_usuario)
                 return
-            
-            if auth_handler.registrar_nuevo_usuario(nombre, contrasena, rol):
-                registrar_accion_excel("Registro Usuario", f"Usuario: {nombre}, Rol: {rol}")
-                messagebox.showinfo("Éxito", f"Usuario '{nombre}' registrado.", parent=ventana_nuevo_usuario)
-                _actualizar_lista_usuarios()
-                ventana_nuevo_usuario.destroy()
-            else:
-                messagebox.showerror("Error", f"El usuario '{nombre}' ya existe o hubo un error al registrar.", parent=ventana_nuevo_usuario)
+
+            if tareas_segundo_plano.ejecutor.ocupado("usuarios"): return
+
+            def _al_registrar(registrado):
+                if registrado:
+                    registrar_accion_excel("Registro Usuario", f"Usuario: {nombre}, Rol: {rol}")
+                    messagebox.showinfo("Éxito", f"Usuario '{nombre}' registrado.", parent=ventana_nuevo_usuario)
+                    _actualizar_lista_usuarios()
+                    _ocultar_dialogo(ventana_nuevo_usuario)
+                else:
+                    messagebox.showerror("Error", f"El usuario '{nombre}' ya existe o hubo un error al registrar.", parent=ventana_nuevo_usuario)
+
+            tareas_segundo_plano.ejecutar(auth_handler.registrar_nuevo_usuario, nombre, contrasena, rol, al_terminar=_al_registrar,
+                                          prioridad=PRIORIDAD_ALTA, clave="usuarios", padre=ventana_nuevo_usuario)
 
         ttk.Button(frame_nuevo, text="Registrar", command=_guardar_nuevo_usuario, style="Accent.TButton").pack(pady=10)
 
+        def _preparar():
+            _vaciar_campo(entry_nombre_nuevo)
+            _vaciar_campo(entry_pass_nuevo)
+            combo_rol_nuevo.set("usuario")
+            entry_nombre_nuevo.focus()
+
+        return {"ventana": ventana_nuevo_usuario, "preparar": _preparar}
+
+    def _registrar_nuevo_usuario_ui_accion():
+        """Abre la ventana para registrar un nuevo usuario."""
+        dialogo = _obtener_dialogo("nuevo_usuario", _construir_ventana_nuevo_usuario)
+        _mostrar_dialogo(dialogo["ventana"])
+        dialogo["preparar"]()
+
     def _eliminar_usuario_ui_accion():
         """Elimina un usuario seleccionado."""
         nombre_usuario_sel = current_username_label.cget("text")
         if not nombre_usuario_sel:
             messagebox.showwarning("Advertencia", "Seleccione un usuario para eliminar.", parent=ventana_gestion_usuarios)
             return
-        
+
         if nombre_usuario_sel == data_manager.usuario_actual["nombre"]:
             messagebox.showerror("Error", "No puedes eliminar tu propio usuario mientras estás logueado.", parent=ventana_gestion_usuarios)
             return
 
+        if tareas_segundo_plano.ejecutor.ocupado("usuarios"): return
+
         if messagebox.askyesno("Confirmar Eliminación", f"¿Realmente desea eliminar el usuario '{nombre_usuario_sel}'? Esta acción es irreversible.", parent=ventana_gestion_usuarios):
-            if auth_handler.eliminar_usuario(nombre_usuario_sel):
-                registrar_accion_excel("Eliminacion Usuario", f"Usuario: {nombre_usuario_sel}") # CORREGIDO: Usar nombre_usuario_sel
-                messagebox.showinfo("Eliminado", f"Usuario '{nombre_usuario_sel}' eliminado.", parent=ventana_gestion_usuarios)
-                _actualizar_lista_usuarios()
-            else:
-                messagebox.showerror("Error", "No se pudo eliminar el usuario.", parent=ventana_gestion_usuarios)
+            def _al_eliminar(eliminado):
+                if eliminado:
+                    registrar_accion_excel("Eliminacion Usuario", f"Usuario: {nombre_usuario_sel}") # CORREGIDO: Usar nombre_usuario_sel
+                    messagebox.showinfo("Eliminado", f"Usuario '{nombre_usuario_sel}' eliminado.", parent=ventana_gestion_usuarios)
+                    _actualizar_lista_usuarios()
+                else:
+                    messagebox.showerror("Error", "No se pudo eliminar el usuario.", parent=ventana_gestion_usuarios)
+
+            tareas_segundo_plano.ejecutar(auth_handler.eliminar_usuario, nombre_usuario_sel, al_terminar=_al_eliminar,
+                                          prioridad=PRIORIDAD_ALTA, clave="usuarios", padre=ventana_gestion_usuarios)
 
 
     btn_frame_user_mgmt = ttk.Frame(main_frame_user_mgmt, style="UserMgmt.TFrame")
@@ -577,33 +833,72 @@ def _abrir_ventana_gestion_usuarios_ui_accion():
     ttk.Button(btn_frame_user_mgmt, text="Eliminar Usuario", command=_eliminar_usuario_ui_accion, style="Accent.TButton").pack(side="left")
 
     lista_usuarios_widget.bind("<<ListboxSelect>>", _seleccionar_usuario_para_edicion)
-    _actualizar_lista_usuarios()
+    return {"ventana": ventana_gestion_usuarios, "preparar": _actualizar_lista_usuarios}
+
+def _abrir_ventana_gestion_usuarios_ui_accion():
+    """Abre la ventana para que el administrador gestione usuarios (se construye una vez y se reutiliza)."""
+    if data_manager.usuario_actual["rol"] != "administrador":
+        messagebox.showwarning("Acceso Denegado", "Solo administradores pueden gestionar usuarios.", parent=app_principal_ref)
+        return
+
+    dialogo = _obtener_dialogo("gestion_usuarios", _construir_ventana_gestion_usuarios)
+    _mostrar_dialogo(dialogo["ventana"])
+    dialogo["preparar"]()
 
 # --- Funciones para Construir las Ventanas Principales ---
-def _intentar_login_ui_logic(entry_usuario, entry_contrasena, ventana_login_ref_local, app_main_ref, callback_exito_login_ref):
-    """Lógica para intentar autenticar al usuario."""
-    global ventana_login_actual_ref
+def _intentar_login_ui_logic(entry_usuario, entry_contrasena, ventana_login_ref_local, app_main_ref, callback_exito_login_ref, boton_ingresar=None):
+    """
+    Lógica para intentar autenticar al usuario. La verificación (lenta a propósito) corre como
+    tarea en segundo plano, así la ventana sigue respondiendo mientras tanto.
+    """
+    if tareas_segundo_plano.ejecutor.ocupado("login"):
+        return # Ya hay una verificación en curso (doble clic)
     usuario_ingresado_login = entry_usuario.get().strip()
     contrasena_ingresada_login = entry_contrasena.get().strip()
-    info_usuario_autenticado = auth_handler.autenticar_usuario(usuario_ingresado_login, contrasena_ingresada_login)
-    
-    if info_usuario_autenticado:
-        data_manager.usuario_actual.update(info_usuario_autenticado)
-        data_manager.hora_inicio_sesion_actual = datetime.datetime.now()
-        registrar_accion_excel("Inicio Sesion", f"Usuario: {data_manager.usuario_actual['nombre']}, Rol: {data_manager.usuario_actual['rol']}")
-        
-        ventana_login_ref_local.destroy()
-        ventana_login_actual_ref = None
-        
-        app_main_ref.deiconify()
-        callback_exito_login_ref(app_main_ref)
-    else:
-        messagebox.showerror("Error de Inicio de Sesión", "Usuario o contraseña incorrectos.", parent=ventana_login_ref_local)
+    inicio = instrumentacion.marca_tiempo()
+
+    def _restaurar_ventana():
+        """Retorna False si la ventana de login ya no existe."""
+        if not ventana_login_ref_local.winfo_exists():
+            return False
+        ventana_login_ref_local.config(cursor="")
+        if boton_ingresar is not None:
+            boton_ingresar.state(["!disabled"])
+        return True
+
+    def _al_verificar(info_usuario_autenticado):
+        global ventana_login_actual_ref
+        instrumentacion.registrar_desde("ui.login", inicio)
+        if not _restaurar_ventana():
+            return
+        if info_usuario_autenticado:
+            data_manager.usuario_actual.update(info_usuario_autenticado)
+            data_manager.hora_inicio_sesion_actual = datetime.datetime.now()
+            registrar_accion_excel("Inicio Sesion", f"Usuario: {data_manager.usuario_actual['nombre']}, Rol: {data_manager.usuario_actual['rol']}")
+
+            ventana_login_ref_local.destroy()
+            ventana_login_actual_ref = None
+
+            app_main_ref.deiconify()
+            callback_exito_login_ref(app_main_ref)
+        else:
+            messagebox.showerror("Error de Inicio de Sesión", "Usuario o contraseña incorrectos.", parent=ventana_login_ref_local)
+
+    def _al_fallar(error):
+        if _restaurar_ventana():
+            messagebox.showerror("Error de Inicio de Sesión", f"No se pudo verificar el usuario: {error}", parent=ventana_login_ref_local)
+
+    if boton_ingresar is not None:
+        boton_ingresar.state(["disabled"])
+    ventana_login_ref_local.config(cursor="watch")
+    tareas_segundo_plano.ejecutar(auth_handler.autenticar_usuario, usuario_ingresado_login, contrasena_ingresada_login,
+                                  al_terminar=_al_verificar, al_fallar=_al_fallar, prioridad=PRIORIDAD_ALTA, clave="login")
 
 def crear_ventana_login_ui(app_principal_arg, callback_exito_login_arg):
     """Crea y muestra la ventana de inicio de sesión."""
     global app_principal_ref, ventana_login_actual_ref
     app_principal_ref = app_principal_arg
+    tareas_segundo_plano.ejecutor.configurar(app_principal_ref) # Recoge los resultados de las tareas con after()
 
     if ventana_login_actual_ref and ventana_login_actual_ref.winfo_exists():
         ventana_login_actual_ref.destroy()
@@ -620,15 +915,7 @@ def crear_ventana_login_ui(app_principal_arg, callback_exito_login_arg):
 
     ventana_login_actual_ref = ventana_login_ui
 
-    login_ui_style_local = ttk.Style(ventana_login_ui)
-    try: login_ui_style_local.theme_use('clam')
-    except tk.TclError: login_ui_style_local.theme_use('default')
-    login_ui_style_local.configure("Login.TFrame", background=config.COLOR_BACKGROUND)
-    login_ui_style_local.configure("Login.Header.TLabel", background=config.COLOR_BACKGROUND, foreground=config.COLOR_HEADER_BG, font=("Arial", 16, "bold"))
-    login_ui_style_local.configure("Login.TLabel", background=config.COLOR_BACKGROUND, foreground=config.COLOR_TEXT_GENERAL, font=("Arial", 11))
-    login_ui_style_local.configure("Login.TEntry", font=("Arial", 11), padding=5)
-    login_ui_style_local.configure("Login.TButton", font=("Arial", 11, "bold"), background=config.COLOR_ACCENT, foreground=config.COLOR_TEXT_ON_ACCENT, padding=(10,5))
-    login_ui_style_local.map("Login.TButton", background=[('active', '#E88B0A')])
+    _configurar_estilos() # Incluye los Login.*; en los siguientes inicios de sesión no hace nada
     
     login_main_frame = ttk.Frame(ventana_login_ui, style="Login.TFrame", padding=20)
     login_main_frame.pack(expand=True, fill="both")
@@ -641,7 +928,7 @@ def crear_ventana_login_ui(app_principal_arg, callback_exito_login_arg):
     entry_contrasena_widget.pack(pady=(0, 20), padx=10, fill="x")
     
     btn_ingresar_widget = ttk.Button(login_main_frame, text="Ingresar", style="Login.TButton", 
-                            command=lambda: _intentar_login_ui_logic(entry_usuario_widget, entry_contrasena_widget, ventana_login_ui, app_principal_ref, callback_exito_login_arg))
+                            command=lambda: _intentar_login_ui_logic(entry_usuario_widget, entry_contrasena_widget, ventana_login_ui, app_principal_ref, callback_exito_login_arg, btn_ingresar_widget))
     btn_ingresar_widget.pack(pady=10)
     
     ventana_login_ui.update_idletasks()
@@ -650,18 +937,18 @@ def crear_ventana_login_ui(app_principal_arg, callback_exito_login_arg):
     ventana_login_ui.geometry(f'+{x_pos_login}+{y_pos_login}')
     entry_usuario_widget.focus()
 
-def inicializar_enciclopedia_ui(app_principal_arg):
-    """Inicializa la interfaz principal de la enciclopedia después de un login exitoso."""
-    global app_principal_ref, entrada_modelo_busqueda_widget, lista_sugerencias_busqueda_widget, notebook_widget, tab_info_producto_widget, frame_info_producto_dinamico, lbl_total_stock_widget, style_aplicacion_global
-
-    app_principal_ref = app_principal_arg
-    app_principal_ref.title(f"Balanzas Triunfo Enciclopedia - {data_manager.usuario_actual['nombre']} ({data_manager.usuario_actual['rol']})")
-    app_principal_ref.protocol("WM_DELETE_WINDOW", on_app_close_ui)
-
+def _configurar_estilos():
+    """
+    Configura los estilos ttk de la aplicación. Los estilos quedan en la ventana principal, que se
+    conserva entre sesiones: se configuran una sola vez, igual que los diálogos reutilizables.
+    """
+    global style_aplicacion_global
+    if style_aplicacion_global is not None and style_aplicacion_global.master is app_principal_ref:
+        return
     style_aplicacion_global = ttk.Style(app_principal_ref)
     try: style_aplicacion_global.theme_use('clam')
     except tk.TclError: style_aplicacion_global.theme_use('default')
-    
+
     style_aplicacion_global.configure("Header.TFrame", background=config.COLOR_HEADER_BG)
     style_aplicacion_global.configure("Header.TLabel", background=config.COLOR_HEADER_BG, foreground=config.COLOR_HEADER_FG, font=("Arial", 20, "bold"), padding=(10,15))
     style_aplicacion_global.configure("TNotebook", background=config.COLOR_BACKGROUND, borderwidth=1)
@@ -678,6 +965,29 @@ def inicializar_enciclopedia_ui(app_principal_arg):
     style_aplicacion_global.map("Accent.TButton", background=[('active', '#E88B0A'), ('pressed', '#D07D09')], relief=[('pressed', 'sunken'), ('!pressed', 'raised')])
     style_aplicacion_global.configure("Admin.TLabel", background=config.COLOR_BACKGROUND, foreground=config.COLOR_ACCENT, font=("Arial", 10, "bold"), padding=5)
     style_aplicacion_global.configure("ErrorImage.TLabel", background=config.COLOR_BACKGROUND, foreground=config.COLOR_ERROR_TEXT, font=("Arial", 10, "italic"))
+    # Estilos de la ventana de inicio de sesión
+    style_aplicacion_global.configure("Login.TFrame", background=config.COLOR_BACKGROUND)
+    style_aplicacion_global.configure("Login.Header.TLabel", background=config.COLOR_BACKGROUND, foreground=config.COLOR_HEADER_BG, font=("Arial", 16, "bold"))
+    style_aplicacion_global.configure("Login.TLabel", background=config.COLOR_BACKGROUND, foreground=config.COLOR_TEXT_GENERAL, font=("Arial", 11))
+    style_aplicacion_global.configure("Login.TEntry", font=("Arial", 11), padding=5)
+    style_aplicacion_global.configure("Login.TButton", font=("Arial", 11, "bold"), background=config.COLOR_ACCENT, foreground=config.COLOR_TEXT_ON_ACCENT, padding=(10,5))
+    style_aplicacion_global.map("Login.TButton", background=[('active', '#E88B0A')])
+    # Estilos de los diálogos de registro, edición y gestión de usuarios
+    for prefijo_estilo in ("Reg", "Edit", "UserMgmt"):
+        style_aplicacion_global.configure(f"{prefijo_estilo}.TFrame", background=config.COLOR_BACKGROUND)
+        style_aplicacion_global.configure(f"{prefijo_estilo}.TLabel", background=config.COLOR_BACKGROUND, font=("Arial", 10))
+        style_aplicacion_global.configure(f"{prefijo_estilo}.TEntry", font=("Arial", 10), padding=3)
+
+def inicializar_enciclopedia_ui(app_principal_arg):
+    """Inicializa la interfaz principal de la enciclopedia después de un login exitoso."""
+    global app_principal_ref, entrada_modelo_busqueda_widget, lista_sugerencias_busqueda_widget, notebook_widget, tab_info_producto_widget, vista_detalle_producto_widget, lbl_total_stock_widget, _clave_sugerencias_mostradas, entrada_busqueda_manuales_widget, lista_resultados_manuales_widget, lbl_estado_manuales_widget, _resultados_manuales_mostrados, _id_sondeo_cambios
+
+    app_principal_ref = app_principal_arg
+    medicion_arranque.marcar("enciclopedia")
+    app_principal_ref.title(f"Balanzas Triunfo Enciclopedia - {data_manager.usuario_actual['nombre']} ({data_manager.usuario_actual['rol']})")
+    app_principal_ref.protocol("WM_DELETE_WINDOW", on_app_close_ui)
+
+    _configurar_estilos()
 
     frame_cabecera_main = ttk.Frame(app_principal_ref, style="Header.TFrame")
     frame_cabecera_main.pack(fill="x", side="top")
@@ -691,10 +1001,17 @@ def inicializar_enciclopedia_ui(app_principal_arg):
         btn_gestion_usuarios = ttk.Button(frame_cabecera_main, text="Gestión de Usuarios", style="Accent.TButton", command=_abrir_ventana_gestion_usuarios_ui_accion)
         btn_gestion_usuarios.pack(side="right", padx=10, pady=10)
 
+        btn_exportar_catalogo = ttk.Button(frame_cabecera_main, text="Exportar Catálogo", style="Accent.TButton", command=_exportar_catalogo_ui_accion)
+        btn_exportar_catalogo.pack(side="right", padx=10, pady=10)
+
+        btn_importar_catalogo = ttk.Button(frame_cabecera_main, text="Importar Catálogo", style="Accent.TButton", command=_importar_catalogo_ui_accion)
+        btn_importar_catalogo.pack(side="right", padx=10, pady=10)
+
         btn_reg_prod = ttk.Button(frame_cabecera_main, text="Registrar Producto", style="Accent.TButton", command=_abrir_ventana_registrar_producto_ui_accion)
         btn_reg_prod.pack(side="right", padx=10, pady=10)
-        lbl_total_stock_widget = ttk.Label(frame_cabecera_main, text="Stock Total Global: 0", style="Admin.TLabel")
+        lbl_total_stock_widget = ttk.Label(frame_cabecera_main, text="Stock Total Global: 0", style="Admin.TLabel", cursor="hand2")
         lbl_total_stock_widget.pack(side="right", padx=10, pady=10)
+        lbl_total_stock_widget.bind("<Button-1>", _mostrar_resumen_stock_ui_accion) # Clic: detalle del stock
         _calcular_y_actualizar_total_stock_ui()
 
     notebook_main_frame = ttk.Frame(app_principal_ref, style="Content.TFrame", padding=(0,5,0,0))
@@ -705,6 +1022,8 @@ def inicializar_enciclopedia_ui(app_principal_arg):
     notebook_widget.add(tab_busqueda_main, text='Buscar Producto')
     tab_info_producto_widget = ttk.Frame(notebook_widget, style="Content.TFrame", padding=0) 
     notebook_widget.add(tab_info_producto_widget, text='Información del Producto')
+    tab_manuales = ttk.Frame(notebook_widget, style="Content.TFrame", padding=20)
+    notebook_widget.add(tab_manuales, text='Buscar en Manuales')
     notebook_widget.pack(expand=True, fill='both')
 
     ttk.Label(tab_busqueda_main, text="Ingrese el modelo de la balanza:", style="Search.TLabel").pack(pady=(0,10), anchor="w")
@@ -712,21 +1031,46 @@ def inicializar_enciclopedia_ui(app_principal_arg):
     entrada_modelo_busqueda_widget.pack(pady=(0,10), fill="x")
     entrada_modelo_busqueda_widget.bind("<KeyRelease>", actualizar_sugerencias_ui)
     
-    frame_lista_sug = ttk.Frame(tab_busqueda_main, style="Content.TFrame")
-    frame_lista_sug.pack(pady=10, fill="both", expand=True)
-    lista_sugerencias_busqueda_widget = tk.Listbox(frame_lista_sug, font=("Arial", 12), width=38, height=10, bg=config.COLOR_LISTBOX_BG, fg=config.COLOR_LISTBOX_FG, selectbackground=config.COLOR_LISTBOX_SELECT_BG, selectforeground=config.COLOR_LISTBOX_SELECT_FG, borderwidth=1, relief="solid", exportselection=False)
-    lista_sugerencias_busqueda_widget.pack(side="left", fill="both", expand=True)
-    scrollbar_sug = ttk.Scrollbar(frame_lista_sug, orient="vertical", command=lista_sugerencias_busqueda_widget.yview)
-    scrollbar_sug.pack(side="right", fill="y")
-    lista_sugerencias_busqueda_widget.config(yscrollcommand=scrollbar_sug.set)
+    # Lista virtualizada: con catálogos enormes solo se dibujan las filas visibles
+    lista_sugerencias_busqueda_widget = ListaVirtual(tab_busqueda_main, font=("Arial", 12), width=38, height=10, style="Content.TFrame")
+    lista_sugerencias_busqueda_widget.pack(pady=10, fill="both", expand=True)
     lista_sugerencias_busqueda_widget.bind("<Double-Button-1>", mostrar_informacion_producto_seleccionado_ui)
     
+    _clave_sugerencias_mostradas = None # La lista es nueva: no hay nada mostrado todavía
     actualizar_sugerencias_ui()
 
-    frame_info_producto_dinamico = ttk.Frame(tab_info_producto_widget, style="Content.TFrame")
-    frame_info_producto_dinamico.pack(expand=True, fill='both')
+    vista_detalle_producto_widget = VistaDetalleProducto(tab_info_producto_widget, _cache_imagenes,
+                                                         al_abrir_recurso=lambda recurso: abrir_enlace_web_util(recurso, app_principal_ref),
+                                                         al_editar=_abrir_ventana_editar_producto_ui_accion,
+                                                         es_administrador=data_manager.usuario_actual["rol"] == "administrador")
+    vista_detalle_producto_widget.pack(expand=True, fill='both')
     mostrar_informacion_producto_seleccionado_ui()
-    
+
+    # Pestaña de búsqueda de texto dentro de los manuales PDF
+    ttk.Label(tab_manuales, text="Buscar texto en los manuales (p. ej. un código de error):", style="Search.TLabel").pack(pady=(0,10), anchor="w")
+    frame_busqueda_manuales = ttk.Frame(tab_manuales, style="Content.TFrame")
+    frame_busqueda_manuales.pack(pady=(0,10), fill="x")
+    entrada_busqueda_manuales_widget = ttk.Entry(frame_busqueda_manuales, style="Search.TEntry", width=45)
+    entrada_busqueda_manuales_widget.pack(side="left", fill="x", expand=True, padx=(0,10))
+    entrada_busqueda_manuales_widget.bind("<Return>", _buscar_en_manuales_ui_accion)
+    ttk.Button(frame_busqueda_manuales, text="Buscar", style="Accent.TButton", command=_buscar_en_manuales_ui_accion).pack(side="left")
+
+    frame_resultados_manuales = ttk.Frame(tab_manuales, style="Content.TFrame")
+    frame_resultados_manuales.pack(pady=10, fill="both", expand=True)
+    lista_resultados_manuales_widget = tk.Listbox(frame_resultados_manuales, font=("Arial", 11), height=10, bg=config.COLOR_LISTBOX_BG, fg=config.COLOR_LISTBOX_FG, selectbackground=config.COLOR_LISTBOX_SELECT_BG, selectforeground=config.COLOR_LISTBOX_SELECT_FG, borderwidth=1, relief="solid", exportselection=False)
+    lista_resultados_manuales_widget.pack(side="left", fill="both", expand=True)
+    scrollbar_manuales = ttk.Scrollbar(frame_resultados_manuales, orient="vertical", command=lista_resultados_manuales_widget.yview)
+    scrollbar_manuales.pack(side="right", fill="y")
+    lista_resultados_manuales_widget.config(yscrollcommand=scrollbar_manuales.set)
+    lista_resultados_manuales_widget.bind("<Double-Button-1>", _abrir_manual_resultado_ui)
+    lbl_estado_manuales_widget = ttk.Label(tab_manuales, text="", style="Info.TLabel")
+    lbl_estado_manuales_widget.pack(anchor="w")
+    _resultados_manuales_mostrados = []
+    _iniciar_actualizacion_indice_manuales()
+
+    # Cambios de otras estaciones que comparten la carpeta 'data' (ver diario_cambios.py)
+    _id_sondeo_cambios = app_principal_ref.after(config.CAMBIOS_SONDEO_MS, _sondear_cambios_otras_estaciones)
+
     entrada_modelo_busqueda_widget.focus()
 
 def on_app_close_ui():
@@ -737,6 +1081,19 @@ def on_app_close_ui():
         registrar_accion_excel("Cierre Aplicacion", f"Usuario: {data_manager.usuario_actual.get('nombre', 'N/A')}", duracion_min=duracion_minutos)
     else:
         registrar_accion_excel("Cierre Aplicacion", "Sin inicio de sesion previo (cerrado desde login o sesion ya limpia).")
+
+    # El índice de manuales y la importación/exportación del catálogo se cortan entre un archivo
+    # o fila y el siguiente (una importación cancelada no guarda nada); los guardados de productos
+    # y usuarios terminan antes de escribir el registro y los datos, con un plazo para no colgar el cierre
+    for clave in ("indice_manuales", "sondeo_cambios", "catalogo"):
+        tareas_segundo_plano.ejecutor.cancelar(clave)
+    if not tareas_segundo_plano.ejecutor.esperar_pendientes(config.TAREAS_ESPERA_CIERRE_SEG):
+        print("ADVERTENCIA (ui_components): Quedaron tareas en segundo plano sin terminar al cerrar.")
+
+    # Garantiza que todas las acciones pendientes queden escritas en el Excel antes de salir
+    finalizar_registro_excel()
+    # Escribe los cambios de datos pendientes y el índice de búsqueda antes de salir
+    data_manager.flush()
     
     if app_principal_ref:
         app_principal_ref.destroy()
\ No newline at end of file
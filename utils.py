@@ -4,9 +4,8 @@
 import webbrowser
 from tkinter import messagebox
 from excel_logger import registrar_accion_excel # Importar para registrar la acción
-import os
 import pathlib  # NUEVO: Importado para manejar rutas de archivo de forma robusta
-from config import MANUALES_PRODUCTOS_PATH # Importar la ruta de los manuales
+from validacion_productos import obtener_ruta_manual # Manuales locales (lista de la carpeta en memoria)
 
 def abrir_enlace_web_util(recurso, app_parent_for_messagebox=None):
     """
@@ -31,10 +30,10 @@ def abrir_enlace_web_util(recurso, app_parent_for_messagebox=None):
     
     # Si no es una URL, tratarlo como un archivo local
     else:
-        # Construir la ruta completa al archivo del manual
-        ruta_completa_recurso = os.path.join(MANUALES_PRODUCTOS_PATH, recurso)
+        # Ruta completa al archivo del manual (None si no está en la carpeta de manuales)
+        ruta_completa_recurso = obtener_ruta_manual(recurso)
         
-        if os.path.exists(ruta_completa_recurso):
+        if ruta_completa_recurso is not None:
             try:
                 # MODIFICADO: Se convierte la ruta a un formato URI (file://) para máxima compatibilidad.
                 uri = pathlib.Path(ruta_completa_recurso).as_uri()
@@ -0,0 +1,128 @@
+# validacion_productos.py
+# Reglas de validación de productos compartidas por los formularios de la interfaz
+# (registro/edición) y por la importación masiva del catálogo.
+#
+# Los manuales locales se validan contra una foto en memoria de la carpeta de manuales
+# (ResolutorRecursos) en lugar de consultar el disco en cada llamada: la carpeta puede estar
+# en un recurso de red lento y la vista de un producto valida varios enlaces.
+
+import os
+import re
+import time
+import threading
+
+from config import MANUALES_PRODUCTOS_PATH, RECURSOS_INTERVALO_VERIFICACION_SEG
+
+# URL web (http o https), compilada una sola vez
+_PATRON_URL = re.compile(r'^(http|https)://[^\s/$.?#].[^\s]*$')
+
+def es_url_web(texto):
+    """Indica si el texto es una URL HTTP/HTTPS básica."""
+    return _PATRON_URL.match(texto) is not None
+
+def _clave_ruta(ruta_relativa):
+    """Clave de búsqueda de una ruta relativa (en Windows sin distinguir mayúsculas)."""
+    return os.path.normcase(os.path.normpath(ruta_relativa))
+
+class ResolutorRecursos:
+    """
+    Foto en memoria de los archivos y subcarpetas de una carpeta. Se vuelve a leer cuando cambia
+    la fecha de modificación de alguna de sus carpetas (se agrega, quita o renombra algo); esa
+    verificación se hace como mucho una vez cada 'intervalo_verificacion_seg'.
+    """
+
+    def __init__(self, carpeta_base, intervalo_verificacion_seg=RECURSOS_INTERVALO_VERIFICACION_SEG):
+        self.carpeta_base = carpeta_base
+        self.intervalo_verificacion_seg = intervalo_verificacion_seg
+        self._lock = threading.Lock()
+        self._entradas = None # {clave_ruta: ruta_completa} de archivos y carpetas
+        self._mtimes_carpetas = {} # {carpeta: st_mtime_ns} al momento de la foto
+        self._ultima_verificacion = float("-inf")
+
+    def _leer_carpeta(self):
+        entradas, mtimes = {}, {}
+        pendientes = [self.carpeta_base]
+        while pendientes:
+            carpeta = pendientes.pop()
+            try:
+                mtimes[carpeta] = os.stat(carpeta).st_mtime_ns
+                with os.scandir(carpeta) as iterador:
+                    for entrada in iterador:
+                        entradas[_clave_ruta(os.path.relpath(entrada.path, self.carpeta_base))] = entrada.path
+                        if entrada.is_dir(follow_symlinks=False):
+                            pendientes.append(entrada.path)
+            except OSError:
+                continue # La carpeta de manuales puede no existir (o desaparecer durante la lectura)
+        self._entradas, self._mtimes_carpetas = entradas, mtimes
+
+    def _carpetas_cambiaron(self):
+        if not self._mtimes_carpetas:
+            return os.path.isdir(self.carpeta_base) # La carpeta no existía: ¿ya se creó?
+        for carpeta, mtime_ns in self._mtimes_carpetas.items():
+            try:
+                if os.stat(carpeta).st_mtime_ns != mtime_ns:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _foto_vigente(self):
+        with self._lock:
+            ahora = time.monotonic()
+            if self._entradas is None:
+                self._leer_carpeta()
+                self._ultima_verificacion = ahora
+            elif ahora - self._ultima_verificacion >= self.intervalo_verificacion_seg:
+                if self._carpetas_cambiaron():
+                    self._leer_carpeta()
+                self._ultima_verificacion = ahora
+            return self._entradas
+
+    def invalidar(self):
+        """Fuerza a releer la carpeta en la próxima consulta (p. ej. tras copiar un manual)."""
+        with self._lock:
+            self._entradas = None
+
+    def ruta_local(self, recurso):
+        """Retorna la ruta completa del recurso dentro de la carpeta base, o None si no existe."""
+        clave = _clave_ruta(recurso)
+        if os.path.isabs(recurso) or clave in (os.curdir, os.pardir) or clave.startswith(os.pardir + os.sep):
+            # Fuera de la carpeta base: no está en la foto, se consulta el disco directamente
+            ruta_completa = os.path.join(self.carpeta_base, recurso)
+            return ruta_completa if os.path.exists(ruta_completa) else None
+        return self._foto_vigente().get(clave)
+
+_resolutor_manuales = ResolutorRecursos(MANUALES_PRODUCTOS_PATH)
+
+def obtener_ruta_manual(recurso):
+    """Retorna la ruta completa de un manual local (dentro de MANUALES_PRODUCTOS_PATH), o None."""
+    return _resolutor_manuales.ruta_local(recurso)
+
+def invalidar_recursos_locales():
+    """Descarta la foto de la carpeta de manuales; la próxima validación la vuelve a leer."""
+    _resolutor_manuales.invalidar()
+
+def es_recurso_valido(url_string):
+    """Valida si un string es una URL HTTP/HTTPS básica o una ruta de archivo local existente.
+    
+    Args:
+        url_string (str): La cadena a validar.
+
+    Returns:
+        bool: True si es una URL válida o una ruta de archivo local existente, False en caso contrario.
+    """
+    # Permitir cadenas vacías, ya que la ausencia de un recurso es válida.
+    if not url_string: 
+        return True
+    
+    # Comprobar si es una URL web (http o https)
+    if es_url_web(url_string):
+        return True
+    
+    # Si no es una URL web, comprobar si es una ruta de archivo local
+    # Se asume que los manuales locales están dentro de MANUALES_PRODUCTOS_PATH
+    return obtener_ruta_manual(url_string) is not None
+
+def es_stock_valido(stock_texto):
+    """El stock debe ser un número entero mayor o igual a 0 (mismo criterio que el formulario)."""
+    return stock_texto.isdigit() and int(stock_texto) >= 0
@@ -0,0 +1,143 @@
+# vista_producto.py
+# Vista de detalle de un producto que se construye una sola vez. Al mostrar otro producto solo
+# se cambian los textos, la imagen y qué botones están visibles; no se destruyen ni se crean
+# widgets, así que una sesión larga (p. ej. un kiosco abierto todo el día) no acumula objetos Tcl.
+
+import os
+import tkinter as tk
+from tkinter import ttk
+
+import config
+import instrumentacion
+from validacion_productos import es_recurso_valido
+
+# Campos en el orden en que se muestran: (clave, etiqueta, solo_administradores)
+CAMPOS_DETALLE = [
+    ("serie", "Número de serie:", False),
+    ("manual", "Manual:", False),
+    ("calibracion", "Calibración:", False),
+    ("bateria", "Batería:", False),
+    ("info", "Info Adicional:", False),
+    ("imagen", "Archivo Imagen:", True),
+    ("stock", "Stock:", True),
+]
+
+class VistaDetalleProducto(ttk.Frame):
+    """
+    Detalle de producto persistente. al_abrir_recurso(recurso) abre un manual o enlace de
+    calibración; al_editar(nombre) (solo administradores) abre la edición del producto.
+    """
+
+    def __init__(self, padre, cache_imagenes, al_abrir_recurso, al_editar=None, es_administrador=False, **kwargs):
+        super().__init__(padre, style="Content.TFrame", **kwargs)
+        self._cache_imagenes = cache_imagenes
+        self._nombre_mostrado = None
+        self._datos_mostrados = None
+        self._recursos = {"manual": "", "calibracion": ""}
+        self._id_imagen = 0 # Identifica la imagen pedida más reciente (las respuestas viejas se ignoran)
+
+        self._lbl_mensaje = ttk.Label(self, text="", style="Info.TLabel", justify=tk.CENTER)
+
+        self._frame_principal = ttk.Frame(self, style="Content.TFrame")
+        frame_texto = ttk.Frame(self._frame_principal, style="Content.TFrame")
+        frame_texto.pack(side="left", fill="both", expand=True, padx=(0,10))
+        frame_imagen = ttk.Frame(self._frame_principal, style="Content.TFrame", width=220, height=270)
+        frame_imagen.pack(side="right", fill="none", expand=False, padx=(10,0), anchor="ne")
+        frame_imagen.pack_propagate(False)
+        self._lbl_imagen = tk.Label(frame_imagen, text="", bg=config.COLOR_BACKGROUND, fg=config.COLOR_TEXT_GENERAL, wraplength=180)
+        self._lbl_imagen.pack(pady=10, padx=5, anchor="n")
+
+        self._lbl_titulo = ttk.Label(frame_texto, text="", style="Info.Header.TLabel")
+        self._lbl_titulo.pack(pady=(0, 10), anchor="nw")
+
+        self._lbl_valores = {}
+        for clave, etiqueta, solo_administradores in CAMPOS_DETALLE:
+            if solo_administradores and not es_administrador:
+                continue
+            frame_campo = ttk.Frame(frame_texto, style="Content.TFrame")
+            frame_campo.pack(fill="x", pady=3, anchor="nw")
+            ttk.Label(frame_campo, text=etiqueta, style="Info.Bold.TLabel", width=18).pack(side="left", anchor="nw", padx=(0,5))
+            self._lbl_valores[clave] = ttk.Label(frame_campo, text="", style="Info.TLabel", wraplength=250 if clave == "info" else 0)
+            self._lbl_valores[clave].pack(side="left", anchor="nw")
+        # El texto de 'info' se ajusta al ancho disponible (se recalcula solo al cambiar el tamaño)
+        frame_texto.bind("<Configure>", lambda event: self._lbl_valores["info"].config(wraplength=event.width - 150 if event.width > 150 else 250))
+
+        frame_enlaces = ttk.Frame(frame_texto, style="Content.TFrame")
+        frame_enlaces.pack(fill="x", pady=(15,5), anchor="nw")
+        self._btn_manual = ttk.Button(frame_enlaces, text="Ver Manual", style="Accent.TButton", command=lambda: al_abrir_recurso(self._recursos["manual"]))
+        self._btn_calibracion = ttk.Button(frame_enlaces, text="Ver Calibración", style="Accent.TButton", command=lambda: al_abrir_recurso(self._recursos["calibracion"]))
+
+        if es_administrador and al_editar is not None:
+            frame_admin = ttk.Frame(frame_texto, style="Content.TFrame")
+            frame_admin.pack(fill="x", pady=(10,5), anchor="nw")
+            ttk.Button(frame_admin, text="Editar/Eliminar Producto", style="Accent.TButton", command=lambda: al_editar(self._nombre_mostrado)).pack(side="left", padx=(0,10))
+
+    @property
+    def nombre_mostrado(self):
+        return self._nombre_mostrado
+
+    def mostrar_mensaje(self, texto):
+        """Oculta el detalle y muestra solo un mensaje (sin producto seleccionado, producto eliminado...)."""
+        self._nombre_mostrado = self._datos_mostrados = None
+        self._id_imagen += 1
+        self._frame_principal.pack_forget()
+        self._lbl_mensaje.config(text=texto)
+        self._lbl_mensaje.pack(expand=True, padx=20, pady=20)
+
+    def mostrar_producto(self, nombre_producto, datos_producto):
+        """Actualiza la vista con el producto. Si es el mismo registro que ya se muestra no hace nada."""
+        if nombre_producto == self._nombre_mostrado and datos_producto is self._datos_mostrados:
+            return # Los registros son inmutables: mismo objeto, mismo contenido
+        if self._nombre_mostrado is None:
+            self._lbl_mensaje.pack_forget()
+            self._frame_principal.pack(expand=True, fill="both", padx=10, pady=10)
+        self._nombre_mostrado, self._datos_mostrados = nombre_producto, datos_producto
+
+        self._lbl_titulo.config(text=f"Producto: {nombre_producto}")
+        for clave, lbl_valor in self._lbl_valores.items():
+            valor = str(datos_producto.get(clave, '')).strip()
+            if clave in ("manual", "calibracion"):
+                valor = "Disponible" if valor and es_recurso_valido(valor) else ""
+            lbl_valor.config(text=valor or "No disponible")
+
+        # Botones de enlaces: visibles solo si el recurso es válido (se conservan en el mismo orden)
+        for clave, boton in (("manual", self._btn_manual), ("calibracion", self._btn_calibracion)):
+            valor = str(datos_producto.get(clave, '') or '').strip()
+            self._recursos[clave] = valor
+            boton.pack_forget()
+            if valor and es_recurso_valido(valor):
+                boton.pack(side="left", padx=(0,10))
+
+        self._mostrar_imagen(str(datos_producto.get('imagen', '') or ''))
+
+    def _mostrar_imagen(self, nombre_imagen):
+        self._id_imagen += 1
+        if not nombre_imagen:
+            self._texto_imagen("(Sin imagen asignada)")
+            return
+        ruta_imagen = os.path.join(config.IMAGENES_PRODUCTOS_PATH, nombre_imagen)
+        self._texto_imagen("(Cargando imagen...)")
+        id_imagen = self._id_imagen
+        inicio_carga_imagen = instrumentacion.marca_tiempo()
+
+        def _al_cargar_imagen(imagen_tk, error):
+            instrumentacion.registrar_desde("ui.cargar_imagen", inicio_carga_imagen)
+            # El usuario pudo haber abierto otro producto mientras se decodificaba la imagen
+            if id_imagen != self._id_imagen or not self._lbl_imagen.winfo_exists():
+                return
+            if isinstance(error, FileNotFoundError): # La existencia se verifica en el hilo de trabajo
+                self._texto_imagen(f"(Imagen '{nombre_imagen}' no encontrada)", error=True)
+                return
+            if error is not None:
+                self._texto_imagen(f"(Error al procesar imagen: {error})", error=True)
+                return
+            self._lbl_imagen.config(image=imagen_tk, text="")
+            self._lbl_imagen.image = imagen_tk
+
+        # Las vistas repetidas salen del caché en memoria y se muestran de inmediato
+        self._cache_imagenes.solicitar(ruta_imagen, self, _al_cargar_imagen)
+
+    def _texto_imagen(self, texto, error=False):
+        self._lbl_imagen.config(image="", text=texto, fg=config.COLOR_ERROR_TEXT if error else config.COLOR_TEXT_GENERAL,
+                                font=("Arial", 10, "italic") if error else ("Arial", 11))
+        self._lbl_imagen.image = None